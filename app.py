@@ -1,23 +1,56 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
 import plotly.express as px
 import numpy as np
 
+# Verbindingen komen uit een gedeelde pool (zie db.py)
+from db import run_query
+from profiles import POSITION_GROUP_LABELS, POSITION_GROUPS, PROFILE_COLUMNS
+from similarity import default_similarity_seasons, load_player_similarity_index, load_squad_similarity_index
+from player_page import PLAYERS_QUERY, load_player_page
+from team_page import TEAMS_QUERY, SQUAD_DETAILS_QUERY, SQUAD_PROFILE_QUERY, SQUAD_METRICS_QUERY, SQUAD_KPIS_QUERY
+from catalog import load_iteration_catalog
+from search import load_player_search_index
+from prefetch import player_targets, prefetch, team_targets
+from leaderboard import AGE_BOUNDS, KINDS, load_leaderboard_page, score_options
+from trajectory import load_player_trajectory, trajectory_table
+import shortlist as sl
+import coaches
+from metrics import render_debug_panel, section, start_run
+from warmup import start_warm_up
+
+# Alles wat deze run meet (queries, cache, secties) hoort bij één run-id, zie metrics.py
+start_run()
+# Eerste sessie (of nieuwe dataversie): caches op de achtergrond vullen, zie warmup.py
+start_warm_up()
+
 # -----------------------------------------------------------------------------
 # 0. NAVIGATIE LOGICA (MOET HELEMAAL BOVENAAN STAAN)
 # -----------------------------------------------------------------------------
 if "pending_nav" in st.session_state:
     nav = st.session_state.pending_nav
     try:
-        # We updaten de sessie state zodat de sidebar filters verspringen
-        st.session_state.sb_season = nav["season"]
-        st.session_state.sb_competition = nav["competition"]
+        # We updaten de sessie state zodat de sidebar filters verspringen.
+        # Met een iteration_id is het doel exact gekend (ook bij meerdere iteraties per competitie).
+        catalog = load_iteration_catalog()
+        season, competition = catalog.locate(nav.get("iteration_id")) or (nav["season"], nav["competition"])
+        st.session_state.sb_season = season
+        st.session_state.sb_competition = competition
+        iteration_id = nav.get("iteration_id") or catalog.default_iteration(season, competition)
+        if iteration_id is not None: st.session_state.sb_iteration = str(iteration_id)
+        st.session_state.sb_mode = nav["mode"]
         
         if nav["mode"] == "Spelers":
             st.session_state.sb_player = nav["target_name"]
+            # Vanuit de zoekbalk: ook het team, voor spelers met dezelfde naam in deze iteratie
+            if nav.get("squad_name"): st.session_state.sb_player_squad = nav["squad_name"]
+            st.session_state.sb_search_hit = None
         elif nav["mode"] == "Teams":
             st.session_state.sb_team = nav["target_name"]
+        elif nav["mode"] == "Coaches":
+            # Niet beperken tot de gekozen competitie: de coach kan er nooit gewerkt hebben
+            st.session_state.sb_coach_here = False
+            st.session_state.sb_coach = nav["target_name"]
     except Exception as e:
         print(f"Navigatie fout: {e}")
     
@@ -30,82 +63,30 @@ if "pending_nav" in st.session_state:
 st.set_page_config(page_title="KVK Scouting", page_icon="🔴", layout="wide")
 st.title("🔴⚪ KV Kortrijk - Data Scouting Platform")
 
-# --- MAPPING: SPELER SCORES ---
-POSITION_METRICS = {
-    "central_defender": {"aan_bal": [66, 58, 64, 10, 163], "zonder_bal": [103, 93, 32, 94, 17, 65, 92]},
-    "wingback": {"aan_bal": [61, 66, 58, 54, 53, 52, 10, 9, 14], "zonder_bal": [68, 69, 17, 70]},
-    "defensive_midfield": {"aan_bal": [60, 10, 163, 44], "zonder_bal": [29, 65, 17, 16, 69, 68, 67]},
-    "central_midfield": {"aan_bal": [60, 61, 62, 73, 72, 64, 10, 163, 145], "zonder_bal": [65, 17, 69, 68]},
-    "attacking_midfield": {"aan_bal": [60, 61, 62, 73, 58, 2, 15, 52, 72, 10, 74, 9], "zonder_bal": []},
-    "winger": {"aan_bal": [60, 61, 62, 58, 54, 1, 53, 10, 9, 14, 6, 145], "zonder_bal": []},
-    "center_forward": {"aan_bal": [60, 61, 62, 73, 63, 2, 64, 10, 74, 9, 92, 97, 14, 6, 145], "zonder_bal": []}
-}
-
-# --- MAPPING: SPELER KPIS ---
-POSITION_KPIS = {
-    "central_defender": {"aan_bal": [107, 106, 1534, 21, 2, 0, 1405, 1422], "zonder_bal": [1016, 1015, 1014, 24, 867, 1409]},
-    "wingback": {"aan_bal": [172, 171, 2, 9, 0], "zonder_bal": [23, 27, 1409, 1536, 1523]},
-    "defensive_midfield": {"aan_bal": [184, 0, 107, 87, 106, 109, 122, 1422, 1423], "zonder_bal": [21, 23, 27, 865, 867, 619, 1536, 1610]},
-    "central_midfield": {"aan_bal": [0, 1405, 1425], "zonder_bal": [23, 27, 24, 1536]},
-    "attacking_midfield": {"aan_bal": [77, 1350, 2, 169, 167, 467, 0, 7, 141, 1425, 1422, 1423, 1253, 1252, 1254], "zonder_bal": [1536]},
-    "winger": {"aan_bal": [25, 2, 88, 172, 171, 167, 9, 87, 7, 1401, 1425], "zonder_bal": [1536]},
-    "center_forward": {"aan_bal": [9, 427, 426, 1401, 82], "zonder_bal": [1536]}
-}
-
-def get_config_for_position(db_position, config_dict):
-    if not db_position: return None
-    pos = str(db_position).upper().strip()
-    if pos == "CENTRAL_DEFENDER": return config_dict.get('central_defender')
-    elif pos in ["RIGHT_WINGBACK_DEFENDER", "LEFT_WINGBACK_DEFENDER"]: return config_dict.get('wingback')
-    elif pos in ["DEFENSIVE_MIDFIELD", "DEFENSE_MIDFIELD"]: return config_dict.get('defensive_midfield')
-    elif pos == "CENTRAL_MIDFIELD": return config_dict.get('central_midfield')
-    elif pos in ["ATTACKING_MIDFIELD", "OFFENSIVE_MIDFIELD"]: return config_dict.get('attacking_midfield')
-    elif pos in ["RIGHT_WINGER", "LEFT_WINGER"]: return config_dict.get('winger')
-    elif pos in ["CENTER_FORWARD", "STRIKER"]: return config_dict.get('center_forward')
-    return None
-
-# --- DATABASE FUNCTIES (FIXED) ---
-
-# GEEN @st.cache_resource hier! We willen een verse verbinding.
-def init_connection():
-    return psycopg2.connect(
-        host=st.secrets["postgres"]["host"],
-        port=st.secrets["postgres"]["port"],
-        database=st.secrets["postgres"]["dbname"],
-        user=st.secrets["postgres"]["user"],
-        password=st.secrets["postgres"]["password"]
-    )
-
-# WEL caching op de data. ttl=3600 betekent: onthoud dit resultaat 1 uur.
-@st.cache_data(ttl=3600)
-def run_query(query, params=None):
-    conn = init_connection()
-    try:
-        return pd.read_sql(query, conn, params=params)
-    except Exception as e:
-        st.error(f"SQL Error: {e}")
-        return pd.DataFrame()
-    finally:
-        conn.close() # Verbinding sluiten om InterfaceError te voorkomen
-
 # -----------------------------------------------------------------------------
 # 2. SIDEBAR FILTERS
 # -----------------------------------------------------------------------------
 st.sidebar.header("1. Selecteer Data")
 
-season_query = "SELECT DISTINCT season FROM public.iterations ORDER BY season DESC;"
+# Seizoenen, competities en iteraties komen uit één gecachete catalogus (zie catalog.py)
 try:
-    df_seasons = run_query(season_query)
-    seasons_list = df_seasons['season'].tolist()
+    with section("sidebar/catalogus"): catalog = load_iteration_catalog()
+    seasons_list = list(catalog.seasons)
     selected_season = st.sidebar.selectbox("Seizoen:", seasons_list, key="sb_season")
 except Exception as e:
     st.error("Kon seizoenen niet laden."); st.stop()
 
+selected_iteration_id = None
 if selected_season:
-    competition_query = 'SELECT DISTINCT "competitionName" FROM public.iterations WHERE season = %s ORDER BY "competitionName";'
-    df_competitions = run_query(competition_query, params=(selected_season,))
-    competitions_list = df_competitions['competitionName'].tolist()
+    competitions_list = list(catalog.competitions(selected_season))
     selected_competition = st.sidebar.selectbox("Competitie:", competitions_list, key="sb_competition")
+    iteration_ids = list(catalog.iteration_ids(selected_season, selected_competition))
+    if len(iteration_ids) > 1:
+        # Meerdere iteraties voor dezelfde competitie: expliciet laten kiezen (standaard de recentste)
+        if st.session_state.get("sb_iteration") not in iteration_ids:
+            st.session_state.sb_iteration = catalog.default_iteration(selected_season, selected_competition)
+        selected_iteration_id = st.sidebar.selectbox("Iteratie:", iteration_ids, key="sb_iteration")
+    elif iteration_ids: selected_iteration_id = iteration_ids[0]
 else: selected_competition = None
 
 st.sidebar.divider() 
@@ -114,18 +95,221 @@ st.sidebar.divider()
 # 3. ANALYSE MODUS
 # -----------------------------------------------------------------------------
 st.sidebar.header("2. Analyse Niveau")
-analysis_mode = st.sidebar.radio("Wat wil je analyseren?", ["Spelers", "Teams", "Coaches"])
+analysis_mode = st.sidebar.radio("Wat wil je analyseren?", ["Spelers", "Teams", "Ranglijst", "Shortlist", "Coaches"], key="sb_mode")
 
-selected_iteration_id = None
 if selected_season and selected_competition:
-    details_query = 'SELECT season, "competitionName", id FROM public.iterations WHERE season = %s AND "competitionName" = %s LIMIT 1;'
-    df_details = run_query(details_query, params=(selected_season, selected_competition))
-    if not df_details.empty:
-        selected_iteration_id = str(df_details.iloc[0]['id'])
+    if selected_iteration_id:
         st.info(f"Je kijkt nu naar: **{selected_competition}** ({selected_season})")
     else: st.error("Kon geen ID vinden."); st.stop() 
 else: st.warning("👈 Kies eerst een seizoen en competitie."); st.stop() 
 
+# -----------------------------------------------------------------------------
+# 4. ZELFSTANDIGE SECTIES (FRAGMENTS)
+# -----------------------------------------------------------------------------
+# Een klik of filter binnen een fragment herlaadt enkel dat fragment, niet heel app.py.
+# Wat in een expander zit wordt pas berekend als die open staat. Navigeren naar een
+# andere speler/team blijft een volledige st.rerun().
+
+def hl(v): return 'color: #2ecc71; font-weight: bold' if isinstance(v, (int,float)) and v > 66 else ''
+# Inverted highlight
+def hl_inv(v): return 'background-color: #e74c3c; color: white; font-weight: bold' if str(v).lower().strip() == 'true' else ''
+
+def color_sim(val):
+    c = '#2ecc71' if val > 90 else '#27ae60' if val > 80 else 'black'
+    w = 'bold' if val > 80 else 'normal'
+    return f'color: {c}; font-weight: {w}'
+
+def lazy_expander(label, key):
+    # on_change="rerun": openklappen herlaadt enkel het omringende fragment
+    return st.expander(label, expanded=False, key=key, on_change="rerun")
+
+@st.fragment
+def similar_players_section(player_id, player_name, iteration_id, position, db_cols, seasons):
+    with section("speler/vergelijkbaar"):
+        exp = lazy_expander(f"Toon top 10 spelers die lijken op {player_name}", "exp_similar_players")
+        with exp:
+            if not exp.open: return
+            sim_seasons = st.multiselect("Seizoenen:", seasons, default=default_similarity_seasons(seasons), placeholder="Alle seizoenen", key="sim_seasons")
+            try:
+                # Eén gecachete index per positie (alle seizoenen); seizoenskeuze = masker
+                sim_index = load_player_similarity_index(position)
+                if len(sim_index):
+                    results = sim_index.most_similar(player_id, iteration_id, db_cols, k=10, level_window=15, seasons=sim_seasons)
+
+                    if results is not None:
+                        if not results.empty:
+                            disp_df = results[['Naam', 'Team', 'Seizoen', 'Competitie', 'Avg Score', 'Gelijkenis %']]
+
+                            event = st.dataframe(
+                                disp_df.style.applymap(color_sim, subset=['Gelijkenis %']).format({'Gelijkenis %': '{:.1f}%', 'Avg Score': '{:.1f}'}),
+                                use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row"
+                            )
+
+                            if len(event.selection.rows) > 0:
+                                idx = event.selection.rows[0]
+                                cr = disp_df.iloc[idx]
+                                st.session_state.pending_nav = {"season": cr['Seizoen'], "competition": cr['Competitie'], "target_name": cr['Naam'], "iteration_id": results.iloc[idx]['iterationId'], "mode": "Spelers"}
+                                st.rerun()
+                            # Nog geen klik: de getoonde spelers alvast in de cache laden (zie prefetch.py)
+                            prefetch(player_targets(results, position))
+                        else: st.warning("Geen spelers van dit niveau gevonden in de gekozen seizoenen.")
+                    else: st.warning("Huidige speler niet gevonden in de vergelijkingsdata.")
+                else: st.info("Geen vergelijkbare spelers gevonden.")
+            except Exception as e: st.error("Fout bij berekenen."); st.code(e)
+
+@st.fragment
+def trajectory_section(player_id, player_name, position):
+    with section("speler/ontwikkeling"):
+        exp = lazy_expander(f"Toon de ontwikkeling van {player_name} over alle seizoenen", "exp_trajectory")
+        with exp:
+            if not exp.open: return
+            try:
+                df = load_player_trajectory(player_id, position)
+            except Exception as e: st.error("Fout bij laden ontwikkeling."); st.code(e); return
+            if df.empty or df["iterationId"].nunique() < 2: st.info("Slechts één seizoen beschikbaar voor deze speler."); return
+
+            profiles = trajectory_table(df, "Profiel")
+            if not profiles.empty:
+                chart = profiles.T.reset_index(names="Iteratie").melt(id_vars="Iteratie", var_name="Profiel", value_name="Score")
+                fig = px.line(chart, x="Iteratie", y="Score", color="Profiel", markers=True, title="KVK Profielscores per seizoen", range_y=[0, 100])
+                st.plotly_chart(fig, use_container_width=True)
+
+            tab_p, tab_m, tab_k = st.tabs(["Profielen", "Metrieken", "KPIs"])
+            for tab, kind in ((tab_p, "Profiel"), (tab_m, "Metriek"), (tab_k, "KPI")):
+                with tab:
+                    table = profiles if kind == "Profiel" else trajectory_table(df, kind)
+                    if table.empty: st.info("Geen data."); continue
+                    st.dataframe(table.style.applymap(hl).format('{:.1f}', na_rep='-'), use_container_width=True)
+                    if kind != "Profiel":
+                        picked = st.multiselect("Toon trend van:", list(table.index), max_selections=5, key=f"traj_pick_{kind}")
+                        if picked:
+                            chart = table.loc[picked].T.reset_index(names="Iteratie").melt(id_vars="Iteratie", var_name=kind, value_name="Score")
+                            st.plotly_chart(px.line(chart, x="Iteratie", y="Score", color=kind, markers=True, range_y=[0, 100]), use_container_width=True)
+
+@st.fragment
+def team_metrics_section(squad_id, iteration_id):
+    with section("team/metrieken"):
+        exp = lazy_expander("📊 Team Impect Scores (Metrieken)", "exp_team_metrics")
+        with exp:
+            if not exp.open: return
+            try:
+                df = run_query(SQUAD_METRICS_QUERY, params=(squad_id, iteration_id))
+                if not df.empty: st.dataframe(df.style.applymap(hl, subset=['Score']).applymap(hl_inv, subset=['Inverted']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+                else: st.info("Geen data.")
+            except: st.error("Fout metrieken.")
+
+@st.fragment
+def team_kpis_section(squad_id, iteration_id):
+    with section("team/kpis"):
+        exp = lazy_expander("📉 Team Impect KPIs (Details)", "exp_team_kpis")
+        with exp:
+            if not exp.open: return
+            try:
+                df = run_query(SQUAD_KPIS_QUERY, params=(squad_id, iteration_id))
+                if not df.empty: st.dataframe(df.style.applymap(hl, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+                else: st.info("Geen data.")
+            except: st.error("Fout KPIs.")
+
+@st.fragment
+def similar_teams_section(squad_id, season, competition, seasons):
+    with section("team/vergelijkbaar"):
+        team_sim_seasons = st.multiselect("Seizoenen:", seasons, default=default_similarity_seasons(seasons), placeholder="Alle seizoenen", key="team_sim_seasons")
+        try:
+            squad_index = load_squad_similarity_index()
+            if len(squad_index):
+                top5 = squad_index.most_similar(squad_id, season, competition, k=5, seasons=team_sim_seasons)
+
+                if top5 is not None:
+                    disp = top5[['Team', 'Seizoen', 'Competitie', 'Gelijkenis %']]
+                    ev = st.dataframe(disp.style.applymap(color_sim, subset=['Gelijkenis %']).format({'Gelijkenis %': '{:.1f}%'}), use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+
+                    if len(ev.selection.rows) > 0:
+                        idx = ev.selection.rows[0]; cr = disp.iloc[idx]
+                        st.session_state.pending_nav = {"season": cr['Seizoen'], "competition": cr['Competitie'], "target_name": cr['Team'], "mode": "Teams"}
+                        st.rerun()
+                    prefetch(team_targets(top5))
+                else: st.warning("Team niet gevonden in de vergelijkingsdata.")
+            else: st.info("Geen teamprofielen gevonden.")
+        except Exception as e: st.error("Fout similarity."); st.code(e)
+
+@st.fragment
+def shortlist_neighbours_section(members, vectors, seasons):
+    with section("shortlist/buren"):
+        c1, c2 = st.columns([3, 1])
+        with c1: nb_seasons = st.multiselect("Seizoenen:", seasons, default=default_similarity_seasons(seasons), placeholder="Alle seizoenen", key="sl_seasons")
+        with c2: k = st.number_input("Buren per speler:", 1, 20, 5, key="sl_k")
+        try:
+            df = sl.shortlist_neighbours(members, vectors, k=k, level_window=15, seasons=nb_seasons)
+        except Exception as e: st.error("Fout bij berekenen."); st.code(e); return
+        if df.empty: st.info("Geen vergelijkbare spelers gevonden."); return
+        disp = df[['Shortlist speler', 'Naam', 'Team', 'Seizoen', 'Competitie', 'Avg Score', 'Gelijkenis %']]
+        event = st.dataframe(disp.style.applymap(color_sim, subset=['Gelijkenis %']).format({'Gelijkenis %': '{:.1f}%', 'Avg Score': '{:.1f}'}), use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+        if len(event.selection.rows) > 0:
+            cr = df.iloc[event.selection.rows[0]]
+            st.session_state.pending_nav = {"season": cr['Seizoen'], "competition": cr['Competitie'], "target_name": cr['Naam'], "squad_name": cr['Team'], "iteration_id": cr['iterationId'], "mode": "Spelers"}
+            st.rerun()
+
+@st.fragment
+def coach_scores_section(tenures, kind):
+    label, title, key = {
+        coaches.KIND_METRIC: ("metrieken", "📊 Coach Impect Scores (Metrieken)", "exp_coach_metrics"),
+        coaches.KIND_KPI: ("kpis", "📉 Coach Impect KPIs (Details)", "exp_coach_kpis"),
+    }[kind]
+    with section(f"coach/{label}"):
+        exp = lazy_expander(title, key)
+        with exp:
+            if not exp.open: return
+            try:
+                df = coaches.coach_scores(tenures, kind)
+                if df.empty: st.info("Geen data."); return
+                styled = df.style.applymap(hl, subset=['Score'])
+                if 'Inverted' in df: styled = styled.applymap(hl_inv, subset=['Inverted'])
+                st.dataframe(styled.format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+            except Exception as e: st.error(f"Fout {label}."); st.code(e)
+
+@st.fragment
+def similar_coaches_section(coach_id, season, competition):
+    with section("coach/vergelijkbaar"):
+        try:
+            top5 = coaches.load_coach_index().most_similar(coach_id, k=5)
+            if top5 is None: st.info("Geen profielscores voor deze coach."); return
+            disp = top5[['Coach', 'Teams', 'Gelijkenis %']]
+            ev = st.dataframe(disp.style.applymap(color_sim, subset=['Gelijkenis %']).format({'Gelijkenis %': '{:.1f}%'}), use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+            if len(ev.selection.rows) > 0:
+                cr = top5.iloc[ev.selection.rows[0]]
+                st.session_state.pending_nav = {"season": season, "competition": competition, "target_name": cr['coachId'], "mode": "Coaches"}
+                st.rerun()
+        except Exception as e: st.error("Fout similarity."); st.code(e)
+
+def lb_shift_page(step):
+    st.session_state.lb_page = max(0, st.session_state.get("lb_page", 0) + step)
+
+@st.fragment
+def leaderboard_section(kind, key, iteration_ids, group, age_range, page_size):
+    with section("ranglijst/pagina"):
+        # Andere filters = terug naar pagina 1
+        signature = (kind, key, tuple(iteration_ids), group, age_range, page_size)
+        if st.session_state.get("lb_signature") != signature:
+            st.session_state.lb_signature = signature
+            st.session_state.lb_page = 0
+        page = st.session_state.lb_page
+        try:
+            df, has_next = load_leaderboard_page(kind, key, iteration_ids, group, age_range, page=page, page_size=page_size)
+        except Exception as e: st.error("Fout bij laden ranglijst."); st.code(e); return
+
+        if df.empty: st.info("Geen spelers gevonden voor deze filters."); return
+        disp = df[['#', 'Naam', 'Team', 'Competitie', 'Seizoen', 'Positie', 'Leeftijd', 'Score']]
+        event = st.dataframe(disp.style.applymap(hl, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
+        if len(event.selection.rows) > 0:
+            cr = df.iloc[event.selection.rows[0]]
+            st.session_state.pending_nav = {"season": cr['Seizoen'], "competition": cr['Competitie'], "target_name": cr['Naam'], "squad_name": cr['Team'], "iteration_id": cr['iterationId'], "mode": "Spelers"}
+            st.rerun()
+
+        c1, c2, c3 = st.columns([1, 3, 1])
+        with c1: st.button("◀ Vorige", on_click=lb_shift_page, args=(-1,), disabled=page == 0, key="lb_prev", use_container_width=True)
+        with c2: st.caption(f"Pagina {page + 1} · plaats {df['#'].iloc[0]}–{df['#'].iloc[-1]}")
+        with c3: st.button("Volgende ▶", on_click=lb_shift_page, args=(1,), disabled=not has_next, key="lb_next", use_container_width=True)
+
 # -----------------------------------------------------------------------------
 # 5. HOOFDSCHERM LOGICA
 # -----------------------------------------------------------------------------
@@ -138,16 +322,24 @@ if analysis_mode == "Spelers":
     
     # 1. SPELER SELECTIE
     st.sidebar.header("3. Speler Selectie")
-    players_query = """
-        SELECT p.commonname, p.id as "playerId", sq.name as "squadName"
-        FROM public.players p
-        JOIN analysis.final_impect_scores s ON p.id = s."playerId"
-        LEFT JOIN public.squads sq ON s."squadId" = sq.id
-        WHERE s."iterationId" = %s
-        ORDER BY p.commonname;
-    """
+
+    # Zoeken over alle competities en seizoenen (trigram index in het geheugen, zie search.py)
+    search_text = st.sidebar.text_input("🔎 Zoek speler (alle competities):", key="sb_search", placeholder="bv. de bruyne")
+    if search_text.strip():
+        try:
+            with section("speler/zoeken"): hits = load_player_search_index().search(search_text, limit=20)
+            if not hits.empty:
+                labels = [f"{h.Naam} – {h.Team or 'Onbekend'} ({h.Competitie} {h.Seizoen})" for h in hits.itertuples()]
+                pick = st.sidebar.selectbox("Resultaten:", range(len(hits)), format_func=labels.__getitem__, index=None, placeholder=f"{len(hits)} resultaten, kies een speler", key="sb_search_hit")
+                if pick is not None:
+                    hit = hits.iloc[pick]
+                    st.session_state.pending_nav = {"season": hit['Seizoen'], "competition": hit['Competitie'], "target_name": hit['Naam'], "squad_name": hit['Team'], "iteration_id": hit['iterationId'], "mode": "Spelers"}
+                    st.rerun()
+            else: st.sidebar.caption("Geen spelers gevonden.")
+        except Exception as e: st.sidebar.error("Zoeken mislukt."); st.sidebar.code(e)
+
     try:
-        df_players = run_query(players_query, params=(selected_iteration_id,))
+        with section("speler/lijst"): df_players = run_query(PLAYERS_QUERY, params=(selected_iteration_id,))
         unique_names = df_players['commonname'].unique().tolist()
         selected_player_name = st.sidebar.selectbox("Kies een speler:", unique_names, key="sb_player")
         
@@ -158,212 +350,132 @@ if analysis_mode == "Spelers":
             st.sidebar.warning(f"⚠️ Meerdere spelers gevonden: '{selected_player_name}'.")
             squad_options = [s for s in candidate_rows['squadName'].tolist() if s is not None]
             if squad_options:
-                selected_squad = st.sidebar.selectbox("Kies team:", squad_options)
+                if st.session_state.get("sb_player_squad") not in squad_options: st.session_state.pop("sb_player_squad", None)
+                selected_squad = st.sidebar.selectbox("Kies team:", squad_options, key="sb_player_squad")
                 final_player_id = candidate_rows[candidate_rows['squadName'] == selected_squad].iloc[0]['playerId']
             else: final_player_id = candidate_rows.iloc[0]['playerId']
         elif len(candidate_rows) == 1: final_player_id = candidate_rows.iloc[0]['playerId']
         else: st.error("Selectie fout."); st.stop()
+        player_position = df_players[df_players['playerId'] == final_player_id].iloc[0]['position']
     except Exception as e: st.error("Fout bij ophalen spelers."); st.code(e); st.stop()
 
-    # 2. DATA OPHALEN
+    # 2. DATA OPHALEN (alle secties tegelijk, zie player_page.py)
     st.divider()
-    score_query = """
-        SELECT p.commonname, a.position, p.birthdate, p.birthplace, p.leg, sq_curr.name as "current_team_name",
-            a.cb_kvk_score, a.wb_kvk_score, a.dm_kvk_score, a.cm_kvk_score, a.acm_kvk_score, a.fa_kvk_score, a.fw_kvk_score,
-            a.footballing_cb_kvk_score, a.controlling_cb_kvk_score, a.defensive_wb_kvk_score, a.offensive_wingback_kvk_score,
-            a.ball_winning_dm_kvk_score, a.playmaker_dm_kvk_score, a.box_to_box_cm_kvk_score, a.deep_running_acm_kvk_score,
-            a.playmaker_off_acm_kvk_score, a.fa_inside_kvk_score, a.fa_wide_kvk_score, a.fw_target_kvk_score,
-            a.fw_running_kvk_score, a.fw_finisher_kvk_score
-        FROM analysis.final_impect_scores a
-        JOIN public.players p ON a."playerId" = p.id
-        LEFT JOIN public.squads sq_curr ON p."currentSquadId" = sq_curr.id
-        WHERE a."iterationId" = %s AND p.id = %s
-    """
+    def section_error(page, *sections):
+        for name in sections:
+            if name in page.errors: st.error(f"SQL Error: {page.errors[name]}")
+
     try:
         p_player_id = str(final_player_id)
-        df_scores = run_query(score_query, params=(selected_iteration_id, p_player_id))
+        with st.spinner("Spelerdata laden..."), section("speler/laden"):
+            # De vergelijkingsindex laadt pas als die sectie opengeklapt wordt
+            page = load_player_page(selected_iteration_id, p_player_id, player_position, include_similar=False)
+        df_scores = page.scores
+        if "scores" in page.errors: raise page.errors["scores"]
         
         if not df_scores.empty:
             row = df_scores.iloc[0]
-            st.subheader(f"ℹ️ {selected_player_name}")
-            c1, c2, c3, c4 = st.columns(4)
-            with c1: st.metric("Huidig Team", row['current_team_name'] or "Onbekend")
-            with c2: st.metric("Geboortedatum", str(row['birthdate']) or "-")
-            with c3: st.metric("Geboorteplaats", row['birthplace'] or "-")
-            with c4: st.metric("Voet", row['leg'] or "-")
-            st.markdown("---")
-
-            # PROFIELEN
-            profile_mapping = {
-                "KVK Centrale Verdediger": row['cb_kvk_score'], "KVK Wingback": row['wb_kvk_score'],
-                "KVK Verdedigende Mid.": row['dm_kvk_score'], "KVK Centrale Mid.": row['cm_kvk_score'],
-                "KVK Aanvallende Mid.": row['acm_kvk_score'], "KVK Flank Aanvaller": row['fa_kvk_score'],
-                "KVK Spits": row['fw_kvk_score'], "Voetballende CV": row['footballing_cb_kvk_score'],
-                "Controlerende CV": row['controlling_cb_kvk_score'], "Verdedigende Back": row['defensive_wb_kvk_score'],
-                "Aanvallende Back": row['offensive_wingback_kvk_score'], "Ballenafpakker (CVM)": row['ball_winning_dm_kvk_score'],
-                "Spelmaker (CVM)": row['playmaker_dm_kvk_score'], "Box-to-Box (CM)": row['box_to_box_cm_kvk_score'],
-                "Diepgaande '10'": row['deep_running_acm_kvk_score'], "Spelmakende '10'": row['playmaker_off_acm_kvk_score'],
-                "Buitenspeler (Binnendoor)": row['fa_inside_kvk_score'], "Buitenspeler (Buitenom)": row['fa_wide_kvk_score'],
-                "Targetman": row['fw_target_kvk_score'], "Lopende Spits": row['fw_running_kvk_score'], "Afmaker": row['fw_finisher_kvk_score']
-            }
-            active_profiles = {k: v for k, v in profile_mapping.items() if v is not None and v > 0}
-            df_chart = pd.DataFrame(list(active_profiles.items()), columns=['Profiel', 'Score'])
+            with section("speler/profiel"):
+                h1, h2 = st.columns([4, 1])
+                with h1: st.subheader(f"ℹ️ {selected_player_name}")
+                with h2:
+                    if sl.on_shortlist(p_player_id, selected_iteration_id):
+                        st.button("✖ Van shortlist", on_click=sl.remove_from_shortlist, args=((p_player_id, selected_iteration_id),), key="sl_toggle", use_container_width=True)
+                    else:
+                        squad_name = df_players.loc[df_players['playerId'] == final_player_id, 'squadName'].iloc[0]
+                        member = {"playerId": p_player_id, "iterationId": selected_iteration_id, "Naam": selected_player_name, "Team": squad_name, "Seizoen": selected_season, "Competitie": selected_competition, "position": player_position}
+                        st.button("⭐ Op shortlist", on_click=sl.add_to_shortlist, args=(member,), key="sl_toggle", use_container_width=True)
+                c1, c2, c3, c4 = st.columns(4)
+                with c1: st.metric("Huidig Team", row['current_team_name'] or "Onbekend")
+                with c2: st.metric("Geboortedatum", str(row['birthdate']) or "-")
+                with c3: st.metric("Geboorteplaats", row['birthplace'] or "-")
+                with c4: st.metric("Voet", row['leg'] or "-")
+                st.markdown("---")
+
+                # PROFIELEN
+                profile_mapping = {label: row[col] for label, col in PROFILE_COLUMNS.items()}
+                active_profiles = {k: v for k, v in profile_mapping.items() if v is not None and v > 0}
+                df_chart = pd.DataFrame(list(active_profiles.items()), columns=['Profiel', 'Score'])
             
-            def highlight_high_scores(val):
-                return 'color: #2ecc71; font-weight: bold' if isinstance(val, (int, float)) and val > 66 else ''
+                def highlight_high_scores(val):
+                    return 'color: #2ecc71; font-weight: bold' if isinstance(val, (int, float)) and val > 66 else ''
 
-            top_profile_name = df_chart.sort_values(by='Score', ascending=False).iloc[0]['Profiel'] if not df_chart.empty and df_chart.iloc[0]['Score'] > 66 else None
-            if top_profile_name: st.success(f"### ✅ Speler is POSITIEF op data profiel: {top_profile_name}")
+                top_profile_name = df_chart.sort_values(by='Score', ascending=False).iloc[0]['Profiel'] if not df_chart.empty and df_chart.iloc[0]['Score'] > 66 else None
+                if top_profile_name: st.success(f"### ✅ Speler is POSITIEF op data profiel: {top_profile_name}")
             
-            c1, c2 = st.columns([1, 2])
-            with c1:
-                st.write(f"**Positie:** {row['position']}")
-                st.dataframe(df_chart.style.applymap(highlight_high_scores, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
-            with c2:
-                if not df_chart.empty:
-                    fig = px.pie(df_chart, values='Score', names='Profiel', title=f'KVK Profielverdeling', hole=0.4, color_discrete_sequence=['#d71920', '#ecf0f1', '#bdc3c7', '#c0392b'])
-                    fig.update_traces(textinfo='value', textfont_size=15, marker=dict(line=dict(color='#000000', width=1)))
-                    st.plotly_chart(fig, use_container_width=True)
+                c1, c2 = st.columns([1, 2])
+                with c1:
+                    st.write(f"**Positie:** {row['position']}")
+                    st.dataframe(df_chart.style.applymap(highlight_high_scores, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+                with c2:
+                    if not df_chart.empty:
+                        fig = px.pie(df_chart, values='Score', names='Profiel', title=f'KVK Profielverdeling', hole=0.4, color_discrete_sequence=['#d71920', '#ecf0f1', '#bdc3c7', '#c0392b'])
+                        fig.update_traces(textinfo='value', textfont_size=15, marker=dict(line=dict(color='#000000', width=1)))
+                        st.plotly_chart(fig, use_container_width=True)
 
             # METRIEKEN
-            st.markdown("---"); st.subheader("📊 Impect Speler Scores")
-            metrics_config = get_config_for_position(row['position'], POSITION_METRICS)
-            if metrics_config:
-                def get_metrics_table(metric_ids):
-                    if not metric_ids: return pd.DataFrame()
-                    ids_tuple = tuple(str(x) for x in metric_ids)
-                    q = """SELECT d.name as "Metriek", d.details_label as "Detail", s.final_score_1_to_100 as "Score" FROM analysis.player_final_scores s JOIN public.player_score_definitions d ON CAST(s.metric_id AS TEXT) = d.id WHERE s."iterationId" = %s AND s."playerId" = %s AND s.metric_id IN %s ORDER BY s.final_score_1_to_100 DESC"""
-                    return run_query(q, params=(selected_iteration_id, p_player_id, ids_tuple))
-                df_aan = get_metrics_table(metrics_config.get('aan_bal', []))
-                df_zonder = get_metrics_table(metrics_config.get('zonder_bal', []))
-                c1, c2 = st.columns(2)
-                with c1: 
-                    st.write("⚽ **Aan de Bal**")
-                    if not df_aan.empty: st.dataframe(df_aan.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
-                with c2: 
-                    st.write("🛡️ **Zonder Bal**")
-                    if not df_zonder.empty: st.dataframe(df_zonder.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
-            else: st.info(f"Geen metrieken voor '{row['position']}'")
+            with section("speler/metrieken"):
+                st.markdown("---"); st.subheader("📊 Impect Speler Scores")
+                metrics_config = page.metrics_config
+                if metrics_config:
+                    section_error(page, "metrics_aan_bal", "metrics_zonder_bal")
+                    df_aan, df_zonder = page.metrics_aan_bal, page.metrics_zonder_bal
+                    c1, c2 = st.columns(2)
+                    with c1: 
+                        st.write("⚽ **Aan de Bal**")
+                        if not df_aan.empty: st.dataframe(df_aan.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                    with c2: 
+                        st.write("🛡️ **Zonder Bal**")
+                        if not df_zonder.empty: st.dataframe(df_zonder.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                else: st.info(f"Geen metrieken voor '{row['position']}'")
 
             # KPIs
-            st.markdown("---"); st.subheader("📈 Impect Speler KPIs")
-            kpis_config = get_config_for_position(row['position'], POSITION_KPIS)
-            if kpis_config:
-                def get_kpis_table(kpi_ids):
-                    if not kpi_ids: return pd.DataFrame()
-                    ids_tuple = tuple(str(x) for x in kpi_ids)
-                    q = """SELECT d.name as "KPI", d.context as "Context", s.final_score_1_to_100 as "Score" FROM analysis.kpis_final_scores s JOIN analysis.kpi_definitions d ON CAST(s.metric_id AS TEXT) = d.id WHERE s."iterationId" = %s AND s."playerId" = %s AND s.metric_id IN %s ORDER BY s.final_score_1_to_100 DESC"""
-                    return run_query(q, params=(selected_iteration_id, p_player_id, ids_tuple))
-                df_k1 = get_kpis_table(kpis_config.get('aan_bal', []))
-                df_k2 = get_kpis_table(kpis_config.get('zonder_bal', []))
-                c1, c2 = st.columns(2)
-                with c1: 
-                    st.write("⚽ **Aan de Bal (KPIs)**")
-                    if not df_k1.empty: st.dataframe(df_k1.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
-                with c2: 
-                    st.write("🛡️ **Zonder Bal (KPIs)**")
-                    if not df_k2.empty: st.dataframe(df_k2.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
-            else: st.info("Geen KPIs gevonden.")
+            with section("speler/kpis"):
+                st.markdown("---"); st.subheader("📈 Impect Speler KPIs")
+                kpis_config = page.kpis_config
+                if kpis_config:
+                    section_error(page, "kpis_aan_bal", "kpis_zonder_bal")
+                    df_k1, df_k2 = page.kpis_aan_bal, page.kpis_zonder_bal
+                    c1, c2 = st.columns(2)
+                    with c1: 
+                        st.write("⚽ **Aan de Bal (KPIs)**")
+                        if not df_k1.empty: st.dataframe(df_k1.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                    with c2: 
+                        st.write("🛡️ **Zonder Bal (KPIs)**")
+                        if not df_k2.empty: st.dataframe(df_k2.style.applymap(highlight_high_scores, subset=['Score']), use_container_width=True, hide_index=True)
+                else: st.info("Geen KPIs gevonden.")
 
             # RAPPORTEN
-            st.markdown("---"); st.subheader("📑 Data Scout Rapporten")
-            reports_query = """
-                SELECT m."scheduledDate" as "Datum", sq_h.name as "Thuisploeg", sq_a.name as "Uitploeg", r.position as "Positie", r.label as "Verdict"
-                FROM analysis.scouting_reports r JOIN public.matches m ON r."matchId" = m.id LEFT JOIN public.squads sq_h ON m."homeSquadId" = sq_h.id LEFT JOIN public.squads sq_a ON m."awaySquadId" = sq_a.id
-                WHERE r."iterationId" = %s AND r."playerId" = %s AND m.available = true ORDER BY m."scheduledDate" DESC
-            """
-            try:
-                df_rep = run_query(reports_query, params=(selected_iteration_id, p_player_id))
-                if not df_rep.empty:
-                    c1, c2 = st.columns([2, 1])
-                    with c1: st.dataframe(df_rep, use_container_width=True, hide_index=True)
-                    with c2:
-                        vc = df_rep['Verdict'].value_counts().reset_index(); vc.columns=['Verdict','Aantal']
-                        fig = px.pie(vc, values='Aantal', names='Verdict', hole=0.4, color_discrete_sequence=['#d71920', '#bdc3c7', '#ecf0f1'])
-                        st.plotly_chart(fig, use_container_width=True)
-                else: st.info("Geen rapporten.")
-            except: st.error("Fout bij laden rapporten.")
+            with section("speler/rapporten"):
+                st.markdown("---"); st.subheader("📑 Data Scout Rapporten")
+                try:
+                    if "reports" in page.errors: raise page.errors["reports"]
+                    df_rep = page.reports
+                    if not df_rep.empty:
+                        c1, c2 = st.columns([2, 1])
+                        with c1: st.dataframe(df_rep, use_container_width=True, hide_index=True)
+                        with c2:
+                            vc = df_rep['Verdict'].value_counts().reset_index(); vc.columns=['Verdict','Aantal']
+                            fig = px.pie(vc, values='Aantal', names='Verdict', hole=0.4, color_discrete_sequence=['#d71920', '#bdc3c7', '#ecf0f1'])
+                            st.plotly_chart(fig, use_container_width=True)
+                    else: st.info("Geen rapporten.")
+                except: st.error("Fout bij laden rapporten.")
+
+            # ONTWIKKELING OVER SEIZOENEN
+            st.markdown("---"); st.subheader("📆 Ontwikkeling")
+            trajectory_section(p_player_id, selected_player_name, player_position)
 
             # =========================================================
             # 7. VERGELIJKBARE SPELERS (GEOPTIMALISEERD & GEFILTERD)
             # =========================================================
             st.markdown("---")
             st.subheader("👯 Vergelijkbare Spelers (Op basis van Score & Stijl)")
-            st.caption("Vergelijkt enkel met spelers uit seizoenen '25/26' en '2025' binnen het niveau (+/- 15 punten). Klik op een rij om te navigeren.")
+            st.caption("Vergelijkt met spelers uit de gekozen seizoenen (leeg = alle seizoenen) binnen het niveau (+/- 15 punten). Klik op een rij om te navigeren.")
 
             compare_columns = [col for col, score in profile_mapping.items() if score is not None and score > 0]
-            reverse_mapping = {
-                "KVK Centrale Verdediger": 'cb_kvk_score', "KVK Wingback": 'wb_kvk_score', "KVK Verdedigende Mid.": 'dm_kvk_score',
-                "KVK Centrale Mid.": 'cm_kvk_score', "KVK Aanvallende Mid.": 'acm_kvk_score', "KVK Flank Aanvaller": 'fa_kvk_score',
-                "KVK Spits": 'fw_kvk_score', "Voetballende CV": 'footballing_cb_kvk_score', "Controlerende CV": 'controlling_cb_kvk_score',
-                "Verdedigende Back": 'defensive_wb_kvk_score', "Aanvallende Back": 'offensive_wingback_kvk_score', "Ballenafpakker (CVM)": 'ball_winning_dm_kvk_score',
-                "Spelmaker (CVM)": 'playmaker_dm_kvk_score', "Box-to-Box (CM)": 'box_to_box_cm_kvk_score', "Diepgaande '10'": 'deep_running_acm_kvk_score',
-                "Spelmakende '10'": 'playmaker_off_acm_kvk_score', "Buitenspeler (Binnendoor)": 'fa_inside_kvk_score', "Buitenspeler (Buitenom)": 'fa_wide_kvk_score',
-                "Targetman": 'fw_target_kvk_score', "Lopende Spits": 'fw_running_kvk_score', "Afmaker": 'fw_finisher_kvk_score'
-            }
-            db_cols = [reverse_mapping[c] for c in compare_columns if c in reverse_mapping]
-
-            if db_cols:
-                with st.expander(f"Toon top 10 spelers die lijken op {selected_player_name}", expanded=False):
-                    cols_str = ", ".join([f'a.{c}' for c in db_cols])
-                    
-                    # PERFORMANCE FILTER: AND i.season IN ('25/26', '2025')
-                    sim_query = f"""
-                        SELECT p.id as "playerId", p.commonname as "Naam", sq.name as "Team", i.season as "Seizoen", i."competitionName" as "Competitie", {cols_str}
-                        FROM analysis.final_impect_scores a
-                        JOIN public.players p ON CAST(a."playerId" AS TEXT) = CAST(p.id AS TEXT)
-                        LEFT JOIN public.squads sq ON CAST(a."squadId" AS TEXT) = CAST(sq.id AS TEXT)
-                        JOIN public.iterations i ON CAST(a."iterationId" AS TEXT) = CAST(i.id AS TEXT)
-                        WHERE a.position = %s AND i.season IN ('25/26', '2025')
-                    """
-                    try:
-                        df_all_p = run_query(sim_query, params=(row['position'],))
-                        if not df_all_p.empty:
-                            df_all_p['unique_id'] = df_all_p['playerId'].astype(str) + "_" + df_all_p['Seizoen']
-                            df_all_p = df_all_p.drop_duplicates(subset=['unique_id']).set_index('unique_id')
-                            
-                            curr_uid = f"{p_player_id}_{selected_season}"
-                            
-                            if curr_uid in df_all_p.index:
-                                target_vec = df_all_p.loc[curr_uid, db_cols]
-                                target_avg = target_vec.mean()
-                                others_avg = df_all_p[db_cols].mean(axis=1)
-                                
-                                # Niveau Filter
-                                mask = (others_avg >= (target_avg - 15)) & (others_avg <= (target_avg + 15))
-                                df_filtered = df_all_p[mask]
-                                
-                                if not df_filtered.empty:
-                                    diff = (df_filtered[db_cols] - target_vec).abs().mean(axis=1)
-                                    sim = (100 - diff).sort_values(ascending=False)
-                                    if curr_uid in sim.index: sim = sim.drop(curr_uid)
-                                    
-                                    top_10 = sim.head(10).index
-                                    results = df_filtered.loc[top_10].copy()
-                                    results['Gelijkenis %'] = sim.loc[top_10]
-                                    results['Avg Score'] = others_avg.loc[top_10]
-                                    
-                                    def color_sim(val):
-                                        c = '#2ecc71' if val > 90 else '#27ae60' if val > 80 else 'black'
-                                        w = 'bold' if val > 80 else 'normal'
-                                        return f'color: {c}; font-weight: {w}'
-
-                                    disp_df = results[['Naam', 'Team', 'Seizoen', 'Competitie', 'Avg Score', 'Gelijkenis %']].reset_index(drop=True)
-                                    
-                                    event = st.dataframe(
-                                        disp_df.style.applymap(color_sim, subset=['Gelijkenis %']).format({'Gelijkenis %': '{:.1f}%', 'Avg Score': '{:.1f}'}),
-                                        use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row"
-                                    )
-                                    
-                                    if len(event.selection.rows) > 0:
-                                        idx = event.selection.rows[0]
-                                        cr = disp_df.iloc[idx]
-                                        st.session_state.pending_nav = {"season": cr['Seizoen'], "competition": cr['Competitie'], "target_name": cr['Naam'], "mode": "Spelers"}
-                                        st.rerun()
-                                else: st.warning("Geen spelers van dit niveau gevonden in 25/26 of 2025.")
-                            else: st.warning("Huidige speler niet gevonden in recente seizoenen.")
-                        else: st.info("Geen vergelijkbare spelers in 25/26 of 2025.")
-                    except Exception as e: st.error("Fout bij berekenen."); st.code(e)
+            db_cols = [PROFILE_COLUMNS[c] for c in compare_columns if c in PROFILE_COLUMNS]
+
+            if db_cols: similar_players_section(p_player_id, selected_player_name, selected_iteration_id, player_position, db_cols, seasons_list)
             else: st.info("Geen profielscores.")
         else: st.error("Geen data.")
     except Exception as e: st.error("Fout bij ophalen speler details."); st.code(e)
@@ -374,9 +486,8 @@ if analysis_mode == "Spelers":
 elif analysis_mode == "Teams":
     st.header("🛡️ Team Analyse")
     st.sidebar.header("3. Team Selectie")
-    teams_query = """SELECT DISTINCT sq.name, sq.id as "squadId" FROM public.squads sq JOIN analysis.squad_final_scores s ON sq.id = s."squadId" WHERE s."iterationId" = %s ORDER BY sq.name;"""
     try:
-        df_teams = run_query(teams_query, params=(selected_iteration_id,))
+        with section("team/lijst"): df_teams = run_query(TEAMS_QUERY, params=(selected_iteration_id,))
         team_names = df_teams['name'].tolist()
         selected_team_name = st.sidebar.selectbox("Kies een team:", team_names, key="sb_team")
         candidate = df_teams[df_teams['name'] == selected_team_name]
@@ -392,7 +503,7 @@ elif analysis_mode == "Teams":
         
         if final_squad_id:
             st.divider()
-            t_dets = run_query('SELECT name, "imageUrl" FROM public.squads WHERE id = %s', params=(final_squad_id,))
+            with section("team/details"): t_dets = run_query(SQUAD_DETAILS_QUERY, params=(final_squad_id,))
             if not t_dets.empty:
                 t_row = t_dets.iloc[0]
                 c1, c2 = st.columns([1, 5])
@@ -401,83 +512,167 @@ elif analysis_mode == "Teams":
                 with c2: st.header(f"🛡️ {t_row['name']}")
                 
                 # Profielen
-                st.divider(); st.subheader("📊 Team Profiel Scores")
-                prof_q = 'SELECT profile_name as "Profiel", score as "Score" FROM analysis.squad_profile_scores WHERE "squadId" = %s AND "iterationId" = %s ORDER BY score DESC'
-                try:
-                    df_p = run_query(prof_q, params=(final_squad_id, selected_iteration_id))
-                    if not df_p.empty:
-                        c1, c2 = st.columns([1, 2])
-                        def hl(v): return 'color: #2ecc71; font-weight: bold' if isinstance(v, (int,float)) and v > 66 else ''
-                        with c1: st.dataframe(df_p.style.applymap(hl, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
-                        with c2: 
-                            fig = px.bar(df_p, x='Profiel', y='Score', color_discrete_sequence=['#d71920'])
-                            st.plotly_chart(fig, use_container_width=True)
-                    else: st.info("Geen profielen.")
-                except: st.error("Fout profielen.")
-
-                # Inverted highlight
-                def hl_inv(v): return 'background-color: #e74c3c; color: white; font-weight: bold' if str(v).lower().strip() == 'true' else ''
-
-                # Metrieken
-                with st.expander("📊 Team Impect Scores (Metrieken)", expanded=False):
-                    q = 'SELECT d.name as "Metriek", d.details_label as "Detail", d.inverted as "Inverted", s.final_score_1_to_100 as "Score" FROM analysis.squad_final_scores s JOIN public.squad_score_definitions d ON d.id = REPLACE(s.metric_id, \'s\', \'\') WHERE s."squadId" = %s AND s."iterationId" = %s ORDER BY s.final_score_1_to_100 DESC'
+                with section("team/profiel"):
+                    st.divider(); st.subheader("📊 Team Profiel Scores")
                     try:
-                        df = run_query(q, params=(final_squad_id, selected_iteration_id))
-                        if not df.empty: st.dataframe(df.style.applymap(hl, subset=['Score']).applymap(hl_inv, subset=['Inverted']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
-                        else: st.info("Geen data.")
-                    except: st.error("Fout metrieken.")
-
-                # KPIs
-                with st.expander("📉 Team Impect KPIs (Details)", expanded=False):
-                    q = 'SELECT d.name as "KPI", s.final_score_1_to_100 as "Score" FROM analysis.squadkpi_final_scores s JOIN analysis.kpi_definitions d ON d.id = REPLACE(s.metric_id, \'k\', \'\') WHERE s."squadId" = %s AND s."iterationId" = %s ORDER BY s.final_score_1_to_100 DESC'
-                    try:
-                        df = run_query(q, params=(final_squad_id, selected_iteration_id))
-                        if not df.empty: st.dataframe(df.style.applymap(hl, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
-                        else: st.info("Geen data.")
-                    except: st.error("Fout KPIs.")
-
-                # SIMILARITY (PERFORMANCE FILTER: 25/26 & 2025)
+                        df_p = run_query(SQUAD_PROFILE_QUERY, params=(final_squad_id, selected_iteration_id))
+                        if not df_p.empty:
+                            c1, c2 = st.columns([1, 2])
+                            with c1: st.dataframe(df_p.style.applymap(hl, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+                            with c2: 
+                                fig = px.bar(df_p, x='Profiel', y='Score', color_discrete_sequence=['#d71920'])
+                                st.plotly_chart(fig, use_container_width=True)
+                        else: st.info("Geen profielen.")
+                    except: st.error("Fout profielen.")
+
+                # Metrieken en KPIs: lazy, enkel berekend als de expander open staat
+                team_metrics_section(final_squad_id, selected_iteration_id)
+                team_kpis_section(final_squad_id, selected_iteration_id)
+
+                # SIMILARITY (GECACHETE SQUAD x PROFIEL MATRIX, ALLE SEIZOENEN)
                 st.markdown("---"); st.subheader("🤝 Vergelijkbare Teams")
-                st.caption("Vergelijkt enkel met teams uit seizoenen '25/26' en '2025'.")
-                
-                all_prof_q = """
-                    SELECT s."squadId", sq.name as "Team", i.season as "Seizoen", i."competitionName" as "Competitie", s.profile_name, s.score 
-                    FROM analysis.squad_profile_scores s 
-                    JOIN public.squads sq ON s."squadId" = sq.id 
-                    JOIN public.iterations i ON s."iterationId" = i.id
-                    WHERE i.season IN ('25/26', '2025')
-                """
-                try:
-                    df_all = run_query(all_prof_q)
-                    if not df_all.empty:
-                        df_piv = df_all.pivot_table(index=['squadId', 'Team', 'Seizoen', 'Competitie'], columns='profile_name', values='score').fillna(0)
-                        curr_seas = selected_season
-                        
-                        if (final_squad_id, t_row['name'], curr_seas, selected_competition) in df_piv.index:
-                            target = df_piv.loc[(final_squad_id, t_row['name'], curr_seas, selected_competition)]
-                            diff = (df_piv - target).abs().mean(axis=1)
-                            sim = (100 - diff).sort_values(ascending=False)
-                            sim = sim[sim.index != (final_squad_id, t_row['name'], curr_seas, selected_competition)]
-                            
-                            top5 = sim.head(5).reset_index(); top5.columns = ['ID', 'Team', 'Seizoen', 'Competitie', 'Gelijkenis %']
-                            def c_sim(v): 
-                                c = '#2ecc71' if v > 90 else '#27ae60' if v > 80 else 'black'
-                                w = 'bold' if v > 80 else 'normal'
-                                return f'color: {c}; font-weight: {w}'
-                            
-                            disp = top5[['Team', 'Seizoen', 'Competitie', 'Gelijkenis %']]
-                            ev = st.dataframe(disp.style.applymap(c_sim, subset=['Gelijkenis %']).format({'Gelijkenis %': '{:.1f}%'}), use_container_width=True, hide_index=True, on_select="rerun", selection_mode="single-row")
-                            
-                            if len(ev.selection.rows) > 0:
-                                idx = ev.selection.rows[0]; cr = disp.iloc[idx]
-                                st.session_state.pending_nav = {"season": cr['Seizoen'], "competition": cr['Competitie'], "target_name": cr['Team'], "mode": "Teams"}
-                                st.rerun()
-                        else: st.warning("Team niet gevonden in recente data.")
-                    else: st.info("Geen teams gevonden in 25/26 of 2025.")
-                except Exception as e: st.error("Fout similarity."); st.code(e)
+                st.caption("Vergelijkt met teams uit de gekozen seizoenen (leeg = alle seizoenen). Klik op een rij om te navigeren.")
+                similar_teams_section(final_squad_id, selected_season, selected_competition, seasons_list)
             else: st.error("Team details fout.")
     except Exception as e: st.error("Teamlijst fout."); st.code(e)
 
+# =============================================================================
+# C. RANGLIJST MODUS
+# =============================================================================
+elif analysis_mode == "Ranglijst":
+    st.header("🏆 Ranglijst per Positie")
+    st.sidebar.header("3. Ranglijst")
+    lb_group = st.sidebar.selectbox("Positie:", list(POSITION_GROUPS), format_func=POSITION_GROUP_LABELS.get, key="lb_group")
+    lb_kind = st.sidebar.radio("Rangschikken op:", KINDS, horizontal=True, key="lb_kind")
+    try:
+        lb_options = score_options(lb_kind, lb_group)
+    except Exception as e: st.error("Fout bij laden scores."); st.code(e); st.stop()
+    if not lb_options: st.info(f"Geen {lb_kind.lower()}en voor deze positie."); st.stop()
+    lb_key = st.sidebar.selectbox("Score:", list(lb_options), format_func=lb_options.get, key="lb_key")
+    lb_competitions = st.sidebar.multiselect("Competities:", competitions_list, placeholder="Alle competities", key="lb_competitions")
+    lb_age = st.sidebar.slider("Leeftijd:", *AGE_BOUNDS, AGE_BOUNDS, key="lb_age")
+    lb_page_size = st.sidebar.selectbox("Per pagina:", [25, 50, 100], index=1, key="lb_page_size")
+
+    # Per competitie de standaard (recentste) iteratie van het gekozen seizoen
+    lb_iterations = [i for i in (catalog.default_iteration(selected_season, c) for c in lb_competitions or competitions_list) if i is not None]
+    st.caption(f"{lb_options[lb_key]} · {POSITION_GROUP_LABELS[lb_group]} · {selected_season} · {', '.join(lb_competitions) or 'alle competities'}. Klik op een rij om naar de speler te gaan.")
+    leaderboard_section(lb_kind, lb_key, lb_iterations, lb_group, lb_age, lb_page_size)
+
+# =============================================================================
+# D. SHORTLIST MODUS
+# =============================================================================
+elif analysis_mode == "Shortlist":
+    st.header("⭐ Shortlist")
+    st.sidebar.header("3. Shortlist")
+    st.sidebar.download_button("💾 Shortlist bewaren (JSON)", sl.shortlist_json(), file_name="shortlist.json", mime="application/json", disabled=not sl.get_shortlist())
+    upload = st.sidebar.file_uploader("Shortlist laden:", type="json", key="sl_upload")
+    if upload is not None and st.session_state.get("sl_loaded") != upload.file_id:
+        try:
+            st.sidebar.success(f"{sl.load_shortlist_json(upload.getvalue().decode())} spelers toegevoegd.")
+            st.session_state.sl_loaded = upload.file_id
+        except Exception as e: st.sidebar.error("Ongeldig bestand."); st.sidebar.code(e)
+
+    members = sl.get_shortlist()
+    if not members: st.info("De shortlist is leeg. Voeg spelers toe met ⭐ Op shortlist op de spelerpagina."); st.stop()
+
+    with section("shortlist/spelers"):
+        st.subheader(f"📋 {len(members)} spelers")
+        df_members = pd.DataFrame(members)
+        event = st.dataframe(df_members[['Naam', 'Team', 'Seizoen', 'Competitie', 'position']], use_container_width=True, hide_index=True, on_select="rerun", selection_mode="multi-row", key="sl_members")
+        if st.button("🗑️ Verwijder geselecteerde", disabled=not event.selection.rows):
+            sl.remove_from_shortlist(*(sl.member_key(members[i]) for i in event.selection.rows))
+            st.rerun()
+
+    try:
+        with section("shortlist/profielen"): vectors = sl.shortlist_vectors(members)
+    except Exception as e: st.error("Fout bij laden profielscores."); st.code(e); st.stop()
+
+    with section("shortlist/gelijkenis"):
+        st.markdown("---"); st.subheader("🔗 Onderlinge Gelijkenis")
+        if len(members) > 1:
+            sim = sl.pairwise_similarity(members, vectors)
+            fig = px.imshow(sim, text_auto=".0f", color_continuous_scale=["#ecf0f1", "#d71920"], zmin=0, zmax=100, aspect="auto")
+            fig.update_layout(height=max(400, 28 * len(members)), xaxis_title=None, yaxis_title=None)
+            st.plotly_chart(fig, use_container_width=True)
+        else: st.info("Voeg minstens twee spelers toe.")
+
+    with section("shortlist/naast_elkaar"):
+        st.markdown("---"); st.subheader("📊 Naast Elkaar")
+        tab_p, tab_m = st.tabs(["Profielen", "Metrieken & KPIs"])
+        with tab_p:
+            grid = sl.profile_grid(members, vectors)
+            if not grid.empty: st.dataframe(grid.style.applymap(hl).format('{:.1f}', na_rep='-'), use_container_width=True)
+            else: st.info("Geen profielscores.")
+        with tab_m:
+            try:
+                grid = sl.metric_grid(members)
+                if not grid.empty: st.dataframe(grid.style.applymap(hl).format('{:.1f}', na_rep='-'), use_container_width=True)
+                else: st.info("Geen data.")
+            except Exception as e: st.error("Fout bij laden metrieken."); st.code(e)
+
+    st.markdown("---"); st.subheader("👯 Vergelijkbare Spelers per Shortlistspeler")
+    st.caption("Per shortlistspeler de meest gelijkende spelers van dezelfde positie binnen het niveau (+/- 15 punten), zonder de shortlist zelf. Klik op een rij om te navigeren.")
+    shortlist_neighbours_section(members, vectors, seasons_list)
+
+# =============================================================================
+# E. COACHES MODUS
+# =============================================================================
 elif analysis_mode == "Coaches":
     st.header("👔 Coach Analyse")
-    st.warning("🚧 Work in Progress")
+    st.sidebar.header("3. Coach Selectie")
+    # Enkel voorberekende aggregaten per coachperiode (zie coaches.py en migrate.py refresh)
+    try:
+        with section("coach/index"): coach_index = coaches.load_coach_index()
+    except Exception as e: st.error("Fout bij laden coaches."); st.code(e); st.stop()
+    if not len(coach_index): st.info("Nog geen coachdata. Draai `python migrate.py up` en `python migrate.py refresh` zodra de ETL coachperiodes aanlevert."); st.stop()
+
+    st.session_state.setdefault("sb_coach_here", True)
+    coach_here = st.sidebar.checkbox(f"Enkel coaches uit {selected_competition} ({selected_season})", key="sb_coach_here")
+    coach_ids = coach_index.coaches(catalog.iteration_ids(selected_season, selected_competition) if coach_here else None)
+    if not coach_ids: st.info("Geen coaches voor deze competitie."); st.stop()
+    if st.session_state.get("sb_coach") not in coach_ids: st.session_state.pop("sb_coach", None)
+    coach_id = st.sidebar.selectbox("Kies een coach:", coach_ids, format_func=coach_index.name, key="sb_coach")
+
+    tenures = coach_index.tenures_of(coach_id)
+    st.divider(); st.header(f"👔 {coach_index.name(coach_id)}")
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Periodes", len(tenures))
+    c2.metric("Teams", tenures['Team'].nunique())
+    c3.metric("Wedstrijden", int(tenures['Wedstrijden'].sum()))
+
+    with section("coach/periodes"):
+        st.dataframe(tenures[['Team', 'Van', 'Tot', 'Wedstrijden']], use_container_width=True, hide_index=True)
+
+    # Profielen: gewogen over alle periodes, en per periode naast elkaar
+    with section("coach/profiel"):
+        st.divider(); st.subheader("📊 Coach Profiel Scores")
+        st.caption("Gemiddelde van de ploegprofielen over de periodes van de coach, gewogen naar het aantal wedstrijden.")
+        try:
+            tab_all, tab_tenure = st.tabs(["Gewogen", "Per periode"])
+            with tab_all:
+                df_p = coach_index.profile(coach_id)
+                if not df_p.empty:
+                    c1, c2 = st.columns([1, 2])
+                    with c1: st.dataframe(df_p.style.applymap(hl, subset=['Score']).format({'Score': '{:.1f}'}), use_container_width=True, hide_index=True)
+                    with c2:
+                        fig = px.bar(df_p, x='Profiel', y='Score', color_discrete_sequence=['#d71920'])
+                        st.plotly_chart(fig, use_container_width=True)
+                else: st.info("Geen profielen.")
+            with tab_tenure:
+                grid = coaches.tenure_profiles(tenures)
+                if not grid.empty: st.dataframe(grid.style.applymap(hl).format('{:.1f}', na_rep='-'), use_container_width=True)
+                else: st.info("Geen profielen.")
+        except Exception as e: st.error("Fout profielen."); st.code(e)
+
+    # Metrieken en KPIs: lazy, enkel berekend als de expander open staat
+    coach_scores_section(tenures, coaches.KIND_METRIC)
+    coach_scores_section(tenures, coaches.KIND_KPI)
+
+    st.markdown("---"); st.subheader("🤝 Vergelijkbare Coaches")
+    st.caption("Vergelijkt het gewogen profiel met dat van alle andere coaches. Klik op een rij om te navigeren.")
+    similar_coaches_section(coach_id, selected_season, selected_competition)
+
+# -----------------------------------------------------------------------------
+# 6. DEBUG PANEEL (opt-in: ?debug=1 of [metrics] panel = true in secrets)
+# -----------------------------------------------------------------------------
+render_debug_panel()
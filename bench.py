@@ -0,0 +1,343 @@
+"""End-to-end benchmark van alle pagina's van app.py, zonder browser.
+
+    python bench.py --samples 30
+    python bench.py --samples 30 --json bench.json          # resultaat bewaren
+    python bench.py --samples 30 --baseline bench.json      # vergelijken, exit 1 bij regressie
+
+app.py zelf draait via streamlit.testing (AppTest): elke modus, elke expander en elke
+knop gaat door de echte paginacode, dus ook secties die later bijkomen. Een exceptie of
+st.error op een pagina laat de benchmark falen. Zelfde databron als de app (Postgres uit
+st.secrets, of KVK_DATA_SOURCE=snapshot); testdata zonder productietoegang: zie synthdata.py.
+Per stap (één run van app.py): aantal queries, latency-percentielen (koud = lege caches,
+warm = nieuwe sessie meteen erna) en piekgeheugen (tracemalloc, aparte run zodat het de
+tijden niet beïnvloedt). Warm-up en prefetch staan uit: die zouden de koude runs vullen.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from catalog import load_iteration_catalog
+from coaches import load_coach_index
+from db import QUERY_OBSERVERS, cached_query, clear_query_cache, data_source, result_cache
+from player_page import PLAYERS_QUERY
+from search import load_player_search_index
+from similarity import load_player_similarity_index, load_squad_similarity_index
+from team_page import TEAMS_QUERY
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+RUN_TIMEOUT = 120
+
+# Regressie pas vanaf dit verschil in ms, anders is ruis op snelle stappen al "+25%"
+NOISE_FLOOR_MS = 5.0
+
+SHORTLIST_SIZE = 8
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, query, params, seconds, result):
+        with self._lock:
+            self.count += 1
+
+
+def clear_caches():
+    clear_query_cache()
+    for loader in (load_iteration_catalog, load_player_similarity_index, load_squad_similarity_index,
+                   load_player_search_index, load_coach_index):
+        loader.clear()
+
+
+def app_secrets():
+    # AppTest vervangt st.secrets volledig: de echte secrets meegeven, zonder warm-up en
+    # prefetch (achtergrondqueries zouden meetellen in de stap die toevallig loopt)
+    try:
+        secrets = st.secrets.to_dict()
+    except Exception:
+        secrets = {}
+    secrets["cache"] = {**secrets.get("cache", {}), "warm_up": False}
+    secrets["prefetch"] = {**secrets.get("prefetch", {}), "enabled": False}
+    return secrets
+
+
+# -----------------------------------------------------------------------------
+# SCENARIO'S: STAPPEN DIE EEN GEBRUIKER ZET, ELK EEN RUN VAN APP.PY
+# -----------------------------------------------------------------------------
+# Een scenario geeft de navigatie (zoals een klik in de app, zie pending_nav in app.py),
+# de sessie-state vooraf en de stappen: (naam, actie op de AppTest vóór de run).
+
+def open_expander(key):
+    def action(at):
+        at.session_state[key] = True
+    return action
+
+
+def click(key):
+    def action(at):
+        at.button(key=key).click()
+    return action
+
+
+def nothing(at):
+    pass
+
+
+def spelers_scenario(sample):
+    nav = {"season": sample["season"], "competition": sample["competition"], "iteration_id": sample["iteration_id"],
+           "target_name": sample["player_name"], "squad_name": sample["squad_name"], "mode": "Spelers"}
+    return nav, {}, [
+        ("spelerpagina", nothing),
+        ("ontwikkeling", open_expander("exp_trajectory")),
+        ("vergelijkbare spelers", open_expander("exp_similar_players")),
+    ]
+
+
+def teams_scenario(sample):
+    nav = {"season": sample["season"], "competition": sample["competition"], "iteration_id": sample["iteration_id"],
+           "target_name": sample["team_name"], "mode": "Teams"}
+    return nav, {}, [
+        ("teampagina", nothing),
+        ("team metrieken", open_expander("exp_team_metrics")),
+        ("team KPIs", open_expander("exp_team_kpis")),
+    ]
+
+
+def ranglijst_scenario(sample):
+    nav = {"season": sample["season"], "competition": sample["competition"], "iteration_id": sample["iteration_id"], "mode": "Ranglijst"}
+    return nav, {}, [
+        ("ranglijst", nothing),
+        ("volgende pagina", click("lb_next")),
+    ]
+
+
+def shortlist_scenario(sample):
+    nav = {"season": sample["season"], "competition": sample["competition"], "iteration_id": sample["iteration_id"], "mode": "Shortlist"}
+    return nav, {"shortlist": [dict(m) for m in sample["shortlist"]]}, [
+        ("shortlist", nothing),
+    ]
+
+
+def coaches_scenario(sample):
+    nav = {"season": sample["season"], "competition": sample["competition"], "iteration_id": sample["iteration_id"],
+           "target_name": sample["coach_id"], "mode": "Coaches"}
+    return nav, {}, [
+        ("coachpagina", nothing),
+        ("coach metrieken", open_expander("exp_coach_metrics")),
+        ("coach KPIs", open_expander("exp_coach_kpis")),
+    ]
+
+
+SCENARIOS = {
+    "Spelers": spelers_scenario, "Teams": teams_scenario, "Ranglijst": ranglijst_scenario,
+    "Shortlist": shortlist_scenario, "Coaches": coaches_scenario,
+}
+
+
+def pick_samples(n, seed):
+    # Willekeurige (iteratie, speler, ploeg, shortlist, coach) combinaties uit de echte catalogus
+    rng = np.random.default_rng(seed)
+    catalog = load_iteration_catalog()
+    keys = [(s, c) for s in catalog.seasons for c in catalog.competitions(s)]
+    coach_index = load_coach_index()
+    samples = []
+    for _ in range(n * 5):
+        if len(samples) == n:
+            break
+        season, competition = keys[rng.integers(len(keys))]
+        iteration_id = catalog.default_iteration(season, competition)
+        players = cached_query(PLAYERS_QUERY, (iteration_id,))
+        teams = cached_query(TEAMS_QUERY, (iteration_id,))
+        if players.empty or teams.empty:
+            continue
+        # Namen die meer dan één keer voorkomen zijn niet eenduidig te kiezen in de sidebar
+        players = players[~players.duplicated(["commonname", "squadName"], keep=False) & players["position"].notna()]
+        if players.empty:
+            continue
+        p = players.iloc[rng.integers(len(players))]
+        picked = players.iloc[rng.choice(len(players), min(SHORTLIST_SIZE, len(players)), replace=False)]
+        coaches = coach_index.coaches(catalog.iteration_ids(season, competition))
+        samples.append({
+            "season": season, "competition": competition, "iteration_id": str(iteration_id),
+            "player_name": p["commonname"], "squad_name": p["squadName"],
+            "team_name": teams.iloc[rng.integers(len(teams))]["name"],
+            "shortlist": [
+                {"playerId": str(m["playerId"]), "iterationId": str(iteration_id), "Naam": m["commonname"], "Team": m["squadName"],
+                 "Seizoen": season, "Competitie": competition, "position": m["position"]}
+                for _, m in picked.iterrows()
+            ],
+            "coach_id": coaches[rng.integers(len(coaches))] if coaches else None,
+        })
+    return samples
+
+
+# -----------------------------------------------------------------------------
+# METEN
+# -----------------------------------------------------------------------------
+
+def page_errors(at):
+    return [str(getattr(e, "value", e)) for e in list(at.exception) + list(at.error)]
+
+
+def run_scenario(name, sample, counter, record, failures, memory=None):
+    nav, state, steps = SCENARIOS[name](sample)
+    at = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+    at.secrets.update(app_secrets())
+    at.session_state["pending_nav"] = nav
+    for key, value in state.items():
+        at.session_state[key] = value
+    total, queries = 0.0, 0
+    for step, action in steps:
+        action(at)
+        before = counter.count
+        if memory is not None:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        at.run()
+        elapsed = time.perf_counter() - t0
+        if memory is not None:
+            memory[f"{name} / {step}"] = max(memory.get(f"{name} / {step}", 0), tracemalloc.get_traced_memory()[1] - base)
+        for error in page_errors(at):
+            failures.append(f"{name} / {step} ({sample['competition']} {sample['season']}): {error}")
+        record(f"{name} / {step}", elapsed, counter.count - before)
+        total += elapsed
+        queries += counter.count - before
+    record(f"{name} / totaal", total, queries)
+
+
+def benchmark(samples, scenarios):
+    counter = QueryCounter()
+    QUERY_OBSERVERS.append(counter)
+    timings, failures = {}, []
+
+    def recorder(phase):
+        def record(step, seconds, queries):
+            t = timings.setdefault(step, {"cold": [], "warm": [], "cold_queries": [], "warm_queries": []})
+            t[phase].append(seconds * 1000)
+            t[f"{phase}_queries"].append(queries)
+        return record
+
+    try:
+        # Piekgeheugen: één koude run per scenario met tracemalloc aan
+        memory = {}
+        tracemalloc.start()
+        try:
+            for name in scenarios:
+                clear_caches()
+                run_scenario(name, samples[0], counter, lambda *a: None, failures, memory)
+        finally:
+            tracemalloc.stop()
+
+        for sample in samples:
+            for name in scenarios:
+                clear_caches()
+                run_scenario(name, sample, counter, recorder("cold"), failures)
+                run_scenario(name, sample, counter, recorder("warm"), failures)
+    finally:
+        QUERY_OBSERVERS.remove(counter)
+
+    def pct(values):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2), "max": round(float(max(values)), 2)}
+
+    steps = {}
+    for step, t in timings.items():
+        steps[step] = {
+            "queries": int(max(t["cold_queries"])),
+            "warm_queries": int(max(t["warm_queries"])),
+            "cold_ms": pct(t["cold"]),
+            "warm_ms": pct(t["warm"]),
+        }
+        if step in memory:
+            steps[step]["peak_mb"] = round(memory[step] / 2**20, 2)
+        elif step.endswith("/ totaal"):
+            prefix = step.rsplit("/", 1)[0]
+            steps[step]["peak_mb"] = round(max(v for k, v in memory.items() if k.startswith(prefix)) / 2**20, 2)
+    return steps, failures
+
+
+def print_report(steps):
+    print(f"{'stap':<36}{'queries':>8}{'koud p50':>10}{'p95':>9}{'p99':>9}{'warm p50':>10}{'p95':>9}{'piek MB':>9}")
+    for step, s in steps.items():
+        c, w = s["cold_ms"], s["warm_ms"]
+        print(f"{step:<36}{s['queries']:>8}{c['p50']:>10.1f}{c['p95']:>9.1f}{c['p99']:>9.1f}{w['p50']:>10.1f}{w['p95']:>9.1f}{s.get('peak_mb', 0):>9.1f}")
+
+
+def compare(steps, baseline, tolerance):
+    regressions = []
+    for step, s in steps.items():
+        old = baseline["steps"].get(step)
+        if old is None:
+            continue
+        if s["queries"] > old["queries"]:
+            regressions.append(f"{step}: {old['queries']} -> {s['queries']} queries")
+        if s["warm_queries"] > old["warm_queries"]:
+            regressions.append(f"{step}: warm {old['warm_queries']} -> {s['warm_queries']} queries (cache?)")
+        for phase in ("cold_ms", "warm_ms"):
+            new_p95, old_p95 = s[phase]["p95"], old[phase]["p95"]
+            if new_p95 > old_p95 * (1 + tolerance) and new_p95 - old_p95 > NOISE_FLOOR_MS:
+                regressions.append(f"{step}: {phase[:-3]} p95 {old_p95:.1f} -> {new_p95:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark van alle pagina's van app.py.")
+    parser.add_argument("--samples", type=int, default=20, help="aantal willekeurige speler/team selecties")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mode", choices=list(SCENARIOS), action="append", help="enkel deze modus (herhaalbaar)")
+    parser.add_argument("--json", help="resultaat wegschrijven naar dit bestand")
+    parser.add_argument("--baseline", help="vergelijk met een eerder --json resultaat")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="toegelaten vertraging t.o.v. baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    samples = pick_samples(args.samples, args.seed)
+    if not samples:
+        sys.exit("Geen spelers/teams gevonden in de databron.")
+    steps, failures = benchmark(samples, args.mode or list(SCENARIOS))
+    print_report(steps)
+    for failure in dict.fromkeys(failures):
+        print(f"FOUT {failure}")
+    # ru_maxrss is in KB op Linux
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"\n{len(samples)} samples, databron {data_source()}, max RSS {max_rss_mb:.0f} MB")
+    cache = result_cache().stats()
+    print(f"Resultaten cache: {cache['entries']} resultaten, {cache['bytes'] / 2**20:.1f} MB (zonder compacte types {cache['raw_bytes'] / 2**20:.1f} MB)")
+
+    result = {
+        "meta": {
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(), "samples": len(samples), "seed": args.seed,
+            "data_source": data_source(), "python": platform.python_version(), "max_rss_mb": round(max_rss_mb, 1),
+            "cache_mb": round(cache["bytes"] / 2**20, 2), "cache_raw_mb": round(cache["raw_bytes"] / 2**20, 2),
+        },
+        "steps": steps,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(steps, json.load(f), args.tolerance)
+        for r in regressions:
+            print(f"REGRESSIE {r}")
+        if regressions:
+            sys.exit(1)
+        print("Geen regressies t.o.v. de baseline.")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
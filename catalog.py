@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+import streamlit as st
+
+from db import fetch_dataframe, versioned
+
+# -----------------------------------------------------------------------------
+# ITERATIE CATALOGUS (SEIZOEN -> COMPETITIES -> ITERATIES)
+# -----------------------------------------------------------------------------
+# public.iterations is klein en wijzigt enkel bij de ETL. We laden de hele tabel één
+# keer en beantwoorden alle sidebar-vragen uit het geheugen. Meerdere iteraties voor
+# dezelfde seizoen/competitie worden gesorteerd i.p.v. willekeurig (LIMIT 1) gekozen.
+
+
+ITERATIONS_QUERY = 'SELECT id, season, "competitionName" FROM public.iterations'
+
+
+def _id_sort_key(iteration_id):
+    return (0, int(iteration_id), "") if iteration_id.isdigit() else (1, 0, iteration_id)
+
+
+@dataclass(frozen=True)
+class IterationCatalog:
+    seasons: tuple
+    competitions_by_season: dict   # seizoen -> tuple van competities (alfabetisch)
+    iterations_by_key: dict        # (seizoen, competitie) -> tuple van ids (oplopend)
+    key_by_iteration: dict         # id -> (seizoen, competitie)
+
+    @classmethod
+    def from_frame(cls, df):
+        iterations_by_key, key_by_iteration = {}, {}
+        for iteration_id, season, competition in df[["id", "season", "competitionName"]].itertuples(index=False):
+            if season is None or competition is None:
+                continue
+            iteration_id = str(iteration_id)
+            iterations_by_key.setdefault((season, competition), []).append(iteration_id)
+            key_by_iteration[iteration_id] = (season, competition)
+
+        competitions_by_season = {}
+        for season, competition in iterations_by_key:
+            competitions_by_season.setdefault(season, []).append(competition)
+        return cls(
+            seasons=tuple(sorted(competitions_by_season, reverse=True)),
+            competitions_by_season={s: tuple(sorted(c)) for s, c in competitions_by_season.items()},
+            iterations_by_key={k: tuple(sorted(v, key=_id_sort_key)) for k, v in iterations_by_key.items()},
+            key_by_iteration=key_by_iteration,
+        )
+
+    def competitions(self, season):
+        return self.competitions_by_season.get(season, ())
+
+    def iteration_ids(self, season, competition):
+        return self.iterations_by_key.get((season, competition), ())
+
+    def default_iteration(self, season, competition):
+        # Hoogste id = meest recente iteratie
+        ids = self.iteration_ids(season, competition)
+        return ids[-1] if ids else None
+
+    def locate(self, iteration_id):
+        return self.key_by_iteration.get(str(iteration_id))
+
+
+@versioned
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def load_iteration_catalog(version):
+    return IterationCatalog.from_frame(fetch_dataframe(ITERATIONS_QUERY))
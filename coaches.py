@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import cached_query, compact_frame, fetch_dataframe, run_parallel, versioned
+
+# -----------------------------------------------------------------------------
+# COACHES: PROFIELEN OVER DE PERIODES VAN EEN COACH
+# -----------------------------------------------------------------------------
+# De app aggregeert hier niets op wedstrijdniveau: `python migrate.py refresh` houdt per
+# coachperiode compacte, naar wedstrijden gewogen gemiddelden van de ploegprofielen,
+# -metrieken en -KPIs bij (migrations/007). Een coachprofiel is het gewogen gemiddelde van
+# zijn periodes: een paar rijen per coach. Vergelijken gaat zoals bij de teams: één matrix
+# coach x profiel (ontbrekend = 0), gelijkenis = 100 - gemiddelde absolute afwijking.
+
+KIND_PROFILE, KIND_METRIC, KIND_KPI = 0, 1, 2
+
+COACH_TENURES_QUERY = """
+    SELECT t.tenure_id, t."coachId", t.name as "Coach", sq.name as "Team", t.start_date as "Van", t.end_date as "Tot", t.matches as "Wedstrijden"
+    FROM analysis.coach_tenure_summary t
+    LEFT JOIN public.squads sq ON sq.id = t."squadId"
+    ORDER BY t.name, t.start_date
+"""
+
+COACH_ITERATIONS_QUERY = 'SELECT tenure_id, "iterationId", matches FROM analysis.coach_tenure_iterations'
+
+COACH_PROFILES_QUERY = """
+    SELECT t."coachId", s.key as profile_name, sum(s.score * t.matches) / sum(t.matches) as score
+    FROM analysis.coach_tenure_scores s
+    JOIN analysis.coach_tenure_summary t ON t.tenure_id = s.tenure_id
+    WHERE s.kind = 0 AND t.matches > 0
+    GROUP BY 1, 2
+"""
+
+# Scores van de periodes van één coach, met de namen uit de definities
+COACH_SCORES_QUERY = """
+    SELECT s.tenure_id, s.kind, COALESCE(md.name, kd.name, s.key) as name, md.details_label as "Detail", md.inverted as "Inverted", s.score as "Score"
+    FROM analysis.coach_tenure_scores s
+    LEFT JOIN public.squad_score_definitions md ON s.kind = 1 AND md.id = s.key
+    LEFT JOIN analysis.kpi_definitions kd ON s.kind = 2 AND kd.id = s.key
+    WHERE s.tenure_id IN %s
+"""
+
+
+class CoachIndex:
+    def __init__(self, tenures, iterations, profiles):
+        self.tenures = compact_frame(tenures.astype({"coachId": str}).reset_index(drop=True))
+        self.names = dict(zip(self.tenures["coachId"], self.tenures["Coach"].astype(object).fillna("Onbekend")))
+        self.teams = {
+            coach_id: ", ".join(dict.fromkeys(t for t in teams if isinstance(t, str)))
+            for coach_id, teams in self.tenures.groupby("coachId", observed=True)["Team"]
+        }
+        by_tenure = dict(zip(self.tenures["tenure_id"], self.tenures["coachId"]))
+        self.coaches_by_iteration = {}
+        for tenure_id, iteration_id in zip(iterations["tenure_id"], iterations["iterationId"].astype(str)):
+            self.coaches_by_iteration.setdefault(iteration_id, set()).add(by_tenure.get(tenure_id))
+
+        # Coach x profiel matrix (zelfde opbouw als SquadSimilarityIndex)
+        profiles = profiles.astype({"coachId": str})
+        coach_codes, coach_ids = pd.factorize(profiles["coachId"])
+        prof_codes, self.profiles = pd.factorize(profiles["profile_name"])
+        self.scores = np.zeros((len(coach_ids), len(self.profiles)), dtype=np.float32)
+        self.scores[coach_codes, prof_codes] = profiles["score"].to_numpy(dtype=np.float32, na_value=0)
+        self.row_of = {coach_id: i for i, coach_id in enumerate(coach_ids)}
+        self.coach_ids = list(coach_ids)
+
+    def __len__(self):
+        return len(self.tenures)
+
+    def name(self, coach_id):
+        return self.names.get(str(coach_id), str(coach_id))
+
+    def coaches(self, iteration_ids=None):
+        # Alle coaches (alfabetisch), of enkel wie een periode had in één van deze iteraties
+        ids = self.names if iteration_ids is None else set().union(*(self.coaches_by_iteration.get(str(i), set()) for i in iteration_ids)) - {None}
+        return sorted(ids, key=lambda c: (self.name(c), c))
+
+    def tenures_of(self, coach_id):
+        return self.tenures[self.tenures["coachId"] == str(coach_id)].reset_index(drop=True)
+
+    def profile(self, coach_id):
+        row = self.row_of.get(str(coach_id))
+        if row is None:
+            return pd.DataFrame(columns=["Profiel", "Score"])
+        df = pd.DataFrame({"Profiel": self.profiles, "Score": self.scores[row].astype(float)})
+        return df.sort_values("Score", ascending=False).reset_index(drop=True)
+
+    def most_similar(self, coach_id, k=5):
+        row = self.row_of.get(str(coach_id))
+        if row is None:
+            return None
+        sim = 100 - np.abs(self.scores - self.scores[row]).mean(axis=1)
+        mask = np.ones(len(sim), dtype=bool)
+        mask[row] = False
+        candidates = np.flatnonzero(mask)
+
+        sim = sim[candidates]
+        if len(candidates) > k:
+            part = np.argpartition(-sim, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        order = part[np.argsort(-sim[part], kind="stable")]
+        top = [self.coach_ids[i] for i in candidates[order]]
+
+        return pd.DataFrame({
+            "coachId": top,
+            "Coach": [self.name(c) for c in top],
+            "Teams": [self.teams.get(c, "") for c in top],
+            "Gelijkenis %": sim[order].astype(float),
+        })
+
+
+@versioned
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def load_coach_index(version):
+    results, errors = run_parallel({
+        "tenures": lambda: fetch_dataframe(COACH_TENURES_QUERY),
+        "iterations": lambda: fetch_dataframe(COACH_ITERATIONS_QUERY),
+        "profiles": lambda: fetch_dataframe(COACH_PROFILES_QUERY),
+    })
+    if errors:
+        raise next(iter(errors.values()))
+    return CoachIndex(results["tenures"], results["iterations"], results["profiles"])
+
+
+def coach_scores(tenures, kind):
+    # Metrieken of KPIs van een coach: gemiddelde van zijn periodes, gewogen naar wedstrijden
+    if tenures.empty:
+        return pd.DataFrame()
+    df = cached_query(COACH_SCORES_QUERY, (tuple(tenures["tenure_id"]),))
+    df = df[df["kind"] == kind].merge(tenures[["tenure_id", "Wedstrijden"]], on="tenure_id")
+    df = df[df["Wedstrijden"] > 0]
+    if df.empty:
+        return pd.DataFrame()
+    columns = ["name", "Detail", "Inverted"] if kind == KIND_METRIC else ["name"]
+    df = df.assign(weighted=df["Score"] * df["Wedstrijden"])
+    out = df.groupby(columns, dropna=False, sort=False, observed=True)[["weighted", "Wedstrijden"]].sum().reset_index()
+    out["Score"] = out["weighted"] / out["Wedstrijden"]
+    label = "Metriek" if kind == KIND_METRIC else "KPI"
+    return out[columns + ["Score"]].rename(columns={"name": label}).sort_values("Score", ascending=False).reset_index(drop=True)
+
+
+def tenure_profiles(tenures):
+    # Profiel per periode naast elkaar (één kolom per periode)
+    if tenures.empty:
+        return pd.DataFrame()
+    df = cached_query(COACH_SCORES_QUERY, (tuple(tenures["tenure_id"]),))
+    df = df[df["kind"] == KIND_PROFILE]
+    if df.empty:
+        return pd.DataFrame()
+    labels = {t.tenure_id: f"{t.Team or 'Onbekend'} ({t.Van}–{t.Tot or 'nu'})" for t in tenures.itertuples()}
+    df = df.assign(periode=df["tenure_id"].astype(str).map(labels))
+    table = df.pivot_table(index="name", columns="periode", values="Score", aggfunc="mean", observed=True)
+    return table[[label for label in labels.values() if label in table.columns]].rename_axis(index="Profiel", columns=None)
@@ -0,0 +1,490 @@
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
+import streamlit as st
+import numpy as np
+import pandas as pd
+import psycopg2
+import psycopg2.pool
+
+# -----------------------------------------------------------------------------
+# INSTELLINGEN
+# -----------------------------------------------------------------------------
+
+def setting(section, key, default=None):
+    # st.secrets zonder secrets.toml gooit een fout; offline (laptop) is dat geen probleem
+    try:
+        return st.secrets.get(section, {}).get(key, default)
+    except Exception:
+        return default
+
+
+# Databron: "postgres" (standaard) of "snapshot" (lokale Arrow export, zie snapshot.py).
+# KVK_DATA_SOURCE / KVK_SNAPSHOT_DIR hebben voorrang op [data] in secrets.
+def data_source():
+    return os.environ.get("KVK_DATA_SOURCE") or setting("data", "source", "postgres")
+
+
+def snapshot_dir():
+    return os.environ.get("KVK_SNAPSHOT_DIR") or setting("data", "snapshot_dir", "snapshot")
+
+
+# -----------------------------------------------------------------------------
+# DATABASE VERBINDINGEN
+# -----------------------------------------------------------------------------
+# Eén gedeelde pool per proces. Verbindingen die te lang stil lagen worden eerst
+# gevalideerd (pre-ping) en kapotte verbindingen worden weggegooid en vervangen,
+# zodat een verlopen verbinding nooit meer als InterfaceError bij de gebruiker komt.
+
+CONNECTION_ERRORS = (psycopg2.InterfaceError, psycopg2.OperationalError)
+
+
+class ConnectionPool:
+    def __init__(self, minconn=1, maxconn=10, ping_interval=30, timeout=30, **connect_kwargs):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs
+        self._idle = []  # (verbinding, laatst gebruikt)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.connect_kwargs)
+        conn.autocommit = True
+        return conn
+
+    def _is_alive(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.ping_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def getconn(self, fresh=False):
+        # Blokkeert (max `timeout` sec) als alle verbindingen in gebruik zijn.
+        # fresh: altijd een nieuwe verbinding, de vrije verbindingen niet vertrouwen
+        if not self._slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError("Geen vrije databaseverbinding binnen de timeout.")
+        try:
+            while not fresh:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    conn, last_used = self._idle.pop()
+                if self._is_alive(conn, last_used):
+                    return conn
+                self._close_quietly(conn)
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, discard=False):
+        try:
+            if discard or conn.closed:
+                self._close_quietly(conn)
+                return
+            if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except CONNECTION_ERRORS:
+                    self._close_quietly(conn)
+                    return
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# Wel cache_resource: de pool zelf valideert en vervangt verbindingen.
+# Optioneel in st.secrets["postgres"]: pool_min, pool_max, pool_ping_interval (sec),
+# pool_timeout (sec) en connect_timeout (sec).
+@st.cache_resource
+def init_connection_pool():
+    cfg = st.secrets["postgres"]
+    return ConnectionPool(
+        minconn=int(cfg.get("pool_min", 1)),
+        maxconn=int(cfg.get("pool_max", 10)),
+        ping_interval=float(cfg.get("pool_ping_interval", 30)),
+        timeout=float(cfg.get("pool_timeout", 30)),
+        host=cfg["host"],
+        port=cfg["port"],
+        database=cfg["dbname"],
+        user=cfg["user"],
+        password=cfg["password"],
+        connect_timeout=int(cfg.get("connect_timeout", 10)),
+    )
+
+
+@contextmanager
+def pooled_connection(fresh=False):
+    pool = init_connection_pool()
+    conn = pool.getconn(fresh=fresh)
+    broken = False
+    try:
+        yield conn
+    except CONNECTION_ERRORS as e:
+        broken = not isinstance(e, psycopg2.extensions.QueryCanceledError)
+        raise
+    finally:
+        pool.putconn(conn, discard=broken)
+        # Eén kapotte verbinding (bv. na een herstart van de database): de vrije verbindingen
+        # zijn dan meestal ook dood, ook als ze recent nog gebruikt werden. Allemaal weg.
+        if broken:
+            pool.closeall()
+
+
+# Per dataversie: een nieuw weggeschreven snapshot wordt opnieuw geopend
+@st.cache_resource(max_entries=2)
+def init_snapshot_store(root, version=None):
+    from snapshot import SnapshotStore
+    return SnapshotStore(root)
+
+
+# Waarnemers (bv. bench.py, metrics.py), ook vanuit worker threads aangeroepen:
+#   QUERY_OBSERVERS: fn(query, params, seconden, resultaat) per databasequery; resultaat
+#                    is het DataFrame, of None als de query faalde.
+#   CACHE_OBSERVERS: fn(query, params, hit, seconden) per cached_query oproep.
+QUERY_OBSERVERS = []
+CACHE_OBSERVERS = []
+
+
+def fetch_dataframe(query, params=None):
+    t0, df = time.perf_counter(), None
+    try:
+        df = _fetch_dataframe(query, params)
+        return df
+    finally:
+        for observer in QUERY_OBSERVERS:
+            observer(query, params, time.perf_counter() - t0, df)
+
+
+def _fetch_dataframe(query, params=None):
+    if data_source() == "snapshot":
+        return init_snapshot_store(snapshot_dir(), data_version()).query(query, params)
+    # Eén keer opnieuw proberen als de verbinding onderweg is weggevallen, dan met een
+    # nieuwe verbinding (een andere vrije verbinding kan net zo dood zijn)
+    for attempt in range(2):
+        try:
+            with pooled_connection(fresh=bool(attempt)) as conn, conn.cursor() as cur:
+                cur.execute(query, params)
+                columns = [c.name for c in cur.description] if cur.description else []
+                return pd.DataFrame.from_records(cur.fetchall(), columns=columns, coerce_float=True)
+        except CONNECTION_ERRORS as e:
+            # Een geannuleerde query (statement_timeout) is geen verbindingsfout: niet herhalen
+            if attempt or isinstance(e, psycopg2.extensions.QueryCanceledError):
+                raise
+
+
+# -----------------------------------------------------------------------------
+# COMPACTE TYPES
+# -----------------------------------------------------------------------------
+# Wat lang in het geheugen blijft (de resultaten cache, de meta van de similarity
+# indexen) krijgt compacte types: float64 -> float32, gehele getallen naar het kleinste
+# type dat past (scores 1-100 -> uint8) en herhaalde tekst (team, seizoen, competitie,
+# positie) -> categorical. Kleine frames laten we ongemoeid: daar weegt de vaste
+# overhead zwaarder dan de kolommen.
+# De resultaten cache gebruikt enkel de verliesloze omzettingen (floats=False) en geeft
+# de oorspronkelijke types terug (restore_frame): wat cached_query teruggeeft hangt zo
+# niet af van het aantal rijen.
+
+def compact_frame(df, min_rows=200, max_unique_ratio=0.5, floats=True):
+    if len(df) < min_rows:
+        return df
+    columns = {}
+    for name, col in df.items():
+        if col.dtype == np.float64:
+            if floats:
+                columns[name] = col.astype(np.float32)
+        elif col.dtype.kind in "iu":
+            columns[name] = pd.to_numeric(col, downcast="unsigned" if col.min() >= 0 else "integer")
+        elif col.dtype == object and pd.api.types.infer_dtype(col, skipna=False) == "string":
+            # Enkel zonder ontbrekende waarden: een categorical geeft NaN terug i.p.v. None
+            if col.nunique() <= max_unique_ratio * len(col):
+                columns[name] = col.astype("category")
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for name, col in columns.items():
+        df[name] = col
+    return df
+
+
+def restore_frame(df, dtypes):
+    # Kopie met de types van vóór compact_frame
+    changed = {name: dtype for name, dtype in dtypes.items() if df[name].dtype != dtype}
+    return df.astype(changed) if changed else df.copy()
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+# -----------------------------------------------------------------------------
+# DATAVERSIE
+# -----------------------------------------------------------------------------
+# Watermark die de ETL na elke run ophoogt (migrate.py refresh, offline: het tijdstip
+# van de snapshot). Hij zit in elke cache-sleutel: na een ETL-run worden oude resultaten
+# nooit meer geserveerd. Hoogstens om de version_check_seconds opnieuw opgevraagd,
+# gedeeld door alle sessies van het proces.
+#
+# Optioneel in st.secrets["cache"]: max_mb (standaard 512), ttl (sec, standaard 3600),
+# version_check_seconds (standaard 10), warm_up (bool) en warm_up_seasons (zie warmup.py).
+
+DATA_VERSION_QUERY = "SELECT version FROM analysis.data_version"
+
+log = logging.getLogger("kvk.cache")
+
+
+@functools.lru_cache(maxsize=1)
+def _cache_settings():
+    return {
+        "max_mb": float(setting("cache", "max_mb", 512)),
+        "ttl": float(setting("cache", "ttl", 3600)),
+        "version_check_seconds": float(setting("cache", "version_check_seconds", 10)),
+    }
+
+
+_version = {"value": None, "checked": None}
+_version_lock = threading.Lock()
+
+
+def _read_data_version():
+    if data_source() == "snapshot":
+        from snapshot import MANIFEST, current_dir
+        current = current_dir(snapshot_dir())
+        return f"snapshot:{os.path.basename(current)}:{os.stat(os.path.join(current, MANIFEST)).st_mtime_ns}"
+    with pooled_connection() as conn, conn.cursor() as cur:
+        cur.execute(DATA_VERSION_QUERY)
+        row = cur.fetchone()
+    return f"postgres:{row[0]}" if row else None
+
+
+def data_version():
+    interval = _cache_settings()["version_check_seconds"]
+    checked = _version["checked"]
+    if checked is not None and time.monotonic() - checked < interval:
+        return _version["value"]
+    with _version_lock:
+        # Een andere thread kan intussen al gekeken hebben
+        if _version["checked"] is None or time.monotonic() - _version["checked"] >= interval:
+            try:
+                _version["value"] = _read_data_version()
+            except psycopg2.errors.UndefinedTable:
+                # Migratie 004 nog niet toegepast: enkel de ttl bepaalt de versheid
+                _version["value"] = None
+            except Exception as e:
+                # Database even weg: laatst gekende versie houden i.p.v. de cache te wissen
+                log.warning("Dataversie niet opvraagbaar: %s", e)
+            _version["checked"] = time.monotonic()
+    return _version["value"]
+
+
+# -----------------------------------------------------------------------------
+# RESULTATEN CACHE
+# -----------------------------------------------------------------------------
+# Gedeeld door alle sessies, begrensd in bytes (LRU), bewaard met verliesloos compacte
+# types (zie compact_frame). Fouten worden nooit bewaard.
+# Ouder dan ttl: het oude resultaat wordt nog geserveerd en op de achtergrond ververst
+# (stale-while-revalidate), op een eigen kleine executor: nooit in de wachtrij van
+# run_parallel. Vraagt een tweede sessie dezelfde query terwijl die nog loopt, dan wacht
+# ze op dat resultaat i.p.v. de database opnieuw te bevragen. Op een verversing wordt
+# nooit gewacht: is het oude resultaat intussen weg (clear, LRU), dan laadt een miss zelf.
+
+def _freeze(params):
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(p) for p in params)
+    return params
+
+
+class ResultCache:
+    def __init__(self, max_bytes, ttl, revalidate_workers=2):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # (versie, query, params) -> ((DataFrame, oorspronkelijke types), bytes, geladen op, bytes vóór compact_frame)
+        self._inflight = {}             # sleutel -> Future van de lopende fetch (enkel misses)
+        self._revalidating = set()      # sleutels met een verversing in de wachtrij of bezig
+        self._revalidator = ThreadPoolExecutor(max_workers=revalidate_workers, thread_name_prefix="kvk-revalidate")
+        self._bytes = self._raw_bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self, version, query, params, loader):
+        # Geeft ((DataFrame, oorspronkelijke types), hit) terug. Het DataFrame is gedeeld:
+        # niet wijzigen, zie restore_frame.
+        key = (version, query, _freeze(params))
+        with self._lock:
+            if version != self._version:
+                # Nieuwe data: alles van de vorige versie weg
+                self._entries.clear()
+                self._bytes = self._raw_bytes = 0
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if time.monotonic() - entry[2] > self.ttl and key not in self._revalidating:
+                    self._revalidating.add(key)
+                    self._revalidator.submit(self._revalidate, key, loader)
+                return entry[0], True
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result(), False
+        return self._load(key, loader, future), False
+
+    def _revalidate(self, key, loader):
+        # Mislukt het verversen, dan blijft het oude resultaat staan (tot de volgende poging)
+        try:
+            self._load(key, loader)
+        except Exception as e:
+            log.warning("Verversen van een cacheresultaat mislukt: %s", e)
+
+    def _finish(self, key, future):
+        # Onder self._lock: de fetch is niet langer onderweg
+        if future is None:
+            self._revalidating.discard(key)
+        elif self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def _load(self, key, loader, future=None):
+        # future: de fetch van een miss (andere sessies wachten erop); None = verversing
+        try:
+            raw = loader()
+        except BaseException as e:
+            with self._lock:
+                self._finish(key, future)
+            if future is not None:
+                future.set_exception(e)
+            raise
+        df = compact_frame(raw, floats=False)
+        nbytes = frame_bytes(df)
+        raw_bytes = frame_bytes(raw) if df is not raw else nbytes
+        value = (df, raw.dtypes)
+        with self._lock:
+            self._finish(key, future)
+            # Intussen een nieuwe dataversie, of groter dan de hele cache: niet bewaren
+            if key[0] == self._version and nbytes <= self.max_bytes:
+                self._drop(key)
+                self._entries[key] = (value, nbytes, time.monotonic(), raw_bytes)
+                self._bytes += nbytes
+                self._raw_bytes += raw_bytes
+                while self._bytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+        if future is not None:
+            future.set_result(value)
+        return value
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+            self._raw_bytes -= entry[3]
+
+    def contains(self, version, query, params):
+        with self._lock:
+            return version == self._version and (version, query, _freeze(params)) in self._entries
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "raw_bytes": self._raw_bytes, "version": self._version}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = self._raw_bytes = 0
+
+
+@st.cache_resource
+def result_cache():
+    cfg = _cache_settings()
+    return ResultCache(max_bytes=int(cfg["max_mb"] * 2**20), ttl=cfg["ttl"])
+
+
+def cached_query(query, params=None):
+    t0, hit = time.perf_counter(), False
+    try:
+        (df, dtypes), hit = result_cache().get(data_version(), query, params, functools.partial(fetch_dataframe, query, params))
+        # Kopie met de oorspronkelijke types, zoals st.cache_data: de aanroeper mag het
+        # resultaat aanpassen, en het gedrag hangt niet af van het aantal rijen
+        return restore_frame(df, dtypes)
+    finally:
+        for observer in CACHE_OBSERVERS:
+            observer(query, params, hit, time.perf_counter() - t0)
+
+
+def clear_query_cache():
+    result_cache().clear()
+
+
+def versioned(loader):
+    # Voor st.cache_resource loaders met de dataversie als eerste argument: de aanroeper
+    # geeft die niet mee, na een ETL-run wordt zo vanzelf een nieuwe versie geladen.
+    def load(*args):
+        return loader(data_version(), *args)
+    load.clear = loader.clear
+    return load
+
+
+def run_query(query, params=None):
+    try:
+        return cached_query(query, params)
+    except Exception as e:
+        st.error(f"SQL Error: {e}")
+        return pd.DataFrame()
+
+
+# -----------------------------------------------------------------------------
+# PARALLEL OPHALEN
+# -----------------------------------------------------------------------------
+# Losse secties van een pagina hangen niet van elkaar af: we vuren ze tegelijk af
+# over de pool, zodat de laadtijd gelijk is aan de traagste query i.p.v. de som.
+
+@st.cache_resource
+def _query_executor():
+    workers = int(setting("postgres", "pool_max", 10))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kvk-query")
+
+
+def run_parallel(tasks):
+    # tasks: {naam: functie zonder argumenten}. Geeft (resultaten, fouten) terug, beide per naam.
+    # Worker threads hebben geen ScriptRunContext: taken mogen dus geen st.* elementen tekenen.
+    # Elke taak krijgt een kopie van de context van de oproeper (o.a. de metrics-secties)
+    futures = {name: _query_executor().submit(contextvars.copy_context().run, fn) for name, fn in tasks.items()}
+    results, errors = {}, {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = e
+    return results, errors
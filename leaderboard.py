@@ -0,0 +1,125 @@
+import datetime as dt
+
+import pandas as pd
+
+from db import cached_query
+from profiles import POSITION_GROUPS, POSITION_KPIS, POSITION_METRICS, PROFILE_COLUMNS
+
+# -----------------------------------------------------------------------------
+# RANGLIJST PER POSITIE (SERVER-SIDE TOP-K + PAGINERING)
+# -----------------------------------------------------------------------------
+# De database sorteert en geeft enkel de gevraagde pagina terug (LIMIT/OFFSET); er komt
+# nooit een volledige scoretabel naar pandas. Metrieken en KPIs lezen de materialized
+# views met een index per (metric_id, iteratie, score), zie migrations/005. We vragen één
+# rij extra op: zo weten we of er een volgende pagina is zonder COUNT(*) over alles.
+
+KINDS = ["Profiel", "Metriek", "KPI"]
+# Grenzen van de leeftijdsslider: een grens die daar blijft staan filtert niet (ook
+# spelers zonder geboortedatum blijven dan in de ranglijst)
+AGE_BOUNDS = (15, 45)
+
+METRIC_DEFINITIONS_QUERY = 'SELECT id, name, details_label as detail FROM public.player_score_definitions WHERE id IN %s'
+KPI_DEFINITIONS_QUERY = 'SELECT id, name, context as detail FROM analysis.kpi_definitions WHERE id IN %s'
+
+_SOURCES = {
+    "Profiel": ("analysis.final_impect_scores a", "a.{column}"),
+    "Metriek": ('analysis.mv_player_metric_scores s JOIN analysis.final_impect_scores a ON a."iterationId" = s."iterationId" AND a."playerId" = s."playerId"',
+                "s.final_score_1_to_100"),
+    "KPI": ('analysis.mv_player_kpi_scores s JOIN analysis.final_impect_scores a ON a."iterationId" = s."iterationId" AND a."playerId" = s."playerId"',
+            "s.final_score_1_to_100"),
+}
+
+LEADERBOARD_QUERY = """
+    SELECT p.commonname as "Naam", sq.name as "Team", i."competitionName" as "Competitie", i.season as "Seizoen",
+        a.position as "Positie", p.birthdate, {score} as "Score", a."playerId", a."iterationId"
+    FROM {source}
+    JOIN public.players p ON p.id = a."playerId"
+    LEFT JOIN public.squads sq ON sq.id = a."squadId"
+    JOIN public.iterations i ON i.id = a."iterationId"
+    WHERE {where}
+    ORDER BY {score} DESC, a."playerId", a."iterationId"
+    LIMIT %s OFFSET %s
+"""
+
+
+def score_ids(kind, group):
+    config = (POSITION_METRICS if kind == "Metriek" else POSITION_KPIS).get(group, {})
+    return [str(x) for x in config.get("aan_bal", []) + config.get("zonder_bal", [])]
+
+
+def score_options(kind, group):
+    # {sleutel: label} voor de keuzelijst: profielkolommen, of de metrieken/KPIs van de positie
+    if kind == "Profiel":
+        return {column: label for label, column in PROFILE_COLUMNS.items()}
+    ids = score_ids(kind, group)
+    if not ids:
+        return {}
+    df = cached_query(METRIC_DEFINITIONS_QUERY if kind == "Metriek" else KPI_DEFINITIONS_QUERY, (tuple(ids),))
+    names = {str(r.id): f"{r.name} ({r.detail})" if r.detail else r.name for r in df.itertuples()}
+    return {i: names.get(i, f"#{i}") for i in ids}
+
+
+def age_filter(age_range):
+    # Slider -> (min, max) met None voor een grens die niet verschoven is
+    if not age_range:
+        return None, None
+    min_age, max_age = age_range
+    return (min_age if min_age > AGE_BOUNDS[0] else None), (max_age if max_age < AGE_BOUNDS[1] else None)
+
+
+def birthdate_bounds(min_age, max_age, today=None):
+    # Leeftijd in [min_age, max_age] <=> geboren in (today - (max_age + 1) jaar, today - min_age jaar].
+    # None = geen grens aan die kant
+    today = today or dt.date.today()
+
+    def years_ago(n):
+        try:
+            return today.replace(year=today.year - n)
+        except ValueError:  # 29 februari
+            return today.replace(year=today.year - n, day=28)
+
+    return (years_ago(max_age + 1) if max_age is not None else None), (years_ago(min_age) if min_age is not None else None)
+
+
+def leaderboard_query(kind, key, iteration_ids, positions, age_range=None, limit=50, offset=0):
+    if kind not in _SOURCES:
+        raise ValueError(f"Onbekend type: {kind}")
+    if kind == "Profiel" and key not in PROFILE_COLUMNS.values():
+        raise ValueError(f"Onbekende profielkolom: {key}")  # kolomnaam komt in de SQL
+    source, score = _SOURCES[kind]
+    score = score.format(column=key)
+    where, params = [], []
+    if kind != "Profiel":
+        where.append("s.metric_id = %s")
+        params.append(str(key))
+    where += ['a."iterationId" IN %s', "a.position IN %s", f"{score} IS NOT NULL"]
+    params += [tuple(str(i) for i in iteration_ids), tuple(positions)]
+    # Enkel de verschoven grenzen; een speler zonder geboortedatum valt dan wel weg
+    born_after, born_before = birthdate_bounds(*age_filter(age_range))
+    if born_after is not None:
+        where.append("p.birthdate > %s")
+        params.append(born_after)
+    if born_before is not None:
+        where.append("p.birthdate <= %s")
+        params.append(born_before)
+    query = LEADERBOARD_QUERY.format(score=score, source=source, where=" AND ".join(where))
+    return query, tuple(params) + (int(limit), int(offset))
+
+
+def age(birthdate, today):
+    if birthdate is None or pd.isna(birthdate):
+        return None
+    return today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
+
+
+def load_leaderboard_page(kind, key, iteration_ids, group, age_range=None, page=0, page_size=50):
+    # Geeft (pagina met rang en leeftijd, is er een volgende pagina) terug
+    query, params = leaderboard_query(kind, key, iteration_ids, POSITION_GROUPS[group], age_range, limit=page_size + 1, offset=page * page_size)
+    df = cached_query(query, params)
+    has_next = len(df) > page_size
+    df = df.head(page_size).reset_index(drop=True)
+    today = dt.date.today()
+    birthdates = df.pop("birthdate")
+    df.insert(0, "#", range(page * page_size + 1, page * page_size + len(df) + 1))
+    df.insert(df.columns.get_loc("Positie") + 1, "Leeftijd", pd.array([age(b, today) for b in birthdates], dtype="Int64"))
+    return df, has_next
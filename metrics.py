@@ -0,0 +1,278 @@
+import contextvars
+import functools
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from db import CACHE_OBSERVERS, QUERY_OBSERVERS, result_cache, setting
+
+# -----------------------------------------------------------------------------
+# METRICS: QUERIES, CACHE EN PAGINASECTIES
+# -----------------------------------------------------------------------------
+# Eén register per proces. db.py meldt elke query en elke cached_query oproep, de app
+# meet haar secties met `section(...)`. Zichtbaar in het debug-paneel (?debug=1 of
+# [metrics] panel = true), exporteerbaar als JSON lines en Prometheus tekst.
+#
+# Optioneel in st.secrets["metrics"]: panel (bool), slow_query_ms (standaard 500) en
+# jsonl_path (elk event wordt daar ook als JSON regel aan toegevoegd).
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+slow_query_log = logging.getLogger("kvk.slow_query")
+
+
+@functools.lru_cache(maxsize=1)
+def _settings():
+    return {
+        "panel": bool(setting("metrics", "panel", False)),
+        "slow_query_ms": float(setting("metrics", "slow_query_ms", 500)),
+        "jsonl_path": setting("metrics", "jsonl_path"),
+    }
+
+
+@functools.lru_cache(maxsize=512)
+def query_label(query):
+    # Korte, stabiele naam voor een query: eerste tabel na FROM + hash van de SQL
+    sql = " ".join(query.split())
+    match = re.search(r'\bFROM\s+([\w."]+)', sql, re.IGNORECASE)
+    table = match.group(1).split(".")[-1].strip('"') if match else "query"
+    return f"{table}#{hashlib.sha1(sql.encode()).hexdigest()[:6]}"
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(index=False, deep=True).sum()) if df is not None else 0
+
+
+class MetricsRegistry:
+    def __init__(self, max_events=5000):
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=max_events)   # recentste events (JSON lines, paneel)
+        self.slow_queries = deque(maxlen=50)
+        self._histograms = {}                    # (metric, labels) -> [bucket counts, som, aantal]
+        self._counters = {}                      # (metric, labels) -> waarde
+        self._sink = None
+
+    def _observe(self, metric, labels, seconds):
+        h = self._histograms.setdefault((metric, labels), [[0] * len(BUCKETS), 0.0, 0])
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[0][i] += 1
+        h[1] += seconds
+        h[2] += 1
+
+    def _inc(self, metric, labels, value=1):
+        self._counters[(metric, labels)] = self._counters.get((metric, labels), 0) + value
+
+    def add(self, event, histogram=None, counters=()):
+        with self._lock:
+            self.events.append(event)
+            if histogram:
+                self._observe(*histogram)
+            for metric, labels, value in counters:
+                self._inc(metric, labels, value)
+            path = _settings()["jsonl_path"]
+            if path:
+                if self._sink is None:
+                    self._sink = open(path, "a", buffering=1)
+                self._sink.write(json.dumps(event, default=str) + "\n")
+
+    def add_slow_query(self, entry):
+        with self._lock:
+            self.slow_queries.append(entry)
+
+    def recent_slow_queries(self):
+        with self._lock:
+            return list(self.slow_queries)[::-1]
+
+    def run_events(self, run_id):
+        with self._lock:
+            return [e for e in self.events if e.get("run") == run_id]
+
+    def cache_hit_rate(self):
+        with self._lock:
+            hits = self._counters.get(("kvk_cache_requests_total", (("result", "hit"),)), 0)
+            misses = self._counters.get(("kvk_cache_requests_total", (("result", "miss"),)), 0)
+        return hits, hits + misses
+
+    def to_jsonl(self):
+        with self._lock:
+            return "".join(json.dumps(e, default=str) + "\n" for e in self.events)
+
+    def to_prometheus(self):
+        help_text = {
+            "kvk_query_duration_seconds": ("histogram", "Duur van databasequeries."),
+            "kvk_section_duration_seconds": ("histogram", "Duur van paginasecties (laden + tekenen)."),
+            "kvk_query_rows_total": ("counter", "Aantal opgehaalde rijen."),
+            "kvk_query_bytes_total": ("counter", "Grootte van de opgehaalde resultaten in bytes."),
+            "kvk_query_errors_total": ("counter", "Aantal mislukte queries."),
+            "kvk_cache_requests_total": ("counter", "cached_query oproepen per resultaat (hit/miss)."),
+        }
+
+        def fmt(labels, extra=()):
+            items = [f'{k}="{str(v)}"' for k, v in tuple(labels) + tuple(extra)]
+            return "{" + ",".join(items) + "}" if items else ""
+
+        lines = []
+        with self._lock:
+            histograms, counters = dict(self._histograms), dict(self._counters)
+        for metric, (kind, text) in help_text.items():
+            lines += [f"# HELP {metric} {text}", f"# TYPE {metric} {kind}"]
+            if kind == "histogram":
+                for (name, labels), (counts, total, n) in sorted(histograms.items()):
+                    if name != metric:
+                        continue
+                    for bound, count in zip(BUCKETS, counts):
+                        lines.append(f"{metric}_bucket{fmt(labels, [('le', bound)])} {count}")
+                    lines.append(f'{metric}_bucket{fmt(labels, [("le", "+Inf")])} {n}')
+                    lines.append(f"{metric}_sum{fmt(labels)} {total:.6f}")
+                    lines.append(f"{metric}_count{fmt(labels)} {n}")
+            else:
+                for (name, labels), value in sorted(counters.items()):
+                    if name == metric:
+                        lines.append(f"{metric}{fmt(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Run-id van de huidige script-run en de secties die nu open staan. Via run_parallel
+# erven worker threads beide, zodat hun queries bij de juiste run en sectie komen.
+_run_id = contextvars.ContextVar("kvk_metrics_run", default=None)
+_open_sections = contextvars.ContextVar("kvk_metrics_sections", default=())
+_stats_lock = threading.Lock()  # parallelle taken tellen in dezelfde open sectie
+
+
+class _SectionStats:
+    __slots__ = ("queries", "rows", "bytes", "db_seconds")
+
+    def __init__(self):
+        self.queries = self.rows = self.bytes = 0
+        self.db_seconds = 0.0
+
+
+def start_run():
+    # Bovenaan app.py: alles wat deze run meet krijgt hetzelfde id (voor het paneel)
+    _run_id.set(uuid.uuid4().hex[:8])
+    _open_sections.set(())
+
+
+@contextmanager
+def section(name):
+    stats = _SectionStats()
+    token = _open_sections.set(_open_sections.get() + (stats,))
+    t0, error = time.perf_counter(), None
+    try:
+        yield stats
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _open_sections.reset(token)
+        seconds = time.perf_counter() - t0
+        # Geen enkele databasequery in de sectie = volledig uit de cache bediend
+        REGISTRY.add(
+            {"ts": time.time(), "run": _run_id.get(), "kind": "section", "name": name, "ms": round(seconds * 1000, 2),
+             "db_ms": round(stats.db_seconds * 1000, 2), "queries": stats.queries, "rows": stats.rows, "bytes": stats.bytes,
+             "cache": "miss" if stats.queries else "hit", "error": error},
+            histogram=("kvk_section_duration_seconds", (("section", name),), seconds),
+        )
+
+
+def timed(name, fn):
+    # Voor run_parallel: de taak meet zichzelf als sectie
+    def run():
+        with section(name):
+            return fn()
+    return run
+
+
+def _on_query(query, params, seconds, result):
+    label = query_label(query)
+    rows, nbytes = (len(result), _frame_bytes(result)) if result is not None else (0, 0)
+    with _stats_lock:
+        for stats in _open_sections.get():
+            stats.queries += 1
+            stats.rows += rows
+            stats.bytes += nbytes
+            stats.db_seconds += seconds
+    event = {"ts": time.time(), "run": _run_id.get(), "kind": "query", "name": label, "ms": round(seconds * 1000, 2),
+             "rows": rows, "bytes": nbytes, "error": result is None}
+    labels = (("query", label),)
+    REGISTRY.add(
+        event,
+        histogram=("kvk_query_duration_seconds", labels, seconds),
+        counters=[("kvk_query_rows_total", labels, rows), ("kvk_query_bytes_total", labels, nbytes),
+                  ("kvk_query_errors_total", labels, int(result is None))],
+    )
+    if seconds * 1000 >= _settings()["slow_query_ms"]:
+        sql = " ".join(query.split())
+        REGISTRY.add_slow_query({**event, "sql": sql, "params": repr(params)})
+        slow_query_log.warning("Trage query %s: %.0f ms, %s rijen | %s | params=%r", label, seconds * 1000, rows, sql, params)
+
+
+def _on_cache(query, params, hit, seconds):
+    REGISTRY.add(
+        {"ts": time.time(), "run": _run_id.get(), "kind": "cache", "name": query_label(query), "ms": round(seconds * 1000, 2),
+         "cache": "hit" if hit else "miss"},
+        counters=[("kvk_cache_requests_total", (("result", "hit" if hit else "miss"),), 1)],
+    )
+
+
+QUERY_OBSERVERS.append(_on_query)
+CACHE_OBSERVERS.append(_on_cache)
+
+
+# -----------------------------------------------------------------------------
+# DEBUG PANEEL
+# -----------------------------------------------------------------------------
+
+def debug_panel_enabled():
+    return st.query_params.get("debug") in ("1", "true") or _settings()["panel"]
+
+
+def render_debug_panel():
+    if not debug_panel_enabled():
+        return
+    events = REGISTRY.run_events(_run_id.get())
+    sections = [e for e in events if e["kind"] == "section"]
+    queries = [e for e in events if e["kind"] == "query"]
+    cache = [e for e in events if e["kind"] == "cache"]
+    run_hits = sum(e["cache"] == "hit" for e in cache)
+    hits, total = REGISTRY.cache_hit_rate()
+    cache_stats = result_cache().stats()
+
+    with st.sidebar.expander("🔧 Debug: timings & cache", expanded=False):
+        st.caption(
+            f"Deze run: {len(queries)} queries ({sum(e['ms'] for e in queries):.0f} ms DB), "
+            f"cache {run_hits}/{len(cache)} hits. Proces: {hits}/{total} hits "
+            f"({100 * hits / total if total else 0:.0f}%). Cache: {cache_stats['entries']} resultaten, "
+            f"{cache_stats['bytes'] / 2**20:.1f} MB (zonder compacte types {cache_stats['raw_bytes'] / 2**20:.1f} MB), "
+            f"dataversie {cache_stats['version']}."
+        )
+        if sections:
+            st.write("**Secties**")
+            st.dataframe(pd.DataFrame([{
+                "Sectie": e["name"], "ms": e["ms"], "DB ms": e["db_ms"], "Queries": e["queries"],
+                "Rijen": e["rows"], "KB": round(e["bytes"] / 1024, 1), "Cache": e["cache"],
+            } for e in sections]), hide_index=True)
+        if queries:
+            st.write("**Queries**")
+            st.dataframe(pd.DataFrame([{
+                "Query": e["name"], "ms": e["ms"], "Rijen": e["rows"], "KB": round(e["bytes"] / 1024, 1), "Fout": e["error"],
+            } for e in queries]).sort_values("ms", ascending=False), hide_index=True)
+        slow = REGISTRY.recent_slow_queries()
+        if slow:
+            st.write(f"**Trage queries (≥ {_settings()['slow_query_ms']:.0f} ms, proces)**")
+            st.dataframe(pd.DataFrame([{"Query": e["name"], "ms": e["ms"], "SQL": e["sql"], "Params": e["params"]} for e in slow]), hide_index=True)
+        c1, c2 = st.columns(2)
+        with c1: st.download_button("JSON lines", REGISTRY.to_jsonl(), file_name="kvk_metrics.jsonl", mime="application/x-ndjson")
+        with c2: st.download_button("Prometheus", REGISTRY.to_prometheus(), file_name="kvk_metrics.prom", mime="text/plain")
@@ -0,0 +1,361 @@
+"""Versiebeheerde schema-migraties, refresh van de materialized views en index-check.
+
+    python migrate.py up        # openstaande migraties uit migrations/ toepassen
+    python migrate.py status    # toon toegepaste en openstaande migraties
+    python migrate.py refresh   # na elke ETL-run: materialized views + coach-aggregaten verversen, ANALYZE, dataversie ophogen
+    python migrate.py check     # EXPLAIN van elke app-query: kan elke query een index gebruiken?
+
+Gebruikt de verbinding uit st.secrets["postgres"].
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+MATERIALIZED_VIEWS = [
+    "analysis.mv_player_metric_scores",
+    "analysis.mv_player_kpi_scores",
+    "analysis.mv_squad_metric_scores",
+    "analysis.mv_squad_kpi_scores",
+]
+
+# Basistabellen waarvan de statistieken na een ETL-run ververst worden
+ANALYZE_TABLES = [
+    "analysis.final_impect_scores", "analysis.player_final_scores", "analysis.kpis_final_scores",
+    "analysis.squad_final_scores", "analysis.squadkpi_final_scores", "analysis.squad_profile_scores",
+    "analysis.scouting_reports", "analysis.coach_tenure_summary", "analysis.coach_tenure_iterations",
+    "analysis.coach_tenure_scores",
+]
+
+
+# -----------------------------------------------------------------------------
+# MIGRATIES
+# -----------------------------------------------------------------------------
+
+def available_migrations():
+    # Bestandsnaam <versie>_<naam>.sql, toegepast in oplopende volgorde
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [(f.split("_", 1)[0], f) for f in files]
+
+
+def applied_migrations(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS analysis.schema_migrations (
+            version text PRIMARY KEY,
+            name text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+    cur.execute("SELECT version FROM analysis.schema_migrations")
+    return {r[0] for r in cur.fetchall()}
+
+
+def migrate_up(conn):
+    with conn.cursor() as cur:
+        done = applied_migrations(cur)
+    pending = [(v, f) for v, f in available_migrations() if v not in done]
+    for version, filename in pending:
+        with open(os.path.join(MIGRATIONS_DIR, filename)) as f:
+            sql = f.read()
+        # Elke migratie in één transactie: faalt er iets, dan blijft het schema ongewijzigd
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                cur.execute("INSERT INTO analysis.schema_migrations (version, name) VALUES (%s, %s)", (version, filename))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.autocommit = True
+        print(f"Toegepast: {filename}")
+    if not pending:
+        print("Schema is up-to-date.")
+    return [f for _, f in pending]
+
+
+def migration_status(conn):
+    with conn.cursor() as cur:
+        done = applied_migrations(cur)
+    for version, filename in available_migrations():
+        print(f"{'[x]' if version in done else '[ ]'} {filename}")
+
+
+def refresh(conn):
+    # Entry point voor de ETL: na het laden van nieuwe scores aanroepen.
+    # CONCURRENTLY (unieke index uit 008): de app leest intussen gewoon de oude inhoud.
+    # Enkel een nog nooit gevulde view moet eenmalig op de gewone manier ververst worden.
+    with conn.cursor() as cur:
+        cur.execute("SELECT schemaname || '.' || matviewname FROM pg_matviews WHERE NOT ispopulated")
+        unpopulated = {r[0] for r in cur.fetchall()}
+        for view in MATERIALIZED_VIEWS:
+            t0 = time.perf_counter()
+            cur.execute(f"REFRESH MATERIALIZED VIEW {'' if view in unpopulated else 'CONCURRENTLY '}{view}")
+            cur.execute(f"ANALYZE {view}")
+            print(f"{view} ververst ({time.perf_counter() - t0:.1f}s)")
+    refresh_coach_tenures(conn)
+    with conn.cursor() as cur:
+        for table in ANALYZE_TABLES:
+            cur.execute(f"ANALYZE {table}")
+        # Als laatste: pas nu mogen de app-caches de nieuwe data ophalen
+        cur.execute("UPDATE analysis.data_version SET version = version + 1, updated_at = now() RETURNING version")
+        print(f"Dataversie: {cur.fetchone()[0]}")
+
+
+# -----------------------------------------------------------------------------
+# COACH AGGREGATEN (INCREMENTEEL)
+# -----------------------------------------------------------------------------
+# Per coachperiode (public.coach_tenures) het gemiddelde van de ploegprofielen, -metrieken
+# en -KPIs over de iteraties van die periode, gewogen naar het aantal wedstrijden van de
+# periode in elke iteratie. Tellen is goedkoop, aggregeren niet: per periode bepalen we
+# eerst een vingerafdruk (wedstrijden van de periode en van de ploeg per iteratie, plus
+# naam en einddatum) en enkel periodes waarvan die veranderd is worden herberekend. Nieuwe
+# wedstrijden raken zo de lopende periode en de andere periodes in dezelfde iteratie (hun
+# iteratiescores veranderen mee), niet de rest.
+
+COACH_REFRESH_STEPS = [
+    """CREATE TEMP TABLE coach_tenure_weights ON COMMIT DROP AS
+       WITH tenures AS (
+           -- Eén rij per periode, ook als de ETL dezelfde (coach, ploeg, start) meermaals
+           -- aanlevert: anders telt elke wedstrijd dubbel (zelfde regel als coach_tenure_current)
+           SELECT "coachId" || ':' || "squadId" || ':' || start_date AS tenure_id, "squadId", start_date, max(end_date) AS end_date
+           FROM public.coach_tenures GROUP BY "coachId", "squadId", start_date
+       )
+       SELECT t.tenure_id, t."squadId", m."iterationId", count(*)::int AS matches
+       FROM tenures t
+       JOIN (
+           -- Thuis- en uitwedstrijden als aparte rijen: een gelijkheidsjoin (hash join) i.p.v. een OR-voorwaarde per paar
+           SELECT "iterationId", "homeSquadId" AS squad, "scheduledDate" FROM public.matches WHERE available
+           UNION ALL SELECT "iterationId", "awaySquadId", "scheduledDate" FROM public.matches WHERE available
+       ) m ON m.squad = t."squadId" AND m."scheduledDate" >= t.start_date AND (t.end_date IS NULL OR m."scheduledDate" <= t.end_date)
+       GROUP BY 1, 2, 3""",
+    # Fingerprint: naam, einddatum, wedstrijden per iteratie (van de periode en van het hele
+    # team) en een checksum van de ploegscores per (team, iteratie). Een nieuwe ETL-run van
+    # de scores maakt de periode dus ook verouderd.
+    """CREATE TEMP TABLE coach_tenure_current ON COMMIT DROP AS
+       WITH squad_matches AS (
+           SELECT "iterationId", squad, count(*) AS matches FROM (
+               SELECT "iterationId", "homeSquadId" AS squad FROM public.matches WHERE available
+               UNION ALL SELECT "iterationId", "awaySquadId" FROM public.matches WHERE available
+           ) m GROUP BY 1, 2
+       ), used AS (
+           SELECT DISTINCT "squadId", "iterationId" FROM coach_tenure_weights
+       ), squad_scores AS (
+           SELECT s."squadId", s."iterationId", md5(string_agg(concat_ws(':', s.kind, s.key, s.score), ',' ORDER BY s.kind, s.key, s.score)) AS checksum
+           FROM (
+               SELECT "squadId", "iterationId", 0 AS kind, profile_name AS key, score FROM analysis.squad_profile_scores
+               UNION ALL SELECT "squadId", "iterationId", 1, definition_id, final_score_1_to_100 FROM analysis.squad_final_scores
+               UNION ALL SELECT "squadId", "iterationId", 2, definition_id, final_score_1_to_100 FROM analysis.squadkpi_final_scores
+           ) s JOIN used u ON u."squadId" = s."squadId" AND u."iterationId" = s."iterationId"
+           GROUP BY 1, 2
+       ), tenures AS (
+           SELECT "coachId", "squadId", start_date, min(name) AS name, max(end_date) AS end_date
+           FROM public.coach_tenures GROUP BY "coachId", "squadId", start_date
+       )
+       SELECT t."coachId" || ':' || t."squadId" || ':' || t.start_date AS tenure_id, t."coachId", min(t.name) AS name, t."squadId",
+           t.start_date, max(t.end_date) AS end_date, COALESCE(sum(w.matches), 0)::int AS matches,
+           md5(concat_ws('|', min(t.name), max(t.end_date),
+               string_agg(concat_ws(':', w."iterationId", w.matches, sm.matches, ss.checksum), ',' ORDER BY w."iterationId"))) AS fingerprint
+       FROM tenures t
+       LEFT JOIN coach_tenure_weights w ON w.tenure_id = t."coachId" || ':' || t."squadId" || ':' || t.start_date
+       LEFT JOIN squad_matches sm ON sm.squad = t."squadId" AND sm."iterationId" = w."iterationId"
+       LEFT JOIN squad_scores ss ON ss."squadId" = t."squadId" AND ss."iterationId" = w."iterationId"
+       GROUP BY t."coachId", t."squadId", t.start_date""",
+    """CREATE TEMP TABLE coach_tenure_stale ON COMMIT DROP AS
+       SELECT c.tenure_id FROM coach_tenure_current c LEFT JOIN analysis.coach_tenure_summary s ON s.tenure_id = c.tenure_id
+       WHERE s.fingerprint IS DISTINCT FROM c.fingerprint""",
+    # Verdwenen en verouderde periodes weg (iteraties en scores via ON DELETE CASCADE)
+    """DELETE FROM analysis.coach_tenure_summary s
+       WHERE NOT EXISTS (SELECT 1 FROM coach_tenure_current c WHERE c.tenure_id = s.tenure_id)
+          OR s.tenure_id IN (SELECT tenure_id FROM coach_tenure_stale)""",
+    """INSERT INTO analysis.coach_tenure_summary (tenure_id, "coachId", name, "squadId", start_date, end_date, matches, fingerprint)
+       SELECT c.tenure_id, c."coachId", c.name, c."squadId", c.start_date, c.end_date, c.matches, c.fingerprint
+       FROM coach_tenure_current c JOIN coach_tenure_stale USING (tenure_id)""",
+    """INSERT INTO analysis.coach_tenure_iterations (tenure_id, "iterationId", matches)
+       SELECT w.tenure_id, w."iterationId", w.matches FROM coach_tenure_weights w JOIN coach_tenure_stale USING (tenure_id)""",
+    """INSERT INTO analysis.coach_tenure_scores (tenure_id, kind, key, score)
+       WITH w AS (
+           SELECT w.tenure_id, w."iterationId", w.matches, w."squadId" FROM coach_tenure_weights w JOIN coach_tenure_stale USING (tenure_id)
+       )
+       SELECT w.tenure_id, 0, p.profile_name, sum(p.score * w.matches) / sum(w.matches)
+       FROM w JOIN analysis.squad_profile_scores p ON p."squadId" = w."squadId" AND p."iterationId" = w."iterationId"
+       WHERE p.score IS NOT NULL AND p.profile_name IS NOT NULL GROUP BY 1, 3
+       UNION ALL
+       SELECT w.tenure_id, 1, s.definition_id, sum(s.final_score_1_to_100 * w.matches) / sum(w.matches)
+       FROM w JOIN analysis.squad_final_scores s ON s."squadId" = w."squadId" AND s."iterationId" = w."iterationId"
+       WHERE s.final_score_1_to_100 IS NOT NULL GROUP BY 1, 3
+       UNION ALL
+       SELECT w.tenure_id, 2, s.definition_id, sum(s.final_score_1_to_100 * w.matches) / sum(w.matches)
+       FROM w JOIN analysis.squadkpi_final_scores s ON s."squadId" = w."squadId" AND s."iterationId" = w."iterationId"
+       WHERE s.final_score_1_to_100 IS NOT NULL GROUP BY 1, 3""",
+]
+
+
+def refresh_coach_tenures(conn):
+    # Eén transactie: de app ziet de oude of de nieuwe aggregaten, nooit een mengvorm
+    t0 = time.perf_counter()
+    conn.autocommit = False
+    try:
+        with conn.cursor() as cur:
+            for step in COACH_REFRESH_STEPS:
+                cur.execute(step)
+            cur.execute("SELECT (SELECT count(*) FROM coach_tenure_stale), (SELECT count(*) FROM coach_tenure_current)")
+            stale, total = cur.fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = True
+    print(f"Coachperiodes: {stale} van {total} herberekend ({time.perf_counter() - t0:.1f}s)")
+
+
+# -----------------------------------------------------------------------------
+# INDEX CHECK
+# -----------------------------------------------------------------------------
+# Elke query van de app wordt ge-EXPLAIN'd met enable_seqscan = off. Blijft er dan toch
+# een Seq Scan over op een tabel, dan bestaat er voor die query geen bruikbare index.
+# (Zonder die instelling kiest Postgres op kleine tabellen terecht vaak een Seq Scan.)
+# Een Index (Only) Scan zonder Index Cond leest ook de hele tabel (enkel via de index):
+# die telt als volledige scan, net als een Seq Scan. Hash en merge joins staan ook uit:
+# anders leest de planner de joinpartner liever volledig via zijn index dan per rij op te
+# zoeken. Met enkel nested loops moet elke tabel een Index Cond hebben, uit de WHERE of
+# uit de join.
+
+CHECK_SETTINGS = ["enable_seqscan", "enable_hashjoin", "enable_mergejoin"]
+
+
+def app_queries(cur):
+    from catalog import ITERATIONS_QUERY
+    from coaches import COACH_TENURES_QUERY, COACH_ITERATIONS_QUERY, COACH_PROFILES_QUERY, COACH_SCORES_QUERY
+    from db import DATA_VERSION_QUERY
+    from leaderboard import leaderboard_query, score_ids
+    from player_page import PLAYERS_QUERY, SCORE_QUERY, METRICS_QUERY, KPIS_QUERY, REPORTS_QUERY
+    from profiles import POSITION_METRICS, POSITION_KPIS, POSITION_GROUPS, PROFILE_COLUMNS, get_config_for_position, position_group
+    from report import REPORT_PLAYERS_QUERY, REPORT_METRICS_QUERY, REPORT_KPIS_QUERY, REPORT_REPORTS_QUERY
+    from search import SEARCH_QUERY
+    from shortlist import shortlist_scores_query
+    from similarity import PLAYER_SIMILARITY_QUERY, SQUAD_PROFILES_QUERY
+    from trajectory import trajectory_query
+    from team_page import TEAMS_QUERY, SQUAD_DETAILS_QUERY, SQUAD_PROFILE_QUERY, SQUAD_METRICS_QUERY, SQUAD_KPIS_QUERY
+
+    cur.execute('SELECT "iterationId", "playerId", position FROM analysis.final_impect_scores WHERE position IS NOT NULL LIMIT 1')
+    iteration_id, player_id, position = cur.fetchone()
+    cur.execute('SELECT "iterationId", "squadId" FROM analysis.squad_final_scores LIMIT 1')
+    squad_iteration_id, squad_id = cur.fetchone()
+    cur.execute("SELECT tenure_id FROM analysis.coach_tenure_summary LIMIT 1")
+    tenure_id = (cur.fetchone() or ("",))[0]
+
+    def ids(config_dict):
+        config = get_config_for_position(position, config_dict) or {}
+        return tuple(str(x) for x in config.get("aan_bal", []) + config.get("zonder_bal", [])) or ("0",)
+
+    group = position_group(position) or next(iter(POSITION_GROUPS))
+
+    def ranking(kind, key):
+        return leaderboard_query(kind, key, [iteration_id], POSITION_GROUPS[group], (18, 30))
+
+    # (naam, sql, params, tabellen die bewust volledig gelezen worden)
+    return [
+        ("dataversie", DATA_VERSION_QUERY, None, {"analysis.data_version"}),
+        ("iteratie catalogus", ITERATIONS_QUERY, None, {"public.iterations"}),
+        ("spelerslijst", PLAYERS_QUERY, (iteration_id,), set()),
+        ("speler profiel", SCORE_QUERY, (iteration_id, player_id), set()),
+        ("speler metrieken", METRICS_QUERY, (iteration_id, player_id, ids(POSITION_METRICS)), set()),
+        ("speler KPIs", KPIS_QUERY, (iteration_id, player_id, ids(POSITION_KPIS)), set()),
+        ("speler rapporten", REPORTS_QUERY, (iteration_id, player_id), set()),
+        ("speler ontwikkeling", *trajectory_query(player_id, position), set()),
+        ("vergelijkbare spelers", PLAYER_SIMILARITY_QUERY, (position,), set()),
+        ("teamlijst", TEAMS_QUERY, (squad_iteration_id,), set()),
+        ("team details", SQUAD_DETAILS_QUERY, (squad_id,), set()),
+        ("team profiel", SQUAD_PROFILE_QUERY, (squad_id, squad_iteration_id), set()),
+        ("team metrieken", SQUAD_METRICS_QUERY, (squad_id, squad_iteration_id), set()),
+        ("team KPIs", SQUAD_KPIS_QUERY, (squad_id, squad_iteration_id), set()),
+        ("vergelijkbare teams", SQUAD_PROFILES_QUERY, None, {"analysis.squad_profile_scores", "public.squads", "public.iterations"}),
+        ("spelers zoeken", SEARCH_QUERY, None, {"analysis.final_impect_scores", "public.players", "public.squads", "public.iterations"}),
+        ("shortlist scores", *shortlist_scores_query([{"playerId": player_id, "iterationId": iteration_id, "position": position}]), set()),
+        ("rapport spelers", REPORT_PLAYERS_QUERY, (iteration_id,), set()),
+        ("rapport metrieken", REPORT_METRICS_QUERY, (iteration_id, ids(POSITION_METRICS)), set()),
+        ("rapport KPIs", REPORT_KPIS_QUERY, (iteration_id, ids(POSITION_KPIS)), set()),
+        ("rapport scoutrapporten", REPORT_REPORTS_QUERY, (iteration_id,), set()),
+        ("ranglijst profiel", *ranking("Profiel", next(iter(PROFILE_COLUMNS.values()))), set()),
+        ("ranglijst metriek", *ranking("Metriek", (score_ids("Metriek", group) or ["0"])[0]), set()),
+        ("ranglijst KPI", *ranking("KPI", (score_ids("KPI", group) or ["0"])[0]), set()),
+        ("coachperiodes", COACH_TENURES_QUERY, None, {"analysis.coach_tenure_summary", "public.squads"}),
+        ("coach iteraties", COACH_ITERATIONS_QUERY, None, {"analysis.coach_tenure_iterations"}),
+        ("coachprofielen", COACH_PROFILES_QUERY, None, {"analysis.coach_tenure_scores", "analysis.coach_tenure_summary"}),
+        ("coach scores", COACH_SCORES_QUERY, ((tenure_id,),), set()),
+    ]
+
+
+def _scan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _scan_nodes(child)
+
+
+def explain(cur, query, params):
+    cur.execute("EXPLAIN (VERBOSE, FORMAT JSON) " + query, params)
+    plan = cur.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = list(_scan_nodes(plan[0]["Plan"]))
+    full_scans = {
+        f'{n["Schema"]}.{n["Relation Name"]}' for n in nodes
+        if n["Node Type"] == "Seq Scan" or (n["Node Type"] in ("Index Scan", "Index Only Scan") and "Index Cond" not in n)
+    }
+    indexes = sorted({n["Index Name"] for n in nodes if "Index Name" in n})
+    return full_scans, indexes
+
+
+def check_indexes(conn):
+    failures = 0
+    with conn.cursor() as cur:
+        queries = app_queries(cur)
+        for option in CHECK_SETTINGS:
+            cur.execute(f"SET {option} = off")
+        try:
+            for name, query, params, full_scan_ok in queries:
+                full_scans, indexes = explain(cur, query, params)
+                missing = full_scans - full_scan_ok
+                status = "FAIL" if missing else "OK  "
+                failures += bool(missing)
+                if missing:
+                    detail = f"volledige scan op {', '.join(sorted(missing))}"
+                else:
+                    detail = f"index: {', '.join(indexes) or '-'}"
+                    if full_scans:
+                        detail += f" (bewust volledig: {', '.join(sorted(full_scans))})"
+                print(f"{status} {name:<24} {detail}")
+        finally:
+            for option in CHECK_SETTINGS:
+                cur.execute(f"RESET {option}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema-migraties en onderhoud voor de KVK scouting app.")
+    parser.add_argument("command", choices=["up", "status", "refresh", "check"])
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from db import pooled_connection
+
+    with pooled_connection() as conn:
+        if args.command == "up":
+            migrate_up(conn)
+        elif args.command == "status":
+            migration_status(conn)
+        elif args.command == "refresh":
+            refresh(conn)
+        elif args.command == "check":
+            if check_indexes(conn):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
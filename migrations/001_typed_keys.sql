@@ -0,0 +1,52 @@
+-- Genormaliseerde sleutels naar de definitietabellen.
+-- De app joinde op CAST(s.metric_id AS TEXT) = d.id en REPLACE(s.metric_id, 's', '') = d.id:
+-- zo'n expressie kan geen index gebruiken. Een opgeslagen kolom met het juiste type wel.
+
+ALTER TABLE analysis.player_final_scores
+    ADD COLUMN IF NOT EXISTS definition_id text GENERATED ALWAYS AS (CAST(metric_id AS text)) STORED;
+
+ALTER TABLE analysis.kpis_final_scores
+    ADD COLUMN IF NOT EXISTS definition_id text GENERATED ALWAYS AS (CAST(metric_id AS text)) STORED;
+
+ALTER TABLE analysis.squad_final_scores
+    ADD COLUMN IF NOT EXISTS definition_id text GENERATED ALWAYS AS (REPLACE(CAST(metric_id AS text), 's', '')) STORED;
+
+ALTER TABLE analysis.squadkpi_final_scores
+    ADD COLUMN IF NOT EXISTS definition_id text GENERATED ALWAYS AS (REPLACE(CAST(metric_id AS text), 'k', '')) STORED;
+
+-- Sleutelkolommen krijgen exact het type van de tabel waarnaar ze verwijzen, zodat
+-- joins zonder CAST(... AS TEXT) kunnen en de indexen uit 002 bruikbaar zijn.
+DO $$
+DECLARE
+    k record;
+    wanted text;
+    current text;
+BEGIN
+    FOR k IN SELECT * FROM (VALUES
+        ('analysis.final_impect_scores', 'playerId', 'public.players'),
+        ('analysis.final_impect_scores', 'squadId', 'public.squads'),
+        ('analysis.final_impect_scores', 'iterationId', 'public.iterations'),
+        ('analysis.player_final_scores', 'playerId', 'public.players'),
+        ('analysis.player_final_scores', 'iterationId', 'public.iterations'),
+        ('analysis.kpis_final_scores', 'playerId', 'public.players'),
+        ('analysis.kpis_final_scores', 'iterationId', 'public.iterations'),
+        ('analysis.squad_final_scores', 'squadId', 'public.squads'),
+        ('analysis.squad_final_scores', 'iterationId', 'public.iterations'),
+        ('analysis.squadkpi_final_scores', 'squadId', 'public.squads'),
+        ('analysis.squadkpi_final_scores', 'iterationId', 'public.iterations'),
+        ('analysis.squad_profile_scores', 'squadId', 'public.squads'),
+        ('analysis.squad_profile_scores', 'iterationId', 'public.iterations'),
+        ('analysis.scouting_reports', 'playerId', 'public.players'),
+        ('analysis.scouting_reports', 'iterationId', 'public.iterations'),
+        ('analysis.scouting_reports', 'matchId', 'public.matches')
+    ) AS v(tbl, col, ref)
+    LOOP
+        SELECT format_type(atttypid, atttypmod) INTO wanted
+        FROM pg_attribute WHERE attrelid = k.ref::regclass AND attname = 'id';
+        SELECT format_type(atttypid, atttypmod) INTO current
+        FROM pg_attribute WHERE attrelid = k.tbl::regclass AND attname = k.col;
+        IF current IS DISTINCT FROM wanted THEN
+            EXECUTE format('ALTER TABLE %s ALTER COLUMN %I TYPE %s USING %I::%s', k.tbl, k.col, wanted, k.col, wanted);
+        END IF;
+    END LOOP;
+END $$;
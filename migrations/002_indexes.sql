@@ -0,0 +1,45 @@
+-- Indexen voor de queries van de app (zie `python migrate.py check`).
+
+-- Spelerslijst, spelerprofiel en vergelijkingsindex per positie
+CREATE INDEX IF NOT EXISTS final_impect_scores_iteration_player_idx
+    ON analysis.final_impect_scores ("iterationId", "playerId");
+CREATE INDEX IF NOT EXISTS final_impect_scores_position_idx
+    ON analysis.final_impect_scores (position);
+
+-- Metrieken en KPIs per speler: (iterationId, playerId, metric_id), score mee in de index
+CREATE INDEX IF NOT EXISTS player_final_scores_lookup_idx
+    ON analysis.player_final_scores ("iterationId", "playerId", metric_id) INCLUDE (definition_id, final_score_1_to_100);
+CREATE INDEX IF NOT EXISTS kpis_final_scores_lookup_idx
+    ON analysis.kpis_final_scores ("iterationId", "playerId", metric_id) INCLUDE (definition_id, final_score_1_to_100);
+
+-- Teams: (squadId, iterationId). Voor squad_final_scores staat iterationId vooraan,
+-- zodat ook de teamlijst (enkel iterationId) dezelfde index gebruikt.
+CREATE INDEX IF NOT EXISTS squad_final_scores_lookup_idx
+    ON analysis.squad_final_scores ("iterationId", "squadId") INCLUDE (definition_id, final_score_1_to_100);
+CREATE INDEX IF NOT EXISTS squadkpi_final_scores_lookup_idx
+    ON analysis.squadkpi_final_scores ("squadId", "iterationId") INCLUDE (definition_id, final_score_1_to_100);
+CREATE INDEX IF NOT EXISTS squad_profile_scores_lookup_idx
+    ON analysis.squad_profile_scores ("squadId", "iterationId") INCLUDE (profile_name, score);
+
+-- Rapporten
+CREATE INDEX IF NOT EXISTS scouting_reports_lookup_idx
+    ON analysis.scouting_reports ("iterationId", "playerId");
+
+-- Opzoektabellen: enkel een index op id als er nog geen (primary key) index op staat
+DO $$
+DECLARE
+    tbl text;
+BEGIN
+    FOREACH tbl IN ARRAY ARRAY['public.players', 'public.squads', 'public.iterations', 'public.matches',
+                               'public.player_score_definitions', 'public.squad_score_definitions',
+                               'analysis.kpi_definitions']
+    LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+            WHERE i.indrelid = tbl::regclass AND a.attname = 'id'
+        ) THEN
+            EXECUTE format('CREATE INDEX %I ON %s (id)', replace(tbl, '.', '_') || '_id_idx', tbl);
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,32 @@
+-- Scores vooraf gejoind met hun definities. De app leest metrieken en KPIs enkel nog
+-- uit deze views; `python migrate.py refresh` ververst ze na elke ETL-run.
+-- Let op: de ETL mag de basistabellen niet DROPpen (TRUNCATE + INSERT wel), anders
+-- blokkeren deze views de DROP.
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analysis.mv_player_metric_scores AS
+    SELECT s."iterationId", s."playerId", s.metric_id, d.name, d.details_label, s.final_score_1_to_100
+    FROM analysis.player_final_scores s
+    JOIN public.player_score_definitions d ON d.id = s.definition_id;
+CREATE INDEX IF NOT EXISTS mv_player_metric_scores_lookup_idx
+    ON analysis.mv_player_metric_scores ("iterationId", "playerId", metric_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analysis.mv_player_kpi_scores AS
+    SELECT s."iterationId", s."playerId", s.metric_id, d.name, d.context, s.final_score_1_to_100
+    FROM analysis.kpis_final_scores s
+    JOIN analysis.kpi_definitions d ON d.id = s.definition_id;
+CREATE INDEX IF NOT EXISTS mv_player_kpi_scores_lookup_idx
+    ON analysis.mv_player_kpi_scores ("iterationId", "playerId", metric_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analysis.mv_squad_metric_scores AS
+    SELECT s."iterationId", s."squadId", s.metric_id, d.name, d.details_label, d.inverted, s.final_score_1_to_100
+    FROM analysis.squad_final_scores s
+    JOIN public.squad_score_definitions d ON d.id = s.definition_id;
+CREATE INDEX IF NOT EXISTS mv_squad_metric_scores_lookup_idx
+    ON analysis.mv_squad_metric_scores ("squadId", "iterationId");
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analysis.mv_squad_kpi_scores AS
+    SELECT s."iterationId", s."squadId", s.metric_id, d.name, s.final_score_1_to_100
+    FROM analysis.squadkpi_final_scores s
+    JOIN analysis.kpi_definitions d ON d.id = s.definition_id;
+CREATE INDEX IF NOT EXISTS mv_squad_kpi_scores_lookup_idx
+    ON analysis.mv_squad_kpi_scores ("squadId", "iterationId");
@@ -0,0 +1,10 @@
+-- Watermark van de data. `python migrate.py refresh` hoogt die op na elke ETL-run; de app
+-- neemt hem op in de cache-sleutel (zie db.data_version), zodat verse data meteen
+-- zichtbaar is i.p.v. pas na het verlopen van de cache.
+
+CREATE TABLE IF NOT EXISTS analysis.data_version (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),  -- altijd exact één rij
+    version bigint NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+INSERT INTO analysis.data_version (id, version) VALUES (true, 1) ON CONFLICT (id) DO NOTHING;
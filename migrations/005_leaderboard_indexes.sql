@@ -0,0 +1,7 @@
+-- Ranglijst (leaderboard.py): top-k op één metriek/KPI binnen de iteraties van een seizoen.
+-- Per (metric_id, iteratie) liggen de scores al gesorteerd: geen volledige scan + sort.
+
+CREATE INDEX IF NOT EXISTS mv_player_metric_scores_rank_idx
+    ON analysis.mv_player_metric_scores (metric_id, "iterationId", final_score_1_to_100 DESC) INCLUDE ("playerId");
+CREATE INDEX IF NOT EXISTS mv_player_kpi_scores_rank_idx
+    ON analysis.mv_player_kpi_scores (metric_id, "iterationId", final_score_1_to_100 DESC) INCLUDE ("playerId");
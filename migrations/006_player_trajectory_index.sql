@@ -0,0 +1,6 @@
+-- Ontwikkeling van een speler (trajectory.py): alle iteraties van één playerId. De index
+-- van 002 begint met iterationId en helpt daar niet; metrieken/KPIs volgen daarna per
+-- iteratie via de lookup-indexen van de materialized views.
+
+CREATE INDEX IF NOT EXISTS final_impect_scores_player_idx
+    ON analysis.final_impect_scores ("playerId");
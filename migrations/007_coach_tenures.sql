@@ -0,0 +1,66 @@
+-- Coaches (coaches.py). public.coach_tenures wordt gevuld door de ETL: één rij per periode
+-- dat een coach een ploeg trainde (end_date NULL = nog in functie). De app leest enkel de
+-- compacte aggregaten hieronder; `python migrate.py refresh` herberekent daarvan alleen de
+-- periodes waarvan de wedstrijden veranderd zijn (zie migrate.refresh_coach_tenures).
+
+CREATE TABLE IF NOT EXISTS public.coach_tenures (
+    "coachId" text NOT NULL,
+    name text,
+    "squadId" text NOT NULL,
+    start_date date NOT NULL,
+    end_date date
+);
+
+CREATE TABLE IF NOT EXISTS analysis.coach_tenure_summary (
+    tenure_id text PRIMARY KEY,          -- coachId:squadId:start_date
+    "coachId" text NOT NULL,
+    name text,
+    "squadId" text NOT NULL,
+    start_date date NOT NULL,
+    end_date date,
+    matches integer NOT NULL,
+    fingerprint text NOT NULL,           -- md5 over wedstrijden en ploegscores per iteratie, zie refresh
+    refreshed_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS coach_tenure_summary_coach_idx ON analysis.coach_tenure_summary ("coachId");
+
+-- Gewicht van elke iteratie in het aggregaat: wedstrijden van de periode in die iteratie
+CREATE TABLE IF NOT EXISTS analysis.coach_tenure_iterations (
+    tenure_id text NOT NULL REFERENCES analysis.coach_tenure_summary ON DELETE CASCADE,
+    "iterationId" text NOT NULL,
+    matches integer NOT NULL,
+    PRIMARY KEY (tenure_id, "iterationId")
+);
+
+-- Gewogen gemiddelde per periode. kind: 0 = profiel (key = profile_name), 1 = metriek
+-- (key = squad_score_definitions.id), 2 = KPI (key = kpi_definitions.id)
+CREATE TABLE IF NOT EXISTS analysis.coach_tenure_scores (
+    tenure_id text NOT NULL REFERENCES analysis.coach_tenure_summary ON DELETE CASCADE,
+    kind smallint NOT NULL,
+    key text NOT NULL,
+    score real NOT NULL,
+    PRIMARY KEY (tenure_id, kind, key)
+);
+
+-- Zelfde sleuteltypes als de tabellen waarnaar verwezen wordt (zoals in 001)
+DO $$
+DECLARE
+    k record;
+    wanted text;
+    current text;
+BEGIN
+    FOR k IN SELECT * FROM (VALUES
+        ('public.coach_tenures', 'squadId', 'public.squads'),
+        ('analysis.coach_tenure_summary', 'squadId', 'public.squads'),
+        ('analysis.coach_tenure_iterations', 'iterationId', 'public.iterations')
+    ) AS v(tbl, col, ref)
+    LOOP
+        SELECT format_type(atttypid, atttypmod) INTO wanted
+        FROM pg_attribute WHERE attrelid = k.ref::regclass AND attname = 'id';
+        SELECT format_type(atttypid, atttypmod) INTO current
+        FROM pg_attribute WHERE attrelid = k.tbl::regclass AND attname = k.col;
+        IF current IS DISTINCT FROM wanted THEN
+            EXECUTE format('ALTER TABLE %s ALTER COLUMN %I TYPE %s USING %I::%s', k.tbl, k.col, wanted, k.col, wanted);
+        END IF;
+    END LOOP;
+END $$;
@@ -0,0 +1,24 @@
+-- `python migrate.py refresh` ververst de materialized views met CONCURRENTLY: de app
+-- blijft lezen tijdens het verversen (een gewone REFRESH neemt een ACCESS EXCLUSIVE lock
+-- en laat elke pagina wachten). Daarvoor heeft elke view een unieke index nodig.
+-- Sleutel: één score per (iteratie, speler/ploeg, metriek), zoals de app al aanneemt.
+-- Faalt deze migratie op dubbele rijen, dan levert de ETL meer dan één score per
+-- sleutel: eerst daar oplossen.
+-- De lookup-indexen van 003 hebben dezelfde kolommen (spelers) of zijn een prefix van de
+-- nieuwe sleutel (ploegen): die vallen weg.
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_player_metric_scores_key
+    ON analysis.mv_player_metric_scores ("iterationId", "playerId", metric_id);
+DROP INDEX IF EXISTS analysis.mv_player_metric_scores_lookup_idx;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_player_kpi_scores_key
+    ON analysis.mv_player_kpi_scores ("iterationId", "playerId", metric_id);
+DROP INDEX IF EXISTS analysis.mv_player_kpi_scores_lookup_idx;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_squad_metric_scores_key
+    ON analysis.mv_squad_metric_scores ("squadId", "iterationId", metric_id);
+DROP INDEX IF EXISTS analysis.mv_squad_metric_scores_lookup_idx;
+
+CREATE UNIQUE INDEX IF NOT EXISTS mv_squad_kpi_scores_key
+    ON analysis.mv_squad_kpi_scores ("squadId", "iterationId", metric_id);
+DROP INDEX IF EXISTS analysis.mv_squad_kpi_scores_lookup_idx;
@@ -0,0 +1,115 @@
+from dataclasses import dataclass, field
+from functools import partial
+
+import pandas as pd
+
+from db import cached_query, run_parallel
+from metrics import timed
+from profiles import POSITION_METRICS, POSITION_KPIS, get_config_for_position
+from similarity import PlayerSimilarityIndex, load_player_similarity_index
+
+# -----------------------------------------------------------------------------
+# SPELERPAGINA: ALLE SECTIES IN ÉÉN KEER OPHALEN
+# -----------------------------------------------------------------------------
+# De positie is al gekend uit de spelerslijst, dus geen enkele sectie hoeft op een
+# andere te wachten. Alle queries gaan tegelijk over de connection pool.
+
+PLAYERS_QUERY = """
+    SELECT p.commonname, p.id as "playerId", sq.name as "squadName", s.position
+    FROM public.players p
+    JOIN analysis.final_impect_scores s ON p.id = s."playerId"
+    LEFT JOIN public.squads sq ON s."squadId" = sq.id
+    WHERE s."iterationId" = %s
+    ORDER BY p.commonname;
+"""
+
+SCORE_QUERY = """
+    SELECT p.commonname, a.position, p.birthdate, p.birthplace, p.leg, sq_curr.name as "current_team_name",
+        a.cb_kvk_score, a.wb_kvk_score, a.dm_kvk_score, a.cm_kvk_score, a.acm_kvk_score, a.fa_kvk_score, a.fw_kvk_score,
+        a.footballing_cb_kvk_score, a.controlling_cb_kvk_score, a.defensive_wb_kvk_score, a.offensive_wingback_kvk_score,
+        a.ball_winning_dm_kvk_score, a.playmaker_dm_kvk_score, a.box_to_box_cm_kvk_score, a.deep_running_acm_kvk_score,
+        a.playmaker_off_acm_kvk_score, a.fa_inside_kvk_score, a.fa_wide_kvk_score, a.fw_target_kvk_score,
+        a.fw_running_kvk_score, a.fw_finisher_kvk_score
+    FROM analysis.final_impect_scores a
+    JOIN public.players p ON a."playerId" = p.id
+    LEFT JOIN public.squads sq_curr ON p."currentSquadId" = sq_curr.id
+    WHERE a."iterationId" = %s AND p.id = %s
+"""
+
+# Metrieken en KPIs uit de materialized views van migrations/003 (vooraf gejoind met de definities)
+METRICS_QUERY = """SELECT name as "Metriek", details_label as "Detail", final_score_1_to_100 as "Score" FROM analysis.mv_player_metric_scores WHERE "iterationId" = %s AND "playerId" = %s AND metric_id IN %s ORDER BY final_score_1_to_100 DESC"""
+
+KPIS_QUERY = """SELECT name as "KPI", context as "Context", final_score_1_to_100 as "Score" FROM analysis.mv_player_kpi_scores WHERE "iterationId" = %s AND "playerId" = %s AND metric_id IN %s ORDER BY final_score_1_to_100 DESC"""
+
+REPORTS_QUERY = """
+    SELECT m."scheduledDate" as "Datum", sq_h.name as "Thuisploeg", sq_a.name as "Uitploeg", r.position as "Positie", r.label as "Verdict"
+    FROM analysis.scouting_reports r JOIN public.matches m ON r."matchId" = m.id LEFT JOIN public.squads sq_h ON m."homeSquadId" = sq_h.id LEFT JOIN public.squads sq_a ON m."awaySquadId" = sq_a.id
+    WHERE r."iterationId" = %s AND r."playerId" = %s AND m.available = true ORDER BY m."scheduledDate" DESC
+"""
+
+
+@dataclass
+class PlayerPage:
+    iteration_id: str
+    player_id: str
+    position: str
+    scores: pd.DataFrame
+    metrics_aan_bal: pd.DataFrame
+    metrics_zonder_bal: pd.DataFrame
+    kpis_aan_bal: pd.DataFrame
+    kpis_zonder_bal: pd.DataFrame
+    reports: pd.DataFrame
+    similar_index: PlayerSimilarityIndex | None = None
+    errors: dict = field(default_factory=dict)  # sectie -> Exception
+
+    @property
+    def profile(self):
+        return self.scores.iloc[0] if not self.scores.empty else None
+
+    @property
+    def metrics_config(self):
+        return get_config_for_position(self.position, POSITION_METRICS)
+
+    @property
+    def kpis_config(self):
+        return get_config_for_position(self.position, POSITION_KPIS)
+
+
+def player_page_queries(iteration_id, player_id, position):
+    # {sectie: (sql, params)}. Secties zonder ids voor deze positie krijgen geen query.
+    queries = {
+        "scores": (SCORE_QUERY, (iteration_id, player_id)),
+        "reports": (REPORTS_QUERY, (iteration_id, player_id)),
+    }
+    for prefix, query, config_dict in (("metrics", METRICS_QUERY, POSITION_METRICS), ("kpis", KPIS_QUERY, POSITION_KPIS)):
+        config = get_config_for_position(position, config_dict) or {}
+        for part in ("aan_bal", "zonder_bal"):
+            ids = config.get(part, [])
+            if ids:
+                queries[f"{prefix}_{part}"] = (query, (iteration_id, player_id, tuple(str(x) for x in ids)))
+    return queries
+
+
+def load_player_page(iteration_id, player_id, position, include_similar=True):
+    iteration_id, player_id = str(iteration_id), str(player_id)
+    tasks = {name: timed(f"speler/laden/{name}", partial(cached_query, q, p)) for name, (q, p) in player_page_queries(iteration_id, player_id, position).items()}
+    if include_similar and position:
+        tasks["similar_index"] = timed("speler/laden/similar_index", partial(load_player_similarity_index, position))
+    results, errors = run_parallel(tasks)
+
+    def frame(name):
+        return results.get(name, pd.DataFrame())
+
+    return PlayerPage(
+        iteration_id=iteration_id,
+        player_id=player_id,
+        position=position,
+        scores=frame("scores"),
+        metrics_aan_bal=frame("metrics_aan_bal"),
+        metrics_zonder_bal=frame("metrics_zonder_bal"),
+        kpis_aan_bal=frame("kpis_aan_bal"),
+        kpis_zonder_bal=frame("kpis_zonder_bal"),
+        reports=frame("reports"),
+        similar_index=results.get("similar_index"),
+        errors=errors,
+    )
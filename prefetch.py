@@ -0,0 +1,114 @@
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+from catalog import load_iteration_catalog
+from db import cached_query, data_version, result_cache, setting
+from player_page import PLAYERS_QUERY, player_page_queries
+from team_page import TEAMS_QUERY, SQUAD_DETAILS_QUERY, SQUAD_PROFILE_QUERY, SQUAD_METRICS_QUERY, SQUAD_KPIS_QUERY
+
+# -----------------------------------------------------------------------------
+# PREFETCH VAN WAARSCHIJNLIJKE NAVIGATIEDOELEN
+# -----------------------------------------------------------------------------
+# Na de tabel met vergelijkbare spelers/teams klikt de gebruiker meestal op één van die
+# rijen. Terwijl de gebruiker nog leest, vullen een paar achtergrondthreads de resultaten
+# cache met de queries van die doelen, zodat de navigatie daarna uit de cache komt.
+#
+# Begrensd op drie manieren: weinig workers (de app zelf heeft voorrang op de pool), een
+# maximum aantal wachtende doelen over alle sessies, en een budget per sessie (doelen per
+# BUDGET_WINDOW seconden). Een nieuwe tabel annuleert de nog niet gestarte doelen van de
+# vorige. Optioneel in st.secrets["prefetch"]: enabled (standaard true), workers (2),
+# max_pending (40) en session_budget (60).
+
+BUDGET_WINDOW = 600
+
+log = logging.getLogger("kvk.prefetch")
+
+
+@functools.lru_cache(maxsize=1)
+def _settings():
+    return {
+        "enabled": bool(setting("prefetch", "enabled", True)),
+        "workers": int(setting("prefetch", "workers", 2)),
+        "max_pending": int(setting("prefetch", "max_pending", 40)),
+        "session_budget": int(setting("prefetch", "session_budget", 60)),
+    }
+
+
+@st.cache_resource
+def _prefetch_pool():
+    cfg = _settings()
+    executor = ThreadPoolExecutor(max_workers=cfg["workers"], thread_name_prefix="kvk-prefetch")
+    return executor, threading.BoundedSemaphore(cfg["max_pending"])
+
+
+def player_targets(rows, position):
+    # rows: resultaat van PlayerSimilarityIndex.most_similar; zelfde queries als load_player_page
+    # (plus de spelerslijst van de doel-iteratie, die de navigatie ook laadt)
+    return [
+        [(PLAYERS_QUERY, (str(iteration_id),))] + list(player_page_queries(str(iteration_id), str(player_id), position).values())
+        for player_id, iteration_id in zip(rows["playerId"], rows["iterationId"])
+    ]
+
+
+def team_targets(rows):
+    # rows: resultaat van SquadSimilarityIndex.most_similar; de navigatie opent de standaard iteratie
+    catalog = load_iteration_catalog()
+    targets = []
+    for squad_id, season, competition in zip(rows["squadId"], rows["Seizoen"], rows["Competitie"]):
+        iteration_id = catalog.default_iteration(season, competition)
+        if iteration_id is None:
+            continue
+        squad_id = str(squad_id)
+        targets.append([
+            (TEAMS_QUERY, (iteration_id,)),
+            (SQUAD_DETAILS_QUERY, (squad_id,)),
+            (SQUAD_PROFILE_QUERY, (squad_id, iteration_id)),
+            (SQUAD_METRICS_QUERY, (squad_id, iteration_id)),
+            (SQUAD_KPIS_QUERY, (squad_id, iteration_id)),
+        ])
+    return targets
+
+
+def _warm(queries):
+    for query, params in queries:
+        try:
+            cached_query(query, params)
+        except Exception as e:
+            # Fouten worden niet gecachet: bij de echte navigatie krijgt de gebruiker ze te zien
+            log.debug("Prefetch mislukt: %s", e)
+
+
+def _session_budget():
+    # Token bucket in de sessie: session_budget doelen, aangevuld over BUDGET_WINDOW seconden
+    capacity, now = _settings()["session_budget"], time.monotonic()
+    tokens, last = st.session_state.get("_prefetch_budget", (capacity, now))
+    return min(capacity, tokens + (now - last) * capacity / BUDGET_WINDOW), now
+
+
+def prefetch(targets):
+    # targets: per doel een lijst (sql, params), meest waarschijnlijke eerst. Enkel vanuit de
+    # script thread aanroepen (gebruikt st.session_state). Geeft het aantal ingeplande doelen.
+    if not _settings()["enabled"]:
+        return 0
+    for future in st.session_state.get("_prefetch_futures", []):
+        future.cancel()
+
+    version, cache = data_version(), result_cache()
+    todo = [queries for queries in targets if not all(cache.contains(version, q, p) for q, p in queries)]
+    tokens, now = _session_budget()
+    executor, slots = _prefetch_pool()
+    futures = []
+    for queries in todo[:int(tokens)]:
+        if not slots.acquire(blocking=False):
+            break  # al genoeg werk in de wachtrij (alle sessies samen)
+        future = executor.submit(_warm, queries)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+    st.session_state["_prefetch_budget"] = (tokens - len(futures), now)
+    st.session_state["_prefetch_futures"] = futures
+    return len(futures)
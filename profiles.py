@@ -0,0 +1,60 @@
+# --- MAPPING: SPELER SCORES ---
+POSITION_METRICS = {
+    "central_defender": {"aan_bal": [66, 58, 64, 10, 163], "zonder_bal": [103, 93, 32, 94, 17, 65, 92]},
+    "wingback": {"aan_bal": [61, 66, 58, 54, 53, 52, 10, 9, 14], "zonder_bal": [68, 69, 17, 70]},
+    "defensive_midfield": {"aan_bal": [60, 10, 163, 44], "zonder_bal": [29, 65, 17, 16, 69, 68, 67]},
+    "central_midfield": {"aan_bal": [60, 61, 62, 73, 72, 64, 10, 163, 145], "zonder_bal": [65, 17, 69, 68]},
+    "attacking_midfield": {"aan_bal": [60, 61, 62, 73, 58, 2, 15, 52, 72, 10, 74, 9], "zonder_bal": []},
+    "winger": {"aan_bal": [60, 61, 62, 58, 54, 1, 53, 10, 9, 14, 6, 145], "zonder_bal": []},
+    "center_forward": {"aan_bal": [60, 61, 62, 73, 63, 2, 64, 10, 74, 9, 92, 97, 14, 6, 145], "zonder_bal": []}
+}
+
+# --- MAPPING: SPELER KPIS ---
+POSITION_KPIS = {
+    "central_defender": {"aan_bal": [107, 106, 1534, 21, 2, 0, 1405, 1422], "zonder_bal": [1016, 1015, 1014, 24, 867, 1409]},
+    "wingback": {"aan_bal": [172, 171, 2, 9, 0], "zonder_bal": [23, 27, 1409, 1536, 1523]},
+    "defensive_midfield": {"aan_bal": [184, 0, 107, 87, 106, 109, 122, 1422, 1423], "zonder_bal": [21, 23, 27, 865, 867, 619, 1536, 1610]},
+    "central_midfield": {"aan_bal": [0, 1405, 1425], "zonder_bal": [23, 27, 24, 1536]},
+    "attacking_midfield": {"aan_bal": [77, 1350, 2, 169, 167, 467, 0, 7, 141, 1425, 1422, 1423, 1253, 1252, 1254], "zonder_bal": [1536]},
+    "winger": {"aan_bal": [25, 2, 88, 172, 171, 167, 9, 87, 7, 1401, 1425], "zonder_bal": [1536]},
+    "center_forward": {"aan_bal": [9, 427, 426, 1401, 82], "zonder_bal": [1536]}
+}
+
+# --- MAPPING: POSITIEGROEP (key in de configs hierboven) -> posities in de database ---
+POSITION_GROUPS = {
+    "central_defender": ["CENTRAL_DEFENDER"],
+    "wingback": ["RIGHT_WINGBACK_DEFENDER", "LEFT_WINGBACK_DEFENDER"],
+    "defensive_midfield": ["DEFENSIVE_MIDFIELD", "DEFENSE_MIDFIELD"],
+    "central_midfield": ["CENTRAL_MIDFIELD"],
+    "attacking_midfield": ["ATTACKING_MIDFIELD", "OFFENSIVE_MIDFIELD"],
+    "winger": ["RIGHT_WINGER", "LEFT_WINGER"],
+    "center_forward": ["CENTER_FORWARD", "STRIKER"],
+}
+POSITION_GROUP_LABELS = {
+    "central_defender": "Centrale Verdediger", "wingback": "Wingback", "defensive_midfield": "Verdedigende Mid.",
+    "central_midfield": "Centrale Mid.", "attacking_midfield": "Aanvallende Mid.", "winger": "Flankaanvaller",
+    "center_forward": "Spits",
+}
+
+def position_group(db_position):
+    if not db_position: return None
+    pos = str(db_position).upper().strip()
+    return next((group for group, positions in POSITION_GROUPS.items() if pos in positions), None)
+
+def get_config_for_position(db_position, config_dict):
+    group = position_group(db_position)
+    return config_dict.get(group) if group else None
+
+# --- MAPPING: KVK PROFIELEN (label in de app -> kolom in analysis.final_impect_scores) ---
+PROFILE_COLUMNS = {
+    "KVK Centrale Verdediger": 'cb_kvk_score', "KVK Wingback": 'wb_kvk_score', "KVK Verdedigende Mid.": 'dm_kvk_score',
+    "KVK Centrale Mid.": 'cm_kvk_score', "KVK Aanvallende Mid.": 'acm_kvk_score', "KVK Flank Aanvaller": 'fa_kvk_score',
+    "KVK Spits": 'fw_kvk_score', "Voetballende CV": 'footballing_cb_kvk_score', "Controlerende CV": 'controlling_cb_kvk_score',
+    "Verdedigende Back": 'defensive_wb_kvk_score', "Aanvallende Back": 'offensive_wingback_kvk_score', "Ballenafpakker (CVM)": 'ball_winning_dm_kvk_score',
+    "Spelmaker (CVM)": 'playmaker_dm_kvk_score', "Box-to-Box (CM)": 'box_to_box_cm_kvk_score', "Diepgaande '10'": 'deep_running_acm_kvk_score',
+    "Spelmakende '10'": 'playmaker_off_acm_kvk_score', "Buitenspeler (Binnendoor)": 'fa_inside_kvk_score', "Buitenspeler (Buitenom)": 'fa_wide_kvk_score',
+    "Targetman": 'fw_target_kvk_score', "Lopende Spits": 'fw_running_kvk_score', "Afmaker": 'fw_finisher_kvk_score'
+}
+
+# De 21 *_kvk_score kolommen, in vaste volgorde
+PROFILE_SCORE_COLUMNS = list(PROFILE_COLUMNS.values())
@@ -0,0 +1,324 @@
+"""Spelerrapporten als statische HTML (afdrukbaar naar PDF), zonder app of browser.
+
+    python report.py --season 25/26 --competition "Jupiler Pro League"
+    python report.py --iteration 1234 --squad "KV Kortrijk" --squad "Club Brugge"
+    python report.py --season 25/26 --squads-file teams.txt --out rapporten --workers 8
+
+Per speler: profielscores, metrieken en KPIs (aan/zonder bal volgens
+get_config_for_position), een samenvatting van de scoutingrapporten en de 10 meest
+gelijkende spelers, plus een index.html per iteratie. Zonder --competition: alle
+competities van het seizoen. Zelfde databron als de app (Postgres uit st.secrets, of
+KVK_DATA_SOURCE=snapshot).
+
+De data komt in vier bulkqueries per iteratie (niet per speler), de vergelijkbare
+spelers in één most_similar_many per positie. Daarna rendert één process pool alle
+iteraties: elke worker krijgt de gedeelde, read-only data één keer mee (initializer),
+een taak is daarna enkel nog een (iteratie, playerId).
+"""
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from catalog import load_iteration_catalog
+from db import fetch_dataframe, run_parallel
+from profiles import POSITION_KPIS, POSITION_METRICS, PROFILE_COLUMNS, PROFILE_SCORE_COLUMNS, get_config_for_position
+from similarity import default_similarity_seasons, load_player_similarity_index
+
+REPORT_PLAYERS_QUERY = f"""
+    SELECT a."playerId", p.commonname, sq.name as "squadName", a.position, p.birthdate, p.birthplace, p.leg,
+        sq_curr.name as "current_team_name", {", ".join(f"a.{c}" for c in PROFILE_SCORE_COLUMNS)}
+    FROM analysis.final_impect_scores a
+    JOIN public.players p ON a."playerId" = p.id
+    LEFT JOIN public.squads sq ON a."squadId" = sq.id
+    LEFT JOIN public.squads sq_curr ON p."currentSquadId" = sq_curr.id
+    WHERE a."iterationId" = %s
+    ORDER BY sq.name, p.commonname
+"""
+
+REPORT_METRICS_QUERY = """SELECT "playerId", metric_id, name as "Metriek", details_label as "Detail", final_score_1_to_100 as "Score" FROM analysis.mv_player_metric_scores WHERE "iterationId" = %s AND metric_id IN %s"""
+
+REPORT_KPIS_QUERY = """SELECT "playerId", metric_id, name as "KPI", context as "Context", final_score_1_to_100 as "Score" FROM analysis.mv_player_kpi_scores WHERE "iterationId" = %s AND metric_id IN %s"""
+
+REPORT_REPORTS_QUERY = """
+    SELECT r."playerId", m."scheduledDate" as "Datum", sq_h.name as "Thuisploeg", sq_a.name as "Uitploeg", r.position as "Positie", r.label as "Verdict"
+    FROM analysis.scouting_reports r JOIN public.matches m ON r."matchId" = m.id LEFT JOIN public.squads sq_h ON m."homeSquadId" = sq_h.id LEFT JOIN public.squads sq_a ON m."awaySquadId" = sq_a.id
+    WHERE r."iterationId" = %s AND m.available = true ORDER BY m."scheduledDate" DESC
+"""
+
+SIMILAR_K = 10
+LEVEL_WINDOW = 15
+HIGH_SCORE = 66
+
+CSS = """
+body { font-family: -apple-system, "Segoe UI", Helvetica, Arial, sans-serif; color: #222; max-width: 960px; margin: 24px auto; font-size: 13px; }
+h1 { color: #d71920; margin-bottom: 0; } h2 { border-bottom: 2px solid #d71920; padding-bottom: 2px; margin-top: 28px; }
+.meta { color: #666; margin-top: 4px; } .cols { display: flex; gap: 24px; } .cols > div { flex: 1; min-width: 0; }
+table { border-collapse: collapse; width: 100%; margin: 6px 0; } th, td { padding: 3px 6px; border-bottom: 1px solid #ddd; text-align: left; }
+th { background: #f4f4f4; } td.num { text-align: right; } .hi { color: #1e9e55; font-weight: bold; } .empty { color: #888; font-style: italic; }
+@page { size: A4; margin: 14mm; }
+@media print { body { margin: 0; max-width: none; } h2 { break-after: avoid; } table, svg { break-inside: avoid; } }
+"""
+
+
+# -----------------------------------------------------------------------------
+# DATA (IN HET HOOFDPROCES, EEN PAAR QUERIES PER ITERATIE)
+# -----------------------------------------------------------------------------
+
+def _all_ids(config_dict):
+    return tuple(dict.fromkeys(str(x) for config in config_dict.values() for part in ("aan_bal", "zonder_bal") for x in config.get(part, [])))
+
+
+def similar_players(players, iteration_id, seasons):
+    # {playerId: top-k DataFrame}, per positie in één pass over de similarity index
+    out = {}
+    for position, group in players.groupby("position", sort=False):
+        index = load_player_similarity_index(position)
+        values = group[PROFILE_SCORE_COLUMNS].to_numpy(dtype=np.float32, na_value=np.nan)
+        targets = [(pid, iteration_id, [c for c, v in zip(PROFILE_SCORE_COLUMNS, row) if v > 0]) for pid, row in zip(group["playerId"], values)]
+        targets = [t for t in targets if t[2]]
+        for (player_id, _, _), result in zip(targets, index.most_similar_many(targets, k=SIMILAR_K, level_window=LEVEL_WINDOW, seasons=seasons)):
+            if result is not None:
+                out[player_id] = result[["Naam", "Team", "Seizoen", "Competitie", "Avg Score", "Gelijkenis %"]]
+    return out
+
+
+def load_iteration_data(iteration_id, squads=None, seasons=None):
+    tasks = {
+        "players": partial(fetch_dataframe, REPORT_PLAYERS_QUERY, (iteration_id,)),
+        "metrics": partial(fetch_dataframe, REPORT_METRICS_QUERY, (iteration_id, _all_ids(POSITION_METRICS) or ("0",))),
+        "kpis": partial(fetch_dataframe, REPORT_KPIS_QUERY, (iteration_id, _all_ids(POSITION_KPIS) or ("0",))),
+        "reports": partial(fetch_dataframe, REPORT_REPORTS_QUERY, (iteration_id,)),
+    }
+    results, errors = run_parallel(tasks)
+    if errors:
+        name, e = next(iter(errors.items()))
+        raise RuntimeError(f"Query {name} mislukt voor iteratie {iteration_id}: {e}") from e
+
+    players = results["players"].astype({"playerId": str}).drop_duplicates("playerId")
+    if squads:
+        players = players[players["squadName"].isin(squads)]
+    wanted = set(players["playerId"])
+
+    def by_player(df):
+        df = df.astype({"playerId": str})
+        return {pid: part.drop(columns="playerId") for pid, part in df[df["playerId"].isin(wanted)].groupby("playerId", sort=False)}
+
+    return {
+        "players": players.reset_index(drop=True),
+        "metrics": by_player(results["metrics"]),
+        "kpis": by_player(results["kpis"]),
+        "reports": by_player(results["reports"]),
+        "similar": similar_players(players, iteration_id, seasons) if len(players) else {},
+    }
+
+
+# -----------------------------------------------------------------------------
+# RENDEREN (IN DE WORKERS; ENKEL PANDAS, GEEN DATABASE)
+# -----------------------------------------------------------------------------
+
+def slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", str(text).lower()).strip("-") or "x"
+
+
+def _esc(value):
+    return "-" if value is None or (not isinstance(value, str) and pd.isna(value)) else html.escape(str(value))
+
+
+def html_table(df, score_columns=("Score",), formats=None):
+    if df is None or df.empty:
+        return '<p class="empty">Geen data.</p>'
+    formats = formats or {}
+    head = "".join(f"<th>{_esc(c)}</th>" for c in df.columns)
+    body = []
+    for row in df.itertuples(index=False):
+        cells = []
+        for column, value in zip(df.columns, row):
+            if isinstance(value, (int, float, np.number)) and not pd.isna(value):
+                cls = "num hi" if column in score_columns and value > HIGH_SCORE else "num"
+                cells.append(f'<td class="{cls}">{formats.get(column, "{:.1f}").format(value)}</td>')
+            else:
+                cells.append(f"<td>{_esc(value)}</td>")
+        body.append("<tr>" + "".join(cells) + "</tr>")
+    return f"<table><thead><tr>{head}</tr></thead><tbody>{''.join(body)}</tbody></table>"
+
+
+def profile_chart(profiles):
+    # Horizontale balken (inline SVG): blijft scherp bij afdrukken, geen JavaScript nodig
+    width, label_w, bar_h = 640, 190, 18
+    rows = []
+    for n, (label, score) in enumerate(profiles.items()):
+        y = n * (bar_h + 4)
+        color = "#d71920" if score > HIGH_SCORE else "#bdc3c7"
+        rows.append(
+            f'<text x="{label_w - 6}" y="{y + 13}" text-anchor="end" font-size="11">{html.escape(label)}</text>'
+            f'<rect x="{label_w}" y="{y}" width="{(width - label_w - 40) * score / 100:.1f}" height="{bar_h}" fill="{color}"/>'
+            f'<text x="{label_w + (width - label_w - 40) * score / 100 + 4:.1f}" y="{y + 13}" font-size="11">{score:.0f}</text>'
+        )
+    return f'<svg width="{width}" height="{len(profiles) * (bar_h + 4)}" xmlns="http://www.w3.org/2000/svg">{"".join(rows)}</svg>'
+
+
+def split_on_config(df, position, config_dict, columns):
+    # (aan bal, zonder bal) volgens get_config_for_position, hoogste score eerst
+    config = get_config_for_position(position, config_dict) or {}
+    if df is None or df.empty:
+        return None, None
+    ids = df["metric_id"].astype(str)
+    return tuple(df[ids.isin([str(x) for x in config.get(part, [])])][columns].sort_values("Score", ascending=False) for part in ("aan_bal", "zonder_bal"))
+
+
+def render_player(player, metrics, kpis, reports, similar, context):
+    profiles = {label: float(player[c]) for label, c in PROFILE_COLUMNS.items() if pd.notna(player[c]) and player[c] > 0}
+    profiles = dict(sorted(profiles.items(), key=lambda kv: -kv[1]))
+    top = next(iter(profiles.items()), None)
+    m_aan, m_zonder = split_on_config(metrics, player["position"], POSITION_METRICS, ["Metriek", "Detail", "Score"])
+    k_aan, k_zonder = split_on_config(kpis, player["position"], POSITION_KPIS, ["KPI", "Context", "Score"])
+
+    parts = [
+        f"<h1>{_esc(player['commonname'])}</h1>",
+        f'<p class="meta">{_esc(player["squadName"])} · {_esc(context["competition"])} {_esc(context["season"])} · {_esc(player["position"])}'
+        f' · geboren {_esc(player["birthdate"])} in {_esc(player["birthplace"])} · voet {_esc(player["leg"])} · huidig team {_esc(player["current_team_name"])}</p>',
+        "<h2>KVK Profielen</h2>",
+    ]
+    if top and top[1] > HIGH_SCORE:
+        parts.append(f"<p><b>✅ Positief op data profiel: {html.escape(top[0])}</b></p>")
+    parts.append(profile_chart(profiles) if profiles else '<p class="empty">Geen profielscores.</p>')
+    for title, (aan, zonder) in (("Impect Speler Scores", (m_aan, m_zonder)), ("Impect Speler KPIs", (k_aan, k_zonder))):
+        parts.append(f"<h2>{title}</h2>")
+        parts.append(f'<div class="cols"><div><h3>⚽ Aan de Bal</h3>{html_table(aan)}</div><div><h3>🛡️ Zonder Bal</h3>{html_table(zonder)}</div></div>')
+
+    parts.append("<h2>Data Scout Rapporten</h2>")
+    if reports is not None and not reports.empty:
+        counts = reports["Verdict"].value_counts()
+        parts.append("<p>" + " · ".join(f"<b>{_esc(v)}</b>: {n}" for v, n in counts.items()) + f" ({len(reports)} rapporten)</p>")
+        parts.append(html_table(reports.head(15), score_columns=()))
+    else:
+        parts.append('<p class="empty">Geen rapporten.</p>')
+
+    parts.append(f"<h2>Vergelijkbare Spelers (niveau +/- {LEVEL_WINDOW})</h2>")
+    parts.append(html_table(similar, score_columns=(), formats={"Gelijkenis %": "{:.1f}%"}))
+    return page(player["commonname"], "".join(parts))
+
+
+def page(title, body):
+    return f'<!DOCTYPE html><html lang="nl"><head><meta charset="utf-8"><title>{_esc(title)}</title><style>{CSS}</style></head><body>{body}</body></html>'
+
+
+def player_filename(player):
+    return f"{slug(player['commonname'])}-{slug(player['playerId'])}.html"
+
+
+# Per worker één keer gezet door de initializer (read-only): {iteration_id: (data, context)}
+_shared = {}
+
+
+def iteration_dir(out_root, context):
+    return os.path.join(out_root, f"{slug(context['competition'])}-{slug(context['season'])}-{slug(context['iteration_id'])}")
+
+
+def _init_worker(datasets, out_root):
+    _shared.update(datasets=datasets, out_root=out_root, rows={
+        iteration_id: {pid: i for i, pid in enumerate(data["players"]["playerId"])} for iteration_id, (data, _) in datasets.items()
+    })
+
+
+def _render_one(task):
+    iteration_id, player_id = task
+    data, context = _shared["datasets"][iteration_id]
+    player = data["players"].iloc[_shared["rows"][iteration_id][player_id]]
+    html_text = render_player(player, data["metrics"].get(player_id), data["kpis"].get(player_id), data["reports"].get(player_id), data["similar"].get(player_id), context)
+    path = os.path.join(iteration_dir(_shared["out_root"], context), player_filename(player))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(html_text)
+    return iteration_id, path
+
+
+def render_index(players, context):
+    rows = [
+        f'<tr><td>{_esc(p.squadName)}</td><td><a href="{html.escape(player_filename(p._asdict()))}">{_esc(p.commonname)}</a></td><td>{_esc(p.position)}</td></tr>'
+        for p in players[["playerId", "commonname", "squadName", "position"]].itertuples(index=False)
+    ]
+    body = f"<h1>{_esc(context['competition'])} {_esc(context['season'])}</h1><p class=\"meta\">{len(players)} spelers · iteratie {_esc(context['iteration_id'])}</p>"
+    body += f"<table><thead><tr><th>Team</th><th>Speler</th><th>Positie</th></tr></thead><tbody>{''.join(rows)}</tbody></table>"
+    return page(f"{context['competition']} {context['season']}", body)
+
+
+def render_all(datasets, out_root, workers):
+    # Eén pool voor alle iteraties: de workers starten (en krijgen de data) maar één keer
+    for data, context in datasets.values():
+        os.makedirs(iteration_dir(out_root, context), exist_ok=True)
+    tasks = [(iteration_id, pid) for iteration_id, (data, _) in datasets.items() for pid in data["players"]["playerId"]]
+    if workers > 1 and len(tasks) > 1:
+        # spawn: geen fork van een proces met open databaseverbindingen en threads
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(datasets, out_root)) as pool:
+            done = list(pool.map(_render_one, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        _init_worker(datasets, out_root)
+        done = [_render_one(task) for task in tasks]
+    for data, context in datasets.values():
+        with open(os.path.join(iteration_dir(out_root, context), "index.html"), "w", encoding="utf-8") as f:
+            f.write(render_index(data["players"], context))
+    return done
+
+
+def select_iterations(catalog, args):
+    if args.iteration:
+        return [str(i) for i in args.iteration]
+    if not args.season:
+        sys.exit("Geef --iteration of --season (en optioneel --competition).")
+    competitions = args.competition or catalog.competitions(args.season)
+    return [i for i in (catalog.default_iteration(args.season, c) for c in competitions) if i is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statische HTML-rapporten per speler voor een iteratie of een lijst teams.")
+    parser.add_argument("--iteration", action="append", help="iteratie id (herhaalbaar)")
+    parser.add_argument("--season", help="seizoen, bv. 25/26 (standaard iteratie per competitie)")
+    parser.add_argument("--competition", action="append", help="competitie binnen --season (herhaalbaar, standaard alle)")
+    parser.add_argument("--squad", action="append", default=[], help="enkel spelers van dit team (herhaalbaar)")
+    parser.add_argument("--squads-file", help="bestand met één teamnaam per regel")
+    parser.add_argument("--out", default="reports", help="doelmap (standaard: reports)")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="aantal processen voor het renderen")
+    args = parser.parse_args()
+
+    squads = list(args.squad)
+    if args.squads_file:
+        with open(args.squads_file, encoding="utf-8") as f:
+            squads += [line.strip() for line in f if line.strip()]
+
+    catalog = load_iteration_catalog()
+    iteration_ids = select_iterations(catalog, args)
+    if not iteration_ids:
+        sys.exit("Geen iteraties gevonden voor deze selectie.")
+    seasons = default_similarity_seasons(list(catalog.seasons))
+
+    t_start, datasets = time.perf_counter(), {}
+    for iteration_id in iteration_ids:
+        season, competition = catalog.locate(iteration_id) or ("?", "?")
+        context = {"iteration_id": iteration_id, "season": season, "competition": competition}
+        data = load_iteration_data(iteration_id, squads, seasons)
+        if data["players"].empty:
+            print(f"{competition} {season} ({iteration_id}): geen spelers, overgeslagen")
+            continue
+        datasets[iteration_id] = (data, context)
+        print(f"{competition} {season} ({iteration_id}): {len(data['players'])} spelers -> {iteration_dir(args.out, context)}")
+    if not datasets:
+        sys.exit("Geen spelers gevonden voor deze selectie.")
+
+    t_data = time.perf_counter()
+    done = render_all(datasets, args.out, args.workers)
+    t_end = time.perf_counter()
+    print(f"\n{len(done)} rapporten: data {t_data - t_start:.1f}s, renderen {t_end - t_data:.1f}s ({args.workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
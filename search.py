@@ -0,0 +1,109 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import compact_frame, fetch_dataframe, versioned
+
+# -----------------------------------------------------------------------------
+# SPELERS ZOEKEN: TRIGRAM INDEX OVER ALLE ITERATIES
+# -----------------------------------------------------------------------------
+# Eén keer per dataversie worden alle speler-iteraties geladen. Per unieke (genormaliseerde)
+# naam bewaren we de trigrammen, met per trigram een gesorteerde lijst van namen. Een
+# zoekopdracht telt met np.bincount hoeveel trigrammen van de zoekterm elke naam bevat:
+# geen LIKE-query per opzoeking, accentongevoelig en tolerant voor tikfouten.
+
+SEARCH_QUERY = """
+    SELECT a."playerId", a."iterationId", p.commonname as "Naam", sq.name as "Team", i.season as "Seizoen",
+        i."competitionName" as "Competitie", a.position
+    FROM analysis.final_impect_scores a
+    JOIN public.players p ON a."playerId" = p.id
+    LEFT JOIN public.squads sq ON a."squadId" = sq.id
+    JOIN public.iterations i ON a."iterationId" = i.id
+    WHERE p.commonname IS NOT NULL
+"""
+
+# Letters die NFKD niet opsplitst in basisletter + accent
+_TRANSLITERATE = str.maketrans({"ø": "o", "ł": "l", "đ": "d", "ß": "ss", "æ": "ae", "œ": "oe", "ı": "i", "þ": "th"})
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", str(text).lower().translate(_TRANSLITERATE))
+    text = text.encode("ascii", "ignore").decode()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def trigrams(text, prefix=False):
+    # Zoals pg_trgm: elk woord krijgt twee spaties vooraan en één achteraan. Met prefix=True
+    # krijgt het laatste woord geen spatie achteraan, zodat "bruy" ook "bruyne" vindt.
+    return _word_trigrams(normalize(text).split(), prefix)
+
+
+def _word_trigrams(words, prefix=False):
+    grams = set()
+    for i, word in enumerate(words):
+        padded = "  " + word + ("" if prefix and i == len(words) - 1 else " ")
+        grams |= {padded[j:j + 3] for j in range(len(padded) - 2)}
+    return grams
+
+
+class PlayerSearchIndex:
+    def __init__(self, rows):
+        # Recentste seizoen eerst: zo staat per naam de laatste iteratie bovenaan
+        rows = rows.sort_values(["Seizoen", "Naam"], ascending=[False, True], kind="stable").reset_index(drop=True)
+        self.rows = compact_frame(rows)
+        # Normaliseren per unieke ruwe naam, niet per rij
+        raw_codes, raw_names = pd.factorize(rows["Naam"])
+        name_codes, names = pd.factorize(pd.Series([normalize(n) for n in raw_names], dtype=object))
+        name_codes = name_codes[raw_codes]
+        self.row_order = np.argsort(name_codes, kind="stable").astype(np.int32)
+        self.row_offsets = np.searchsorted(name_codes[self.row_order], np.arange(len(names) + 1)).astype(np.int32)
+
+        # Postings: per trigram de namen die hem bevatten (CSR: offsets + ids)
+        grams_per_name = [_word_trigrams(name.split()) for name in names]
+        self.name_grams = np.fromiter(map(len, grams_per_name), dtype=np.int32, count=len(names))
+        gram_codes, gram_labels = pd.factorize(pd.Series([g for grams in grams_per_name for g in grams], dtype=object))
+        gram_ids = {gram: i for i, gram in enumerate(gram_labels)}
+        pairs_gram = gram_codes.astype(np.int32)
+        pairs_name = np.repeat(np.arange(len(names), dtype=np.int32), self.name_grams)
+        order = np.argsort(pairs_gram, kind="stable")
+        self.postings = pairs_name[order]
+        self.gram_offsets = np.searchsorted(pairs_gram[order], np.arange(len(gram_ids) + 1)).astype(np.int32)
+        self.gram_ids = gram_ids
+        self.n_names = len(names)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _postings(self, gram):
+        gid = self.gram_ids.get(gram)
+        return self.postings[self.gram_offsets[gid]:self.gram_offsets[gid + 1]] if gid is not None else self.postings[:0]
+
+    def search(self, text, limit=20, min_score=0.5):
+        grams = trigrams(text, prefix=True)
+        if not grams or self.n_names == 0:
+            return self.rows.iloc[:0]
+        hits = np.bincount(np.concatenate([self._postings(g) for g in grams]), minlength=self.n_names)
+        candidates = np.flatnonzero(hits >= max(1, min_score * len(grams)))
+        if len(candidates) == 0:
+            return self.rows.iloc[:0]
+        # Eerst: welk deel van de zoekterm zit in de naam (tikfout = een paar trigrammen minder),
+        # dan: hoe weinig extra trigrammen de naam heeft (exacte naam boven langere namen)
+        coverage = hits[candidates] / len(grams)
+        jaccard = hits[candidates] / (len(grams) + self.name_grams[candidates] - hits[candidates])
+        ranked = candidates[np.lexsort((-jaccard, -coverage))]
+
+        picked = []
+        for name_id in ranked:
+            picked.extend(self.row_order[self.row_offsets[name_id]:self.row_offsets[name_id + 1]])
+            if len(picked) >= limit:
+                break
+        return self.rows.iloc[picked[:limit]].reset_index(drop=True)
+
+
+@versioned
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def load_player_search_index(version):
+    return PlayerSearchIndex(fetch_dataframe(SEARCH_QUERY))
@@ -0,0 +1,173 @@
+import json
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import cached_query
+from profiles import POSITION_KPIS, POSITION_METRICS, PROFILE_COLUMNS, PROFILE_SCORE_COLUMNS, get_config_for_position
+from similarity import load_player_similarity_index
+
+# -----------------------------------------------------------------------------
+# SHORTLIST: VEEL SPELERS TEGELIJK VERGELIJKEN
+# -----------------------------------------------------------------------------
+# De shortlist leeft in st.session_state (en kan als JSON bewaard en teruggeladen worden).
+# Niets gebeurt per speler: de profielscores komen uit de similarity indexen (één per
+# positie, al gecachet), de onderlinge gelijkenis is één (N x N x profielen) berekening,
+# de buren komen uit PlayerSimilarityIndex.most_similar_many en alle metrieken/KPIs van
+# de hele shortlist uit één query.
+
+SESSION_KEY = "shortlist"
+MEMBER_FIELDS = ["playerId", "iterationId", "Naam", "Team", "Seizoen", "Competitie", "position"]
+
+SHORTLIST_SCORES_QUERY = """
+    SELECT 'Metriek' as kind, "iterationId", "playerId", name || COALESCE(' (' || details_label || ')', '') as name, final_score_1_to_100 as "Score"
+    FROM analysis.mv_player_metric_scores WHERE "iterationId" IN %s AND "playerId" IN %s AND metric_id IN %s
+    UNION ALL
+    SELECT 'KPI', "iterationId", "playerId", name || COALESCE(' (' || context || ')', ''), final_score_1_to_100
+    FROM analysis.mv_player_kpi_scores WHERE "iterationId" IN %s AND "playerId" IN %s AND metric_id IN %s
+"""
+
+_PROFILE_LABELS = {column: label for label, column in PROFILE_COLUMNS.items()}
+
+
+# --- Sessie --------------------------------------------------------------------
+
+def get_shortlist():
+    return st.session_state.setdefault(SESSION_KEY, [])
+
+
+def member_key(member):
+    return (str(member["playerId"]), str(member["iterationId"]))
+
+
+def member_label(member):
+    return f"{member['Naam']} ({member['Team'] or 'Onbekend'}, {member['Seizoen']} · {member['Competitie']})"
+
+
+def member_labels(members):
+    # {member_key: label}, uniek per (speler, iteratie): het label is de kolomnaam in de rasters
+    labels = [member_label(m) for m in members]
+    counts = Counter(labels)
+    return {
+        member_key(m): label if counts[label] == 1 else f"{label} #{m['playerId']}/{m['iterationId']}"
+        for m, label in zip(members, labels)
+    }
+
+
+def on_shortlist(player_id, iteration_id):
+    return (str(player_id), str(iteration_id)) in {member_key(m) for m in get_shortlist()}
+
+
+def add_to_shortlist(member):
+    if not on_shortlist(member["playerId"], member["iterationId"]):
+        get_shortlist().append({f: (str(member[f]) if f in ("playerId", "iterationId") else member[f]) for f in MEMBER_FIELDS})
+
+
+def remove_from_shortlist(*keys):
+    keys = {(str(p), str(i)) for p, i in keys}
+    st.session_state[SESSION_KEY] = [m for m in get_shortlist() if member_key(m) not in keys]
+
+
+def shortlist_json():
+    return json.dumps(get_shortlist(), ensure_ascii=False, indent=1)
+
+
+def load_shortlist_json(text):
+    # Voegt toe aan de huidige shortlist; geeft het aantal nieuwe spelers terug
+    before = len(get_shortlist())
+    for member in json.loads(text):
+        add_to_shortlist(member)
+    return len(get_shortlist()) - before
+
+
+# --- Berekeningen --------------------------------------------------------------
+
+def shortlist_vectors(members):
+    # (N x profielen) matrix in PROFILE_SCORE_COLUMNS volgorde; één index per positie
+    out = np.full((len(members), len(PROFILE_SCORE_COLUMNS)), np.nan, dtype=np.float32)
+    by_position = {}
+    for n, member in enumerate(members):
+        by_position.setdefault(member["position"], []).append(n)
+    for position, rows in by_position.items():
+        index = load_player_similarity_index(position)
+        vectors = index.vectors([member_key(members[n]) for n in rows])
+        out[rows] = vectors[:, [index.column_index[c] for c in PROFILE_SCORE_COLUMNS]]
+    return out
+
+
+def active_columns(vector):
+    # Zoals op de spelerpagina: enkel profielen met een score > 0
+    return [c for c, v in zip(PROFILE_SCORE_COLUMNS, vector) if v > 0]
+
+
+def profile_grid(members, vectors):
+    labels = list(member_labels(members).values())
+    grid = pd.DataFrame(vectors.T.astype(float), index=[_PROFILE_LABELS[c] for c in PROFILE_SCORE_COLUMNS], columns=labels)
+    return grid[(grid > 0).any(axis=1)].rename_axis("Profiel")
+
+
+def pairwise_similarity(members, vectors):
+    # Gelijkenis (100 - gemiddelde L1) over de profielen die bij minstens één van beide
+    # spelers actief zijn; symmetrisch, ontbrekende scores tellen niet mee
+    present = ~np.isnan(vectors)
+    values = np.where(present, vectors, 0)
+    active = values > 0
+    valid = (active[:, None, :] | active[None, :, :]) & present[:, None, :] & present[None, :, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sim = 100 - (np.abs(values[:, None, :] - values[None, :, :]) * valid).sum(axis=2) / valid.sum(axis=2)
+    labels = list(member_labels(members).values())
+    return pd.DataFrame(sim.astype(float), index=labels, columns=labels)
+
+
+def shortlist_neighbours(members, vectors, k=5, level_window=15, seasons=None):
+    # Per positie één most_similar_many; shortlistspelers zelf tellen niet als buur
+    labels = member_labels(members)
+    keys = set(labels)
+    by_position = {}
+    for n, member in enumerate(members):
+        by_position.setdefault(member["position"], []).append(n)
+    frames = []
+    for position, rows in by_position.items():
+        index = load_player_similarity_index(position)
+        targets = [(*member_key(members[n]), active_columns(vectors[n])) for n in rows]
+        targets = [t for t in targets if t[2]]
+        results = index.most_similar_many(targets, k=k + len(keys), level_window=level_window, seasons=seasons)
+        for (player_id, iteration_id, _), result in zip(targets, results):
+            if result is None or result.empty:
+                continue
+            result = result[[(str(p), str(i)) not in keys for p, i in zip(result["playerId"], result["iterationId"])]].head(k)
+            frames.append(result.assign(**{"Shortlist speler": labels[(player_id, iteration_id)]}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def _score_ids(members, config_dict):
+    ids = []
+    for position in dict.fromkeys(m["position"] for m in members):
+        config = get_config_for_position(position, config_dict) or {}
+        ids += [str(x) for x in config.get("aan_bal", []) + config.get("zonder_bal", [])]
+    return tuple(dict.fromkeys(ids)) or ("0",)
+
+
+def shortlist_scores_query(members):
+    iterations = tuple(dict.fromkeys(str(m["iterationId"]) for m in members))
+    players = tuple(dict.fromkeys(str(m["playerId"]) for m in members))
+    return SHORTLIST_SCORES_QUERY, (iterations, players, _score_ids(members, POSITION_METRICS),
+                                    iterations, players, _score_ids(members, POSITION_KPIS))
+
+
+def metric_grid(members):
+    # Metrieken en KPIs van alle posities op de shortlist, één kolom per speler
+    if not members:
+        return pd.DataFrame()
+    df = cached_query(*shortlist_scores_query(members))
+    if df.empty:
+        return df
+    # IN op spelers x iteraties haalt ook niet-gevraagde combinaties op: hier wegfilteren
+    labels = member_labels(members)
+    df["speler"] = [labels.get((str(p), str(i))) for p, i in zip(df["playerId"], df["iterationId"])]
+    df = df[df["speler"].notna()]
+    grid = df.pivot_table(index=["kind", "name"], columns="speler", values="Score", aggfunc="mean", observed=True, sort=False)
+    grid = grid.reindex(columns=[label for label in labels.values() if label in grid.columns])
+    return grid.sort_index(level="kind", sort_remaining=False, key=lambda k: k.astype(object).map({"Metriek": 0, "KPI": 1})).rename_axis(index=["Type", "Naam"], columns=None)
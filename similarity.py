@@ -0,0 +1,256 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from db import compact_frame, fetch_dataframe, setting, versioned
+from profiles import PROFILE_SCORE_COLUMNS
+
+# -----------------------------------------------------------------------------
+# VERGELIJKBARE SPELERS: NUMPY INDEX PER POSITIE
+# -----------------------------------------------------------------------------
+# Per positie wordt één keer een float32 matrix (rijen = speler-iteraties,
+# kolommen = de 21 profielscores) opgebouwd. Een opzoeking is daarna enkel nog
+# vectorwerk op die matrix: niveaufilter, L1-afstand en top-k via argpartition.
+
+META_COLUMNS = ["playerId", "iterationId", "Naam", "Team", "Seizoen", "Competitie"]
+
+PLAYER_SIMILARITY_QUERY = f"""
+    SELECT a."playerId", a."iterationId", p.commonname as "Naam", sq.name as "Team", i.season as "Seizoen", i."competitionName" as "Competitie",
+        {", ".join(f"a.{c}" for c in PROFILE_SCORE_COLUMNS)}
+    FROM analysis.final_impect_scores a
+    JOIN public.players p ON a."playerId" = p.id
+    LEFT JOIN public.squads sq ON a."squadId" = sq.id
+    JOIN public.iterations i ON a."iterationId" = i.id
+    WHERE a.position = %s
+"""
+
+
+def id_rank(*keys):
+    # Rang van elke rij op haar sleutel (als tekst): gelijke gelijkenis wordt op id beslist,
+    # niet op de (niet vaste) rijvolgorde van de query
+    codes = [pd.factorize(key.astype(str), sort=True)[0] for key in keys]
+    rank = np.empty(len(codes[0]), dtype=np.int64)
+    rank[np.lexsort(codes[::-1])] = np.arange(len(rank))
+    return rank
+
+
+def top_k_order(sim, ranks, k):
+    # Posities in sim van de k hoogste, aflopend. Alles wat gelijk is aan de k-de score
+    # blijft kandidaat: de rang (id) beslist wie erin komt
+    if len(sim) > k:
+        kth = -np.partition(-sim, k - 1)[k - 1]
+        part = np.flatnonzero(sim >= kth)
+    else:
+        part = np.arange(len(sim))
+    return part[np.lexsort((ranks[part], -sim[part]))][:k]
+
+
+class PlayerSimilarityIndex:
+    def __init__(self, meta, scores, columns):
+        # Meta blijft zo lang als de index in het geheugen: teams, seizoenen e.d. als categorical
+        self.meta = compact_frame(meta.reset_index(drop=True))
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32)
+        self.columns = list(columns)
+        self.column_index = {c: i for i, c in enumerate(self.columns)}
+        self.has_nan = bool(np.isnan(self.scores).any())
+        self.row_of = {
+            key: i for i, key in enumerate(zip(self.meta["playerId"].astype(str), self.meta["iterationId"].astype(str)))
+        }
+        self.season_codes, self.season_labels = pd.factorize(self.meta["Seizoen"])
+        self.id_rank = id_rank(self.meta["playerId"], self.meta["iterationId"])
+
+    @classmethod
+    def from_frame(cls, df, columns=PROFILE_SCORE_COLUMNS):
+        return cls(df[META_COLUMNS], df[list(columns)].to_numpy(dtype=np.float32, na_value=np.nan), columns)
+
+    def __len__(self):
+        return len(self.meta)
+
+    def _mean(self, values):
+        if not self.has_nan:
+            return values.mean(axis=1)
+        # Zelfde gedrag als pandas .mean(): ontbrekende scores tellen niet mee
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanmean(values, axis=1)
+
+    def level(self, column_ids):
+        # Niveau = gemiddelde over de kolommen van het doel; beide opzoekpaden rekenen het zo uit
+        return self._mean(self.scores[:, list(column_ids)])
+
+    def season_mask(self, seasons):
+        wanted = set(seasons)
+        codes = [i for i, s in enumerate(self.season_labels) if s in wanted]
+        return np.isin(self.season_codes, codes)
+
+    def most_similar(self, player_id, iteration_id, columns, k=10, level_window=15, seasons=None):
+        # None = speler zit niet in de index; lege DataFrame = geen kandidaten binnen het niveau
+        row = self.row_of.get((str(player_id), str(iteration_id)))
+        if row is None:
+            return None
+        column_ids = [self.column_index[c] for c in columns]
+        sub = self.scores[:, column_ids]
+        target = sub[row]
+        avg = self.level(column_ids)
+        diff = self._mean(np.abs(sub - target))
+        return self._top_k(row, avg, diff, k, level_window, self.season_mask(seasons) if seasons else None)
+
+    def most_similar_many(self, targets, k=10, level_window=15, seasons=None, chunk_elements=1 << 22):
+        # targets: [(playerId, iterationId, kolommen)], elk doel met zijn eigen profielkolommen.
+        # Zelfde resultaat als most_similar per doel, maar de L1-afstanden in één matrixberekening
+        # per blok doelen (hoogstens chunk_elements waarden tegelijk in het geheugen). Het niveau
+        # gaat via level(), één keer per verschillende kolomkeuze.
+        results = [None] * len(targets)
+        found = [(j, self.row_of.get((str(p), str(i)))) for j, (p, i, _) in enumerate(targets)]
+        found = [(j, row) for j, row in found if row is not None]
+        if not found:
+            return results
+        rows = np.array([row for _, row in found])
+        column_sets = [tuple(self.column_index[c] for c in targets[j][2]) for j, _ in found]
+        levels = {column_ids: self.level(column_ids) for column_ids in dict.fromkeys(column_sets)}
+        weights = np.zeros((len(found), len(self.columns)), dtype=np.float32)
+        for n, column_ids in enumerate(column_sets):
+            weights[n, list(column_ids)] = 1
+
+        present = ~np.isnan(self.scores)
+        values = np.where(present, self.scores, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            diff = np.empty((len(self), len(found)), dtype=np.float32)
+            chunk = max(1, chunk_elements // max(1, values.size))
+            for start in range(0, len(found), chunk):
+                part = slice(start, start + chunk)
+                absdiff = np.abs(values[None, :, :] - values[rows[part], None, :])
+                if self.has_nan:
+                    valid = present[None, :, :] & present[rows[part], None, :] & (weights[part, None, :] > 0)
+                    diff[:, part] = ((absdiff * valid).sum(axis=2) / valid.sum(axis=2)).T
+                else:
+                    diff[:, part] = (np.einsum("cnd,cd->cn", absdiff, weights[part]) / weights[part].sum(axis=1)[:, None]).T
+
+        season_mask = self.season_mask(seasons) if seasons else None
+        for n, (j, row) in enumerate(found):
+            results[j] = self._top_k(row, levels[column_sets[n]], diff[:, n], k, level_window, season_mask)
+        return results
+
+    def _top_k(self, row, avg, diff, k, level_window, season_mask=None):
+        # Niveau Filter (+/- level_window rond het gemiddelde van de doelspeler)
+        mask = np.abs(avg - avg[row]) <= level_window
+        if season_mask is not None:
+            mask &= season_mask
+        mask[row] = False
+        candidates = np.flatnonzero(mask)
+
+        # Afgerond: gelijke scores mogen niet op float32-ruis (sommatievolgorde) van plaats wisselen
+        sim = np.round(100 - diff[candidates], 3)
+        order = top_k_order(sim, self.id_rank[candidates], k)
+        top = candidates[order]
+
+        results = self.meta.iloc[top].copy()
+        results["Avg Score"] = avg[top].astype(float)
+        results["Gelijkenis %"] = sim[order].astype(float)
+        return results.reset_index(drop=True)
+
+    def vectors(self, keys):
+        # Profielscores (alle kolommen) voor [(playerId, iterationId)]; NaN-rij als de speler ontbreekt
+        out = np.full((len(keys), len(self.columns)), np.nan, dtype=np.float32)
+        for n, (player_id, iteration_id) in enumerate(keys):
+            row = self.row_of.get((str(player_id), str(iteration_id)))
+            if row is not None:
+                out[n] = self.scores[row]
+        return out
+
+
+# Alle seizoenen zitten in de index; de seizoenskeuze is enkel een masker bij het opzoeken.
+# Per dataversie (zie db.versioned): na een ETL-run meteen opnieuw opgebouwd.
+@versioned
+@st.cache_resource(ttl=3600, max_entries=32, show_spinner=False)
+def load_player_similarity_index(version, position):
+    return PlayerSimilarityIndex.from_frame(fetch_dataframe(PLAYER_SIMILARITY_QUERY, (position,)))
+
+
+def default_similarity_seasons(available_seasons):
+    # Optioneel in secrets: [similarity] seasons = ["25/26", "2025"]. Leeg = alle seizoenen.
+    configured = setting("similarity", "seasons", [])
+    return [s for s in configured if s in available_seasons]
+
+
+# -----------------------------------------------------------------------------
+# VERGELIJKBARE TEAMS: SQUAD x PROFIEL MATRIX
+# -----------------------------------------------------------------------------
+# Eén rij per (squadId, seizoen, competitie), één kolom per profiel (ontbrekend = 0,
+# zoals de vroegere pivot_table(...).fillna(0)). Sleutels gaan via een gewone dict
+# naar een rijnummer: geen MultiIndex en geen pivot bij elke rerun.
+
+SQUAD_PROFILES_QUERY = """
+    SELECT s."squadId", sq.name as "Team", i.season as "Seizoen", i."competitionName" as "Competitie", s.profile_name, s.score 
+    FROM analysis.squad_profile_scores s 
+    JOIN public.squads sq ON s."squadId" = sq.id 
+    JOIN public.iterations i ON s."iterationId" = i.id
+"""
+
+
+class SquadSimilarityIndex:
+    def __init__(self, meta, scores, profiles):
+        self.meta = compact_frame(meta.reset_index(drop=True))
+        self.scores = np.ascontiguousarray(scores, dtype=np.float32)
+        self.profiles = list(profiles)
+        self.row_of = {
+            key: i for i, key in enumerate(zip(self.meta["squadId"].astype(str), self.meta["Seizoen"], self.meta["Competitie"]))
+        }
+        self.season_codes, self.season_labels = pd.factorize(self.meta["Seizoen"])
+        self.id_rank = id_rank(self.meta["squadId"], self.meta["Seizoen"], self.meta["Competitie"])
+
+    @classmethod
+    def from_long_frame(cls, df):
+        # df: één rij per (squad, iteratie, profiel) met kolommen profile_name en score
+        keys = ["squadId", "Team", "Seizoen", "Competitie"]
+        if df.empty:
+            return cls(pd.DataFrame(columns=keys), np.zeros((0, 0), dtype=np.float32), [])
+        df = df.astype({"squadId": str})
+        row_codes = df.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+        meta = df[keys].drop_duplicates()
+        prof_codes, profiles = pd.factorize(df["profile_name"])
+        shape = (len(meta), len(profiles))
+        # Gemiddelde bij dubbele rijen (zelfde aggregatie als pivot_table)
+        sums = np.zeros(shape, dtype=np.float64)
+        counts = np.zeros(shape, dtype=np.int32)
+        values = df["score"].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        np.add.at(sums, (row_codes[valid], prof_codes[valid]), values[valid])
+        np.add.at(counts, (row_codes[valid], prof_codes[valid]), 1)
+        scores = np.divide(sums, counts, out=np.zeros(shape), where=counts > 0)
+        return cls(meta, scores, profiles)
+
+    def __len__(self):
+        return len(self.meta)
+
+    def season_mask(self, seasons):
+        wanted = set(seasons)
+        codes = [i for i, s in enumerate(self.season_labels) if s in wanted]
+        return np.isin(self.season_codes, codes)
+
+    def most_similar(self, squad_id, season, competition, k=5, seasons=None):
+        row = self.row_of.get((str(squad_id), season, competition))
+        if row is None:
+            return None
+        mask = np.ones(len(self.scores), dtype=bool)
+        if seasons:
+            mask &= self.season_mask(seasons)
+        mask[row] = False
+        candidates = np.flatnonzero(mask)
+
+        # Afgerond en gelijke scores op id, zoals bij de spelers (zie top_k_order)
+        sim = np.round(100 - np.abs(self.scores[candidates] - self.scores[row]).mean(axis=1), 3)
+        order = top_k_order(sim, self.id_rank[candidates], k)
+        top = candidates[order]
+
+        results = self.meta.iloc[top].copy()
+        results["Gelijkenis %"] = sim[order].astype(float)
+        return results.reset_index(drop=True)
+
+
+@versioned
+@st.cache_resource(ttl=3600, max_entries=2, show_spinner=False)
+def load_squad_similarity_index(version):
+    return SquadSimilarityIndex.from_long_frame(fetch_dataframe(SQUAD_PROFILES_QUERY))
@@ -0,0 +1,302 @@
+"""Lokale snapshot van de analyse-data (Arrow IPC, gepartitioneerd per iterationId).
+
+Exporteren (gebruikt de verbinding uit st.secrets["postgres"]):
+
+    python snapshot.py --out snapshot
+
+De app leest daarna zonder database via KVK_DATA_SOURCE=snapshot of
+[data] source = "snapshot" (en optioneel snapshot_dir = "...") in .streamlit/secrets.toml.
+"""
+import argparse
+import datetime as dt
+import decimal
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import urllib.parse
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+# (schema, tabel). Tabellen met een "iterationId" kolom worden per iteratie gepartitioneerd.
+SNAPSHOT_TABLES = [
+    ("analysis", "final_impect_scores"),
+    ("analysis", "player_final_scores"),
+    ("analysis", "kpis_final_scores"),
+    ("analysis", "squad_profile_scores"),
+    ("analysis", "squad_final_scores"),
+    ("analysis", "squadkpi_final_scores"),
+    ("analysis", "scouting_reports"),
+    ("analysis", "kpi_definitions"),
+    # Materialized views uit migrations/003: de app leest metrieken/KPIs enkel nog hieruit
+    ("analysis", "mv_player_metric_scores"),
+    ("analysis", "mv_player_kpi_scores"),
+    ("analysis", "mv_squad_metric_scores"),
+    ("analysis", "mv_squad_kpi_scores"),
+    # Coach-aggregaten uit migrations/007 (de app leest nooit public.coach_tenures zelf)
+    ("analysis", "coach_tenure_summary"),
+    ("analysis", "coach_tenure_iterations"),
+    ("analysis", "coach_tenure_scores"),
+    ("public", "players"),
+    ("public", "squads"),
+    ("public", "iterations"),
+    ("public", "matches"),
+    ("public", "player_score_definitions"),
+    ("public", "squad_score_definitions"),
+]
+
+PARTITION_COLUMN = "iterationId"
+MANIFEST = "manifest.json"
+# Elke export komt in een eigen map <root>/v-<tijdstip>; CURRENT bevat de naam van de
+# actieve versie en wordt atomair vervangen (zie _swap_in)
+CURRENT = "CURRENT"
+VERSION_PREFIX = "v-"
+
+# Postgres type OID -> Arrow type. Alles wat hier niet staat wordt als tekst bewaard.
+PG_ARROW_TYPES = {
+    16: pa.bool_(), 20: pa.int64(), 21: pa.int16(), 23: pa.int32(), 26: pa.int64(),
+    700: pa.float32(), 701: pa.float64(), 1700: pa.float64(),
+    1082: pa.date32(), 1114: pa.timestamp("us"), 1184: pa.timestamp("us", tz="UTC"),
+}
+
+
+# -----------------------------------------------------------------------------
+# EXPORT
+# -----------------------------------------------------------------------------
+
+def _to_arrow(description, rows):
+    columns = list(zip(*rows)) if rows else [[] for _ in description]
+    arrays, fields = [], []
+    for col, values in zip(description, columns):
+        arrow_type = PG_ARROW_TYPES.get(col.type_code, pa.string())
+        if col.type_code == 1700:
+            values = [float(v) if isinstance(v, decimal.Decimal) else v for v in values]
+        elif arrow_type == pa.string():
+            values = [v if v is None or isinstance(v, str) else str(v) for v in values]
+        arrays.append(pa.array(values, type=arrow_type))
+        fields.append(pa.field(col.name, arrow_type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def _write_arrow(path, table):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _partition_path(target, partition_id):
+    # Hive-stijl map iterationId=<id>
+    folder = f"{PARTITION_COLUMN}={urllib.parse.quote(str(partition_id), safe='')}"
+    return os.path.join(target, folder, "part-0.arrow")
+
+
+def _export_table(conn, schema, table, out_dir):
+    target = os.path.join(out_dir, schema, table)
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT * FROM {schema}.{table} LIMIT 0")
+        columns = [c.name for c in cur.description]
+        if PARTITION_COLUMN not in columns:
+            cur.execute(f"SELECT * FROM {schema}.{table}")
+            arrow_table = _to_arrow(cur.description, cur.fetchall())
+            _write_arrow(os.path.join(target, "part-0.arrow"), arrow_table)
+            return {"rows": arrow_table.num_rows}
+
+        # Eén bestand per iteratie, zodat het geheugen tijdens de export beperkt blijft
+        # tot één partitie.
+        cur.execute(f'SELECT DISTINCT "{PARTITION_COLUMN}" FROM {schema}.{table} WHERE "{PARTITION_COLUMN}" IS NOT NULL')
+        partition_ids = [r[0] for r in cur.fetchall()]
+        rows, part_type = 0, None
+        for partition_id in partition_ids:
+            cur.execute(f'SELECT * FROM {schema}.{table} WHERE "{PARTITION_COLUMN}" = %s', (partition_id,))
+            arrow_table = _to_arrow(cur.description, cur.fetchall())
+            idx = arrow_table.column_names.index(PARTITION_COLUMN)
+            part_type = arrow_table.schema.field(idx).type
+            _write_arrow(_partition_path(target, partition_id), arrow_table.remove_column(idx))
+            rows += arrow_table.num_rows
+        if part_type is None:
+            # Lege tabel: toch een (leeg) bestand zodat de tabel bestaat in de offline modus
+            _write_arrow(os.path.join(target, "part-0.arrow"), _to_arrow(cur.description, []))
+            return {"rows": 0}
+        return {"rows": rows, "partitions": len(partition_ids), "partition_type": str(part_type)}
+
+
+def _write_table(arrow_table, target):
+    # Zelfde indeling als _export_table, maar voor een tabel die al in het geheugen zit
+    if PARTITION_COLUMN not in arrow_table.column_names:
+        _write_arrow(os.path.join(target, "part-0.arrow"), arrow_table)
+        return {"rows": arrow_table.num_rows}
+    arrow_table = arrow_table.filter(pc.is_valid(arrow_table[PARTITION_COLUMN])).sort_by(PARTITION_COLUMN)
+    if arrow_table.num_rows == 0:
+        _write_arrow(os.path.join(target, "part-0.arrow"), arrow_table)
+        return {"rows": 0}
+    # Gesorteerd: elke partitie is een aaneengesloten stuk
+    counts = pc.value_counts(arrow_table[PARTITION_COLUMN])
+    offset = 0
+    for partition_id, n in zip(counts.field("values").to_pylist(), counts.field("counts").to_pylist()):
+        _write_arrow(_partition_path(target, partition_id), arrow_table.slice(offset, n).drop_columns([PARTITION_COLUMN]))
+        offset += n
+    part_type = arrow_table.schema.field(PARTITION_COLUMN).type
+    return {"rows": arrow_table.num_rows, "partitions": len(counts), "partition_type": str(part_type)}
+
+
+def current_dir(root):
+    # Map van de actieve versie. Zonder CURRENT: oude indeling, alles rechtstreeks in root
+    try:
+        with open(os.path.join(root, CURRENT)) as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return root
+
+
+def _new_version_dir(out_dir):
+    name = VERSION_PREFIX + dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    return os.path.join(out_dir, name)
+
+
+# Mappen van de oude indeling (vóór CURRENT): één per schema, rechtstreeks in de root
+_OLD_LAYOUT_DIRS = {schema for schema, _ in SNAPSHOT_TABLES}
+
+
+def _swap_in(version_dir, out_dir, manifest):
+    # Manifest als laatste, dan de pointer atomair omzetten (os.replace): een lezer ziet
+    # altijd de oude of de nieuwe versie, nooit niets of een halve export.
+    with open(os.path.join(version_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    previous = current_dir(out_dir)
+    pointer = os.path.join(out_dir, CURRENT + ".tmp")
+    with open(pointer, "w") as f:
+        f.write(os.path.basename(version_dir))
+    os.replace(pointer, os.path.join(out_dir, CURRENT))
+
+    # De vorige versie blijft staan: een draaiende app leest er nog uit tot zijn volgende
+    # versiecheck. Oudere versies (en afgebroken exports) mogen weg, maar enkel wat deze
+    # module zelf aanmaakt: --out kan een gedeelde map zijn.
+    if previous == out_dir:
+        return  # vorige export in de oude indeling: pas bij de volgende export opruimen
+    keep = {os.path.basename(version_dir), os.path.basename(previous)}
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if name in keep:
+            continue
+        if os.path.isdir(path) and (name.startswith(VERSION_PREFIX) or name in _OLD_LAYOUT_DIRS):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.isfile(path) and name in (MANIFEST, CURRENT + ".tmp"):
+            os.remove(path)
+
+
+def _new_manifest():
+    return {"created_at": dt.datetime.now(dt.timezone.utc).isoformat(), "tables": {}}
+
+
+def export_snapshot(out_dir, tables=SNAPSHOT_TABLES):
+    from db import pooled_connection
+
+    # Eerst naar een nieuwe versiemap, dan de pointer omzetten: een lezende app ziet nooit een halve snapshot
+    version_dir = _new_version_dir(out_dir)
+    manifest = _new_manifest()
+    with pooled_connection() as conn:
+        for schema, table in tables:
+            t0 = time.perf_counter()
+            manifest["tables"][f"{schema}.{table}"] = _export_table(conn, schema, table, version_dir)
+            print(f"{schema}.{table}: {manifest['tables'][f'{schema}.{table}']['rows']} rijen ({time.perf_counter() - t0:.1f}s)")
+    _swap_in(version_dir, out_dir, manifest)
+    return manifest
+
+
+def write_snapshot(tables, out_dir):
+    # tables: {"schema.tabel": pyarrow.Table}, bv. gegenereerd door synthdata.py
+    version_dir = _new_version_dir(out_dir)
+    manifest = _new_manifest()
+    for name, arrow_table in tables.items():
+        manifest["tables"][name] = _write_table(arrow_table, os.path.join(version_dir, *name.split(".")))
+    _swap_in(version_dir, out_dir, manifest)
+    return manifest
+
+
+# -----------------------------------------------------------------------------
+# LEZEN (OFFLINE MODUS)
+# -----------------------------------------------------------------------------
+# De Arrow-bestanden worden memory-mapped geopend en via DuckDB bevraagd met exact
+# dezelfde SQL als in Postgres. Filters op "iterationId" slaan hele partities over.
+
+_PARAM = re.compile(r"%%|%s")
+
+
+def _literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        return "(" + ", ".join(_literal(v) for v in value) + ")"
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def to_duckdb_sql(query, params=None):
+    # psycopg2 stijl (%s, tuples voor IN) -> letterlijke waarden. Letterlijke strings
+    # laten DuckDB, net als Postgres, zelf naar het kolomtype casten ('66' = metric_id).
+    if params is None:
+        return query
+    # %% in één doorgang met de parameters: een % in een ingevulde waarde blijft staan
+    values = iter(params)
+    return _PARAM.sub(lambda m: "%" if m.group() == "%%" else _literal(next(values)), query)
+
+
+class SnapshotStore:
+    def __init__(self, root):
+        import duckdb  # enkel nodig voor de offline modus
+
+        self._duckdb = duckdb
+        # De versiemap zelf, niet root: na een nieuwe export blijft deze store de oude lezen
+        self.root = root = current_dir(root)
+        with open(os.path.join(root, MANIFEST)) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["created_at"]
+        fs = pafs.LocalFileSystem(use_mmap=True)
+        self.datasets = {}
+        for name, info in self.manifest["tables"].items():
+            partitioning = None
+            if "partition_type" in info:
+                part_type = pa.type_for_alias(info["partition_type"])
+                partitioning = ds.partitioning(pa.schema([(PARTITION_COLUMN, part_type)]), flavor="hive")
+            self.datasets[name] = ds.dataset(os.path.join(root, *name.split(".")), format="ipc", partitioning=partitioning, filesystem=fs)
+        self._local = threading.local()
+
+    def _connection(self):
+        # Geregistreerde Arrow-bronnen zijn per DuckDB-verbinding: één verbinding per thread
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._duckdb.connect()
+            for schema in {name.split(".")[0] for name in self.datasets}:
+                con.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+            for name, dataset in self.datasets.items():
+                schema, table = name.split(".")
+                con.register(f"{schema}__{table}", dataset)
+                con.execute(f'CREATE VIEW {schema}.{table} AS SELECT * FROM "{schema}__{table}"')
+            self._local.con = con
+        return con
+
+    def query(self, query, params=None):
+        result = self._connection().execute(to_duckdb_sql(query, params)).to_arrow_table()
+        # date_as_object: datums komen terug als datetime.date, net als bij psycopg2
+        return result.to_pandas(date_as_object=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporteer de analyse-tabellen naar een lokale Arrow snapshot.")
+    parser.add_argument("--out", default="snapshot", help="doelmap (standaard: snapshot)")
+    args = parser.parse_args()
+
+    manifest = export_snapshot(args.out)
+    print(f"Snapshot klaar in {args.out} ({len(manifest['tables'])} tabellen).")
+
+
+if __name__ == "__main__":
+    main()
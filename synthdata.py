@@ -0,0 +1,445 @@
+"""Synthetische dataset met hetzelfde schema als productie, om lokaal te testen en te benchmarken.
+
+    python synthdata.py --competitions 50 --seasons 5 --target postgres --dsn "host=localhost dbname=kvk_synth" --replace
+    python synthdata.py --competitions 10 --seasons 3 --target snapshot --out snapshot
+
+postgres: laadt alles in de database uit --dsn, past migrations/ toe en ververst de
+materialized views. Nooit de verbinding van de app (st.secrets): de bestaande tabellen
+worden eerst verwijderd (daarom is --replace verplicht), dus enkel een lokale database
+(localhost of een unix socket) wordt aanvaard.
+snapshot: schrijft rechtstreeks een Arrow snapshot (zie snapshot.py), zonder database.
+De app leest die met KVK_DATA_SOURCE=snapshot.
+"""
+import argparse
+import datetime as dt
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from profiles import POSITION_METRICS, POSITION_KPIS, PROFILE_SCORE_COLUMNS
+
+# Positie -> (aantal per kern van 25, profielkolommen waarop die positie scoort)
+POSITIONS = {
+    "GOALKEEPER": (3, []),
+    "CENTRAL_DEFENDER": (4, ["cb_kvk_score", "footballing_cb_kvk_score", "controlling_cb_kvk_score"]),
+    "RIGHT_WINGBACK_DEFENDER": (2, ["wb_kvk_score", "defensive_wb_kvk_score", "offensive_wingback_kvk_score"]),
+    "LEFT_WINGBACK_DEFENDER": (2, ["wb_kvk_score", "defensive_wb_kvk_score", "offensive_wingback_kvk_score"]),
+    "DEFENSIVE_MIDFIELD": (2, ["dm_kvk_score", "ball_winning_dm_kvk_score", "playmaker_dm_kvk_score"]),
+    "CENTRAL_MIDFIELD": (3, ["cm_kvk_score", "box_to_box_cm_kvk_score"]),
+    "ATTACKING_MIDFIELD": (2, ["acm_kvk_score", "deep_running_acm_kvk_score", "playmaker_off_acm_kvk_score"]),
+    "RIGHT_WINGER": (2, ["fa_kvk_score", "fa_inside_kvk_score", "fa_wide_kvk_score"]),
+    "LEFT_WINGER": (2, ["fa_kvk_score", "fa_inside_kvk_score", "fa_wide_kvk_score"]),
+    "CENTER_FORWARD": (3, ["fw_kvk_score", "fw_target_kvk_score", "fw_running_kvk_score", "fw_finisher_kvk_score"]),
+}
+
+COMPETITIONS = [
+    "Jupiler Pro League", "Challenger Pro League", "Eredivisie", "Keuken Kampioen Divisie", "Ligue 1",
+    "Ligue 2", "Premier League", "Championship", "Bundesliga", "2. Bundesliga", "Serie A", "Serie B",
+    "LaLiga", "LaLiga2", "Primeira Liga", "Super League", "Superliga", "Allsvenskan", "Eliteserien", "Ekstraklasa",
+]
+FIRST_NAMES = ["Lucas", "Noah", "Arthur", "Louis", "Jules", "Adam", "Victor", "Mats", "Thibo", "Senne", "Milan", "Kobe",
+               "Jonas", "Lars", "Wout", "Rayan", "Youssef", "Ibrahim", "Moussa", "Ousmane", "Mateo", "Diego", "Marco",
+               "Luca", "Tomas", "Jan", "Piotr", "Erik", "Oliver", "Kevin", "Dries", "Axel", "Romelu", "Amadou"]
+LAST_NAMES = ["Peeters", "Janssens", "Maes", "Jacobs", "Mertens", "Willems", "Claes", "Goossens", "Wouters", "De Smet",
+              "Dubois", "Lambert", "Diallo", "Traoré", "Camara", "Silva", "Santos", "Rossi", "Müller", "Schmidt",
+              "Kowalski", "Nowak", "Hansen", "Johansson", "Van Damme", "De Bruyne", "Vermeulen", "Martens", "Leroy",
+              "Bakayoko", "Fernandes", "García", "López", "Andersen", "Nielsen", "Ivanov", "Petrović", "Yilmaz"]
+CITIES = ["Kortrijk", "Gent", "Brugge", "Antwerpen", "Luik", "Mechelen", "Genk", "Leuven", "Charleroi", "Oostende",
+          "Lommel", "Beveren", "Lierse", "Deinze", "Tubeke", "Seraing", "Eupen", "Mol", "Aalst", "Roeselare"]
+SQUAD_PREFIXES = ["KV", "FC", "SK", "KSC", "Racing", "Sporting", "Union", "Royal"]
+SQUAD_PROFILES = ["Hoge Pressing", "Balbezit", "Counter", "Lange Bal", "Compact Blok", "Wingplay", "Positiespel", "Omschakeling"]
+VERDICTS = ["Positief", "Twijfel", "Negatief"]
+
+# Alle ids die de app opvraagt; elke speler krijgt een score op elk ervan (zoals in productie)
+METRIC_IDS = sorted({i for c in POSITION_METRICS.values() for part in c.values() for i in part})
+KPI_IDS = sorted({i for c in POSITION_KPIS.values() for part in c.values() for i in part})
+SQUAD_METRIC_COUNT = 50
+
+DDL = {
+    "public.iterations": 'id text PRIMARY KEY, season text, "competitionName" text',
+    "public.squads": 'id text PRIMARY KEY, name text, "imageUrl" text',
+    "public.players": 'id text PRIMARY KEY, commonname text, birthdate date, birthplace text, leg text, "currentSquadId" text',
+    "public.matches": 'id text PRIMARY KEY, "scheduledDate" date, "homeSquadId" text, "awaySquadId" text, available boolean, "iterationId" text',
+    "public.player_score_definitions": "id text PRIMARY KEY, name text, details_label text",
+    "public.squad_score_definitions": "id text PRIMARY KEY, name text, details_label text, inverted boolean",
+    "analysis.kpi_definitions": "id text PRIMARY KEY, name text, context text",
+    "analysis.final_impect_scores": '"playerId" text, "squadId" text, "iterationId" text, position text, '
+                                    + ", ".join(f"{c} double precision" for c in PROFILE_SCORE_COLUMNS),
+    "analysis.player_final_scores": '"iterationId" text, "playerId" text, "squadId" text, position text, metric_id bigint, final_score_1_to_100 double precision',
+    "analysis.kpis_final_scores": '"iterationId" text, "playerId" text, "squadId" text, position text, metric_id bigint, final_score_1_to_100 double precision',
+    "analysis.squad_final_scores": '"squadId" text, "iterationId" text, metric_id text, final_score_1_to_100 double precision',
+    "analysis.squadkpi_final_scores": '"squadId" text, "iterationId" text, metric_id text, final_score_1_to_100 double precision',
+    "analysis.squad_profile_scores": '"squadId" text, "iterationId" text, profile_name text, score double precision',
+    "analysis.scouting_reports": '"iterationId" text, "playerId" text, "matchId" text, position text, label text',
+    "public.coach_tenures": '"coachId" text, name text, "squadId" text, start_date date, end_date date',
+}
+
+
+# -----------------------------------------------------------------------------
+# GENEREREN
+# -----------------------------------------------------------------------------
+
+def _ids(values):
+    # Tekst-ids zoals in productie, compact opgeslagen (miljoenen rijen)
+    return pd.array(np.asarray(values).astype(str), dtype="string[pyarrow]")
+
+
+def _scores(rng, level, n, spread=12.0):
+    return np.clip(np.round(level + rng.normal(0, spread, n), 1), 1, 100)
+
+
+def _season_labels(competition_index, seasons, first_year):
+    # Om de vijf competities een kalenderjaar-competitie ("2025") i.p.v. "25/26"
+    years = range(first_year, first_year - seasons, -1)
+    if competition_index % 5 == 4:
+        return [str(y) for y in years]
+    return [f"{y % 100:02d}/{(y + 1) % 100:02d}" for y in years]
+
+
+def generate(competitions=10, seasons=3, squads_per_competition=18, players_per_squad=25, seed=1, first_year=2025):
+    rng = np.random.default_rng(seed)
+    tables = {}
+
+    # Iteraties: één per (competitie, seizoen); competitie 0 is de sterkste
+    n_iter = competitions * seasons
+    comp_names = [COMPETITIONS[c] if c < len(COMPETITIONS) else f"Competitie {c + 1}" for c in range(competitions)]
+    iteration_ids = (1000 + np.arange(n_iter)).reshape(competitions, seasons)
+    tables["public.iterations"] = pd.DataFrame({
+        "id": _ids(iteration_ids.ravel()),
+        "season": [label for c in range(competitions) for label in _season_labels(c, seasons, first_year)],
+        "competitionName": np.repeat(comp_names, seasons),
+    })
+    strength = np.linspace(12, -12, competitions)
+
+    # Ploegen blijven in hun competitie
+    n_squads = competitions * squads_per_competition
+    squad_comp = np.repeat(np.arange(competitions), squads_per_competition)
+    squad_names = [f"{SQUAD_PREFIXES[i % len(SQUAD_PREFIXES)]} {CITIES[(i // len(SQUAD_PREFIXES)) % len(CITIES)]}"
+                   + ("" if i < len(SQUAD_PREFIXES) * len(CITIES) else f" {i // (len(SQUAD_PREFIXES) * len(CITIES)) + 1}")
+                   for i in rng.permutation(n_squads)]
+    squad_ids = 5000 + np.arange(n_squads)
+    tables["public.squads"] = pd.DataFrame({"id": _ids(squad_ids), "name": squad_names, "imageUrl": None})
+
+    # Spelers: vaste positie en niveau; ~20% verandert per seizoen van ploeg (ook van competitie)
+    n_players = n_squads * players_per_squad
+    weights = np.array([w for w, _ in POSITIONS.values()], dtype=float)
+    position_names = np.array(list(POSITIONS))
+    player_pos = rng.choice(len(POSITIONS), n_players, p=weights / weights.sum())
+    talent = rng.normal(50, 12, n_players)
+    squad_of = np.repeat(np.arange(n_squads), players_per_squad)
+    player_ids = 100000 + np.arange(n_players)
+
+    rows = []  # per seizoen: (speler-index, ploeg-index, iteratie-id)
+    for s in range(seasons):
+        present = np.flatnonzero(rng.random(n_players) < 0.9)
+        rows.append((present, squad_of[present].copy(), iteration_ids[squad_comp[squad_of[present]], s]))
+        if s == 0:
+            current_squad = squad_of.copy()
+        moving = rng.random(n_players) < 0.2
+        squad_of = np.where(moving, rng.integers(0, n_squads, n_players), squad_of)
+    p_idx = np.concatenate([r[0] for r in rows])
+    s_idx = np.concatenate([r[1] for r in rows])
+    it_ids = np.concatenate([r[2] for r in rows])
+    level = talent[p_idx] + strength[squad_comp[s_idx]]
+    n_rows = len(p_idx)
+
+    tables["public.players"] = pd.DataFrame({
+        "id": _ids(player_ids),
+        "commonname": [f"{FIRST_NAMES[a]} {LAST_NAMES[b]}" for a, b in zip(rng.integers(0, len(FIRST_NAMES), n_players), rng.integers(0, len(LAST_NAMES), n_players))],
+        "birthdate": pd.to_datetime("1990-01-01") + pd.to_timedelta(rng.integers(0, 365 * 18, n_players), unit="D"),
+        "birthplace": rng.choice(CITIES, n_players),
+        "leg": rng.choice(["right", "left", "both"], n_players, p=[0.7, 0.25, 0.05]),
+        "currentSquadId": _ids(squad_ids[current_squad]),
+    })
+    tables["public.players"]["birthdate"] = tables["public.players"]["birthdate"].dt.date
+
+    # Profielscores: enkel de profielen van de eigen positie zijn > 0, een paar ontbreken (NULL)
+    season_rows = pd.DataFrame({
+        "playerId": _ids(player_ids[p_idx]),
+        "squadId": _ids(squad_ids[s_idx]),
+        "iterationId": _ids(it_ids),
+        "position": position_names[player_pos[p_idx]],
+    })
+    profile = {}
+    for c in PROFILE_SCORE_COLUMNS:
+        relevant = np.isin(player_pos[p_idx], [i for i, (_, cols) in enumerate(POSITIONS.values()) if c in cols])
+        values = np.where(relevant, _scores(rng, level, n_rows), 0.0)
+        values[rng.random(n_rows) < 0.02] = np.nan
+        profile[c] = values
+    tables["analysis.final_impect_scores"] = pd.concat([season_rows, pd.DataFrame(profile)], axis=1)
+
+    # Metriek- en KPI-scores: één rij per speler-seizoen per id
+    for name, metric_ids in (("analysis.player_final_scores", METRIC_IDS), ("analysis.kpis_final_scores", KPI_IDS)):
+        m = len(metric_ids)
+        repeated = season_rows.iloc[np.repeat(np.arange(n_rows), m)].reset_index(drop=True)
+        tables[name] = pd.DataFrame({
+            "iterationId": repeated["iterationId"],
+            "playerId": repeated["playerId"],
+            "squadId": repeated["squadId"],
+            "position": repeated["position"],
+            "metric_id": np.tile(np.asarray(metric_ids, dtype=np.int64), n_rows),
+            "final_score_1_to_100": _scores(rng, np.repeat(level, m), n_rows * m, spread=20),
+        })
+
+    # Ploegscores per (ploeg, seizoen) in de competitie van die ploeg
+    sq_idx = np.repeat(np.arange(n_squads), seasons)
+    sq_iter = iteration_ids[squad_comp[sq_idx], np.tile(np.arange(seasons), n_squads)]
+    sq_level = np.repeat(rng.normal(50, 12, n_squads), seasons) + strength[squad_comp[sq_idx]]
+    for name, prefix, count in (("analysis.squad_final_scores", "s", SQUAD_METRIC_COUNT), ("analysis.squadkpi_final_scores", "k", len(KPI_IDS))):
+        ids = [f"{prefix}{i}" for i in (range(count) if prefix == "s" else KPI_IDS)]
+        tables[name] = pd.DataFrame({
+            "squadId": _ids(np.repeat(squad_ids[sq_idx], count)),
+            "iterationId": _ids(np.repeat(sq_iter, count)),
+            "metric_id": np.tile(ids, len(sq_idx)),
+            "final_score_1_to_100": _scores(rng, np.repeat(sq_level, count), len(sq_idx) * count, spread=20),
+        })
+    k = len(SQUAD_PROFILES)
+    tables["analysis.squad_profile_scores"] = pd.DataFrame({
+        "squadId": _ids(np.repeat(squad_ids[sq_idx], k)),
+        "iterationId": _ids(np.repeat(sq_iter, k)),
+        "profile_name": np.tile(SQUAD_PROFILES, len(sq_idx)),
+        "score": np.round(rng.uniform(0, 100, len(sq_idx) * k), 1),
+    })
+
+    # Wedstrijden: heen en terug binnen elke competitie, verspreid over het seizoen
+    matches = []
+    for c in range(competitions):
+        members = np.flatnonzero(squad_comp == c)
+        home, away = np.meshgrid(members, members)
+        keep = home != away
+        home, away = home[keep], away[keep]
+        for s in range(seasons):
+            start = pd.Timestamp(f"{first_year - s}-08-01")
+            matches.append(pd.DataFrame({
+                "homeSquadId": squad_ids[home], "awaySquadId": squad_ids[away],
+                "iterationId": iteration_ids[c, s],
+                "scheduledDate": (start + pd.to_timedelta(rng.integers(0, 280, len(home)), unit="D")).date,
+                "available": rng.random(len(home)) < 0.95,
+            }))
+    matches = pd.concat(matches, ignore_index=True)
+    matches.insert(0, "id", _ids(1 + np.arange(len(matches))))
+    for col in ("homeSquadId", "awaySquadId", "iterationId"):
+        matches[col] = _ids(matches[col])
+    tables["public.matches"] = matches[["id", "scheduledDate", "homeSquadId", "awaySquadId", "available", "iterationId"]]
+
+    # Scoutingrapporten: ~5% van de speler-seizoenen, op thuiswedstrijden van de eigen ploeg
+    home_matches = matches.groupby(["homeSquadId", "iterationId"], observed=True).indices
+    reports = []
+    for i in np.flatnonzero(rng.random(n_rows) < 0.05):
+        candidates = home_matches.get((str(squad_ids[s_idx[i]]), str(it_ids[i])))
+        if candidates is None:
+            continue
+        for j in rng.choice(candidates, min(len(candidates), rng.integers(1, 4)), replace=False):
+            reports.append((str(it_ids[i]), str(player_ids[p_idx[i]]), matches["id"].iat[j], position_names[player_pos[p_idx[i]]], VERDICTS[rng.integers(0, 3)]))
+    tables["analysis.scouting_reports"] = pd.DataFrame(reports, columns=["iterationId", "playerId", "matchId", "position", "label"])
+
+    # Coaches: per ploeg opeenvolgende periodes (~40% kans op een wissel per seizoen); een
+    # ontslagen coach vindt soms later een andere ploeg, zo hebben coaches meerdere periodes
+    season_starts = [pd.Timestamp(f"{first_year - s}-07-01") for s in reversed(range(seasons))]
+    tenures, free, n_coaches = [], [], 0
+    for sq in rng.permutation(n_squads):
+        start = season_starts[0]
+        changes = [season_starts[s] + pd.Timedelta(days=int(rng.integers(60, 280))) for s in range(seasons) if rng.random() < 0.4]
+        for end in changes + [None]:
+            rehire = [i for i, (_, fired) in enumerate(free) if fired < start]
+            if rehire and rng.random() < 0.3:
+                coach = free.pop(rehire[rng.integers(len(rehire))])[0]
+            else:
+                coach, n_coaches = n_coaches, n_coaches + 1
+            tenures.append((coach, squad_ids[sq], start.date(), None if end is None else end.date()))
+            if end is not None:
+                free.append((coach, end))
+                start = end + pd.Timedelta(days=1)
+    coach_idx = np.array([t[0] for t in tenures])
+    coach_names = [f"{FIRST_NAMES[a]} {LAST_NAMES[b]}" for a, b in zip(rng.integers(0, len(FIRST_NAMES), n_coaches), rng.integers(0, len(LAST_NAMES), n_coaches))]
+    tables["public.coach_tenures"] = pd.DataFrame({
+        "coachId": _ids(900000 + coach_idx),
+        "name": [coach_names[c] for c in coach_idx],
+        "squadId": _ids([t[1] for t in tenures]),
+        "start_date": [t[2] for t in tenures],
+        "end_date": [t[3] for t in tenures],
+    })
+
+    # Definities
+    tables["public.player_score_definitions"] = pd.DataFrame({
+        "id": [str(i) for i in METRIC_IDS], "name": [f"Metriek {i}" for i in METRIC_IDS],
+        "details_label": rng.choice(["per 90", "%", "totaal"], len(METRIC_IDS)),
+    })
+    tables["public.squad_score_definitions"] = pd.DataFrame({
+        "id": [str(i) for i in range(SQUAD_METRIC_COUNT)], "name": [f"Ploegmetriek {i}" for i in range(SQUAD_METRIC_COUNT)],
+        "details_label": rng.choice(["per 90", "%", "totaal"], SQUAD_METRIC_COUNT),
+        "inverted": np.arange(SQUAD_METRIC_COUNT) % 5 == 0,
+    })
+    tables["analysis.kpi_definitions"] = pd.DataFrame({
+        "id": [str(i) for i in KPI_IDS], "name": [f"KPI {i}" for i in KPI_IDS],
+        "context": rng.choice(["Aan de bal", "Zonder bal", "Standaardsituaties"], len(KPI_IDS)),
+    })
+    return {name: tables[name] for name in DDL}
+
+
+# -----------------------------------------------------------------------------
+# WEGSCHRIJVEN
+# -----------------------------------------------------------------------------
+
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+
+
+def local_dsn(dsn):
+    # Host uit de DSN, anders uit PGHOST/PGHOSTADDR zoals libpq; leeg = standaard unix socket
+    import psycopg2.extensions
+
+    params = psycopg2.extensions.parse_dsn(dsn)
+    hosts = (params.get("host") or os.environ.get("PGHOST", "")).split(",")
+    hosts += (params.get("hostaddr") or os.environ.get("PGHOSTADDR", "")).split(",")
+    remote = [h for h in hosts if h not in LOCAL_HOSTS and not h.startswith("/")]
+    if remote:
+        raise SystemExit(f"Weigert niet-lokale database ({', '.join(remote)}): synthdata verwijdert bestaande tabellen.")
+    return dsn
+
+
+def load_postgres(tables, dsn, replace=False, chunk_rows=500_000):
+    import psycopg2
+
+    conn = psycopg2.connect(local_dsn(dsn))
+    conn.autocommit = True
+    try:
+        _load_postgres(conn, tables, replace, chunk_rows)
+    finally:
+        conn.close()
+
+
+def _load_postgres(conn, tables, replace, chunk_rows):
+    from migrate import migrate_up, refresh
+
+    with conn.cursor() as cur:
+        existing = []
+        for name in tables:
+            cur.execute("SELECT to_regclass(%s)", (name,))
+            if cur.fetchone()[0] is not None:
+                existing.append(name)
+        if existing and not replace:
+            raise SystemExit(f"Tabellen bestaan al ({', '.join(existing)}). Gebruik --replace om ze te overschrijven.")
+
+        cur.execute("CREATE SCHEMA IF NOT EXISTS analysis")
+        # Verse tabellen: alle migraties (en de materialized views, die met CASCADE
+        # verdwijnen) worden hieronder opnieuw toegepast
+        cur.execute("DROP TABLE IF EXISTS analysis.schema_migrations")
+        for name, df in tables.items():
+            t0 = time.perf_counter()
+            cur.execute(f"DROP TABLE IF EXISTS {name} CASCADE")
+            cur.execute(f"CREATE TABLE {name} ({DDL[name]})")
+            columns = ", ".join(f'"{c}"' for c in df.columns)
+            for start in range(0, len(df), chunk_rows):
+                buf = io.StringIO()
+                df.iloc[start:start + chunk_rows].to_csv(buf, index=False, header=False)
+                buf.seek(0)
+                cur.copy_expert(f"COPY {name} ({columns}) FROM STDIN WITH (FORMAT csv)", buf)
+            print(f"{name}: {len(df)} rijen ({time.perf_counter() - t0:.1f}s)")
+        migrate_up(conn)
+        refresh(conn)
+
+
+def coach_aggregates(tables):
+    # Zelfde resultaat als migrate.refresh_coach_tenures (volledig i.p.v. incrementeel)
+    # Dubbele periodes (zelfde coach, ploeg en start) samen, zoals in de SQL
+    t = tables["public.coach_tenures"].groupby(["coachId", "squadId", "start_date"], as_index=False, sort=False).agg(
+        name=("name", "min"), end_date=("end_date", "max"))
+    t = t.assign(tenure_id=t["coachId"].astype(str) + ":" + t["squadId"].astype(str) + ":" + t["start_date"].astype(str))
+    m = tables["public.matches"]
+    m = m[m["available"]]
+    played = pd.concat([m[["iterationId", "scheduledDate"]].assign(squadId=m[col]) for col in ("homeSquadId", "awaySquadId")])
+    j = t.merge(played, on="squadId")
+    j = j[(j["scheduledDate"] >= j["start_date"]) & (j["scheduledDate"] <= j["end_date"].fillna(dt.date.max))]
+    weights = j.groupby(["tenure_id", "squadId", "iterationId"], observed=True).size().rename("matches").reset_index()
+
+    summary = t.merge(weights.groupby("tenure_id")["matches"].sum().reset_index(), on="tenure_id", how="left")
+    summary["matches"] = summary["matches"].fillna(0).astype(np.int32)
+    summary["fingerprint"] = "synthdata"
+
+    def weighted(name, key, value, kind):
+        s = weights.merge(tables[name], on=["squadId", "iterationId"]).dropna(subset=[value])
+        s = s.assign(num=s[value] * s["matches"]).groupby(["tenure_id", key], observed=True)[["num", "matches"]].sum().reset_index()
+        return pd.DataFrame({"tenure_id": s["tenure_id"], "kind": np.int16(kind), "key": s[key].astype(str),
+                             "score": (s["num"] / s["matches"]).astype(np.float32)})
+
+    return {
+        "analysis.coach_tenure_summary": summary[["tenure_id", "coachId", "name", "squadId", "start_date", "end_date", "matches", "fingerprint"]],
+        "analysis.coach_tenure_iterations": weights[["tenure_id", "iterationId", "matches"]].astype({"matches": np.int32}),
+        "analysis.coach_tenure_scores": pd.concat([
+            weighted("analysis.squad_profile_scores", "profile_name", "score", 0),
+            weighted("analysis.squad_final_scores", "definition_id", "final_score_1_to_100", 1),
+            weighted("analysis.squadkpi_final_scores", "definition_id", "final_score_1_to_100", 2),
+        ], ignore_index=True),
+    }
+
+
+def snapshot_tables(tables):
+    # Zelfde vorm als een export van een gemigreerde database: definition_id kolommen
+    # (migrations/001) en de materialized views (migrations/003) erbij.
+    tables = dict(tables)
+    for name, strip in (("analysis.player_final_scores", None), ("analysis.kpis_final_scores", None),
+                        ("analysis.squad_final_scores", "s"), ("analysis.squadkpi_final_scores", "k")):
+        ids = tables[name]["metric_id"].astype(str)
+        tables[name] = tables[name].assign(definition_id=ids.str.replace(strip, "", regex=False) if strip else ids)
+
+    def mv(name, definitions, columns):
+        d = tables[definitions].rename(columns={"id": "definition_id"})
+        return tables[name].merge(d, on="definition_id")[columns]
+
+    tables["analysis.mv_player_metric_scores"] = mv("analysis.player_final_scores", "public.player_score_definitions",
+                                                    ["iterationId", "playerId", "metric_id", "name", "details_label", "final_score_1_to_100"])
+    tables["analysis.mv_player_kpi_scores"] = mv("analysis.kpis_final_scores", "analysis.kpi_definitions",
+                                                 ["iterationId", "playerId", "metric_id", "name", "context", "final_score_1_to_100"])
+    tables["analysis.mv_squad_metric_scores"] = mv("analysis.squad_final_scores", "public.squad_score_definitions",
+                                                   ["iterationId", "squadId", "metric_id", "name", "details_label", "inverted", "final_score_1_to_100"])
+    tables["analysis.mv_squad_kpi_scores"] = mv("analysis.squadkpi_final_scores", "analysis.kpi_definitions",
+                                                ["iterationId", "squadId", "metric_id", "name", "final_score_1_to_100"])
+
+    tables.update(coach_aggregates(tables))
+
+    arrow_tables = {}
+    for name, df in tables.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        # Zelfde types als snapshot.py bij een export uit Postgres (string, date32)
+        arrow_tables[name] = table.cast(pa.schema([
+            pa.field(f.name, pa.string() if pa.types.is_large_string(f.type) or pa.types.is_null(f.type) else f.type)
+            for f in table.schema
+        ]))
+    return arrow_tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genereer een synthetische KVK dataset.")
+    parser.add_argument("--competitions", type=int, default=10)
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument("--squads", type=int, default=18, help="ploegen per competitie")
+    parser.add_argument("--players", type=int, default=25, help="spelers per ploeg")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--target", choices=["postgres", "snapshot"], default="snapshot")
+    parser.add_argument("--out", default="snapshot", help="doelmap voor --target snapshot")
+    parser.add_argument("--dsn", help="lokale Postgres voor --target postgres (bv. \"host=localhost dbname=kvk_synth\")")
+    parser.add_argument("--replace", action="store_true", help="bestaande tabellen in Postgres overschrijven")
+    args = parser.parse_args()
+    if args.target == "postgres":
+        if not args.dsn:
+            parser.error("--target postgres vereist --dsn (nooit de database van de app)")
+        local_dsn(args.dsn)
+
+    t0 = time.perf_counter()
+    tables = generate(args.competitions, args.seasons, args.squads, args.players, args.seed)
+    print(f"Gegenereerd in {time.perf_counter() - t0:.1f}s: " + ", ".join(f"{n} {len(df)}" for n, df in tables.items()))
+    if args.target == "postgres":
+        load_postgres(tables, args.dsn, replace=args.replace)
+    else:
+        from snapshot import write_snapshot
+
+        manifest = write_snapshot(snapshot_tables(tables), args.out)
+        print(f"Snapshot klaar in {args.out} ({len(manifest['tables'])} tabellen).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+# -----------------------------------------------------------------------------
+# TEAMPAGINA: QUERIES
+# -----------------------------------------------------------------------------
+# Metrieken en KPIs komen uit de materialized views van migrations/003 (vooraf
+# gejoind met hun definities, geïndexeerd op squadId + iterationId).
+
+TEAMS_QUERY = """SELECT DISTINCT sq.name, sq.id as "squadId" FROM public.squads sq JOIN analysis.squad_final_scores s ON sq.id = s."squadId" WHERE s."iterationId" = %s ORDER BY sq.name;"""
+
+SQUAD_DETAILS_QUERY = 'SELECT name, "imageUrl" FROM public.squads WHERE id = %s'
+
+SQUAD_PROFILE_QUERY = 'SELECT profile_name as "Profiel", score as "Score" FROM analysis.squad_profile_scores WHERE "squadId" = %s AND "iterationId" = %s ORDER BY score DESC'
+
+SQUAD_METRICS_QUERY = 'SELECT name as "Metriek", details_label as "Detail", inverted as "Inverted", final_score_1_to_100 as "Score" FROM analysis.mv_squad_metric_scores WHERE "squadId" = %s AND "iterationId" = %s ORDER BY final_score_1_to_100 DESC'
+
+SQUAD_KPIS_QUERY = 'SELECT name as "KPI", final_score_1_to_100 as "Score" FROM analysis.mv_squad_kpi_scores WHERE "squadId" = %s AND "iterationId" = %s ORDER BY final_score_1_to_100 DESC'
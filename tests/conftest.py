@@ -0,0 +1,5 @@
+import os
+import sys
+
+# De modules staan los in de root van de repo (geen package)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,186 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from db import ResultCache, compact_frame, frame_bytes, restore_frame
+
+
+class Loader:
+    # Telt de oproepen; elke oproep geeft een nieuw frame (waarde = volgnummer)
+    def __init__(self, rows=10, fail=False, gate=None):
+        self.calls = 0
+        self.rows = rows
+        self.fail = fail
+        self.gate = gate
+
+    def __call__(self):
+        self.calls += 1
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("database weg")
+        return pd.DataFrame({"n": np.full(self.rows, self.calls, dtype=np.int64)})
+
+
+def value(result):
+    (df, dtypes), hit = result
+    return restore_frame(df, dtypes)["n"].iloc[0], hit
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_hit_after_miss():
+    cache, loader = ResultCache(max_bytes=10**6, ttl=60), Loader()
+    assert value(cache.get("v1", "q", (1,), loader)) == (1, False)
+    assert value(cache.get("v1", "q", [1], loader)) == (1, True)  # lijst en tuple: zelfde sleutel
+    assert loader.calls == 1
+
+
+def test_errors_not_cached():
+    cache, loader = ResultCache(max_bytes=10**6, ttl=60), Loader(fail=True)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            cache.get("v1", "q", None, loader)
+    assert loader.calls == 2
+    assert cache.stats()["entries"] == 0
+    loader.fail = False
+    assert value(cache.get("v1", "q", None, loader)) == (3, False)
+
+
+def test_lru_bounded_in_bytes():
+    one = frame_bytes(Loader()())
+    cache = ResultCache(max_bytes=int(one * 2.5), ttl=60)
+    loaders = {q: Loader() for q in "abc"}
+    cache.get("v1", "a", None, loaders["a"])
+    cache.get("v1", "b", None, loaders["b"])
+    cache.get("v1", "a", None, loaders["a"])  # a recent gebruikt: b is de oudste
+    cache.get("v1", "c", None, loaders["c"])
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert cache.contains("v1", "a", None) and cache.contains("v1", "c", None)
+    assert not cache.contains("v1", "b", None)
+
+    # Groter dan de hele cache: wel teruggegeven, niet bewaard
+    big = Loader(rows=1000)
+    assert value(cache.get("v1", "big", None, big)) == (1, False)
+    assert not cache.contains("v1", "big", None)
+
+
+def test_new_version_clears_entries():
+    cache, loader = ResultCache(max_bytes=10**6, ttl=60), Loader()
+    cache.get("v1", "q", None, loader)
+    assert value(cache.get("v2", "q", None, loader)) == (2, False)
+    assert cache.stats()["entries"] == 1 and cache.stats()["version"] == "v2"
+    assert not cache.contains("v1", "q", None)
+
+
+def test_stale_while_revalidate():
+    cache, loader = ResultCache(max_bytes=10**6, ttl=0), Loader()
+    cache.get("v1", "q", None, loader)
+    time.sleep(0.01)
+    assert value(cache.get("v1", "q", None, loader)) == (1, True)  # oud resultaat, meteen
+    wait_until(lambda: loader.calls == 2 and not cache._revalidating)
+    assert value(cache.get("v1", "q", None, loader))[0] == 2
+
+
+def test_failed_revalidation_keeps_old_result():
+    cache, loader = ResultCache(max_bytes=10**6, ttl=0), Loader()
+    cache.get("v1", "q", None, loader)
+    loader.fail = True
+    time.sleep(0.01)
+    cache.get("v1", "q", None, loader)
+    wait_until(lambda: loader.calls == 2 and not cache._revalidating)
+    assert cache.contains("v1", "q", None)
+    assert value(cache.get("v1", "q", None, loader)) == (1, True)
+
+
+def test_concurrent_misses_share_one_fetch():
+    gate = threading.Event()
+    cache, loader = ResultCache(max_bytes=10**6, ttl=60), Loader(gate=gate)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(value(cache.get("v1", "q", None, loader)))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: loader.calls == 1 and len(cache._inflight) == 1)
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert loader.calls == 1
+    assert sorted(hit for _, hit in results) == [False] * 5
+    assert {n for n, _ in results} == {1}
+
+
+def test_concurrent_miss_gets_the_error():
+    gate = threading.Event()
+    cache, loader = ResultCache(max_bytes=10**6, ttl=60), Loader(fail=True, gate=gate)
+    errors = []
+
+    def get():
+        try:
+            cache.get("v1", "q", None, loader)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=get) for _ in range(3)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: loader.calls == 1)
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert loader.calls == 1 and len(errors) == 3
+    assert not cache._inflight
+
+
+def test_miss_does_not_wait_on_queued_revalidation():
+    # Verversing hangt (bv. de database is traag) en het oude resultaat wordt gewist:
+    # een miss laadt zelf i.p.v. op de verversing te wachten
+    gate = threading.Event()
+    cache = ResultCache(max_bytes=10**6, ttl=0, revalidate_workers=1)
+    cache.get("v1", "q", None, Loader())
+    slow = Loader(gate=gate)
+    time.sleep(0.01)
+    cache.get("v1", "q", None, slow)
+    wait_until(lambda: slow.calls == 1)
+    cache.clear()
+
+    done = []
+    t = threading.Thread(target=lambda: done.append(value(cache.get("v1", "q", None, Loader()))))
+    t.start()
+    t.join(2)
+    assert done == [(1, False)]
+    gate.set()
+    wait_until(lambda: not cache._revalidating)
+
+
+def test_compact_frame_round_trip():
+    df = pd.DataFrame({
+        "team": ["KV Kortrijk", "Club Brugge"] * 150,
+        "score": np.arange(300, dtype=np.int64) % 100,
+        "value": np.linspace(0, 1, 300),
+        "naam": [f"Speler {i}" for i in range(300)],
+        "leeg": [None, "x"] * 150,
+    })
+    compact = compact_frame(df, floats=False)
+    assert isinstance(compact["team"].dtype, pd.CategoricalDtype)
+    assert compact["score"].dtype == np.uint8
+    assert compact["value"].dtype == np.float64  # floats=False: verliesloos
+    assert compact["naam"].dtype == object and compact["leeg"].dtype == object
+    assert frame_bytes(compact) < frame_bytes(df)
+
+    restored = restore_frame(compact, df.dtypes)
+    pd.testing.assert_frame_equal(restored, df)
+    restored.loc[0, "team"] = "Anderlecht"  # een kopie: de gecachete versie blijft
+    assert compact.loc[0, "team"] == "KV Kortrijk"
+
+    small = df.head(10)
+    assert compact_frame(small) is small
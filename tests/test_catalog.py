@@ -0,0 +1,44 @@
+import pandas as pd
+
+from catalog import IterationCatalog
+
+ITERATIONS = pd.DataFrame([
+    (101, "24/25", "Eerste Klasse A"),
+    (205, "25/26", "Eerste Klasse A"),
+    (99, "25/26", "Eerste Klasse A"),   # tweede iteratie van dezelfde competitie, lager id
+    (1000, "25/26", "Eerste Klasse A"),  # numeriek hoogste id (als tekst het laagste)
+    (210, "25/26", "Challenger Pro League"),
+    (150, "24/25", "Beker van België"),
+    (7, None, "Zonder seizoen"),
+], columns=["id", "season", "competitionName"])
+
+
+def test_seasons_and_competitions_ordered():
+    catalog = IterationCatalog.from_frame(ITERATIONS)
+    assert catalog.seasons == ("25/26", "24/25")
+    assert catalog.competitions("25/26") == ("Challenger Pro League", "Eerste Klasse A")
+    assert catalog.competitions("24/25") == ("Beker van België", "Eerste Klasse A")
+    assert catalog.competitions("23/24") == ()
+
+
+def test_default_iteration_is_highest_id():
+    catalog = IterationCatalog.from_frame(ITERATIONS)
+    assert catalog.iteration_ids("25/26", "Eerste Klasse A") == ("99", "205", "1000")
+    assert catalog.default_iteration("25/26", "Eerste Klasse A") == "1000"
+    assert catalog.default_iteration("24/25", "Eerste Klasse A") == "101"
+    assert catalog.default_iteration("23/24", "Eerste Klasse A") is None
+
+
+def test_locate():
+    catalog = IterationCatalog.from_frame(ITERATIONS)
+    assert catalog.locate(205) == ("25/26", "Eerste Klasse A")
+    assert catalog.locate("150") == ("24/25", "Beker van België")
+    assert catalog.locate(7) is None  # zonder seizoen: niet in de catalogus
+    assert catalog.locate("onbekend") is None
+
+
+def test_non_numeric_ids_after_numeric():
+    df = pd.DataFrame([("b", "25/26", "X"), ("12", "25/26", "X"), ("a", "25/26", "X")], columns=["id", "season", "competitionName"])
+    catalog = IterationCatalog.from_frame(df)
+    assert catalog.iteration_ids("25/26", "X") == ("12", "a", "b")
+    assert catalog.default_iteration("25/26", "X") == "b"
@@ -0,0 +1,93 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import synthdata
+
+# De SQL-kant draait enkel tegen een lokale wegwerpdatabase: synthdata.load_postgres
+# verwijdert de bestaande tabellen. Bv. KVK_TEST_DSN="host=localhost dbname=kvk_test"
+TEST_DSN = os.environ.get("KVK_TEST_DSN")
+needs_postgres = pytest.mark.skipif(not TEST_DSN, reason="KVK_TEST_DSN niet gezet")
+
+COACH_TABLES = ["analysis.coach_tenure_summary", "analysis.coach_tenure_iterations", "analysis.coach_tenure_scores"]
+
+
+@pytest.fixture(scope="module")
+def tables():
+    tables = synthdata.generate(competitions=2, seasons=3, squads_per_competition=4, players_per_squad=5, seed=3)
+    # Dezelfde periode twee keer aangeleverd (de ETL dedupliceert niet)
+    tenures = tables["public.coach_tenures"]
+    tables["public.coach_tenures"] = pd.concat([tenures, tenures.iloc[[0, 3]]], ignore_index=True)
+    return tables
+
+
+def pandas_aggregates(tables):
+    snapshot = synthdata.snapshot_tables(tables)
+    return {name: snapshot[name].to_pandas() for name in COACH_TABLES}
+
+
+def canonical(frames):
+    # Vergelijkbare vorm voor SQL en pandas: tekst-sleutels, gesorteerd, scores afgerond
+    summary = frames["analysis.coach_tenure_summary"][["tenure_id", "matches"]].astype({"tenure_id": str, "matches": int})
+    iterations = frames["analysis.coach_tenure_iterations"].astype({"tenure_id": str, "iterationId": str, "matches": int})
+    scores = frames["analysis.coach_tenure_scores"].astype({"tenure_id": str, "kind": int, "key": str})
+    scores = scores.assign(score=np.round(scores["score"].astype(float), 3))
+    return [df.sort_values(list(df.columns[:3])).reset_index(drop=True)
+            for df in (summary, iterations[["tenure_id", "iterationId", "matches"]], scores[["tenure_id", "kind", "key", "score"]])]
+
+
+def read_frame(conn, sql):
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        return pd.DataFrame(cur.fetchall(), columns=[c.name for c in cur.description])
+
+
+def test_duplicate_tenures_counted_once(tables):
+    unique = dict(tables, **{"public.coach_tenures": tables["public.coach_tenures"].drop_duplicates()})
+    for with_duplicates, without in zip(canonical(pandas_aggregates(tables)), canonical(pandas_aggregates(unique))):
+        pd.testing.assert_frame_equal(with_duplicates, without)
+
+
+@needs_postgres
+def test_sql_refresh_matches_pandas(tables):
+    import psycopg2
+
+    from migrate import refresh_coach_tenures
+
+    synthdata.load_postgres(tables, TEST_DSN, replace=True)  # migraties + volledige refresh
+    conn = psycopg2.connect(TEST_DSN)
+    conn.autocommit = True
+
+    def read():
+        return {name: read_frame(conn, f"SELECT * FROM {name}") for name in COACH_TABLES}
+
+    def refreshed():
+        return dict(read_frame(conn, "SELECT tenure_id, refreshed_at FROM analysis.coach_tenure_summary").itertuples(index=False))
+
+    try:
+        for sql, expected in zip(canonical(read()), canonical(pandas_aggregates(tables))):
+            pd.testing.assert_frame_equal(sql, expected, check_exact=False, atol=1e-3)
+
+        # Niets veranderd: geen enkele periode opnieuw berekend
+        before = refreshed()
+        refresh_coach_tenures(conn)
+        assert refreshed() == before
+
+        # Eén ploegscore aangepast: precies de periodes met die (ploeg, iteratie) opnieuw
+        with conn.cursor() as cur:
+            cur.execute('SELECT "squadId", "iterationId", definition_id FROM analysis.squad_final_scores ORDER BY 1, 2, 3 LIMIT 1')
+            squad_id, iteration_id, definition_id = cur.fetchone()
+            cur.execute('UPDATE analysis.squad_final_scores SET final_score_1_to_100 = final_score_1_to_100 + 1 '
+                        'WHERE "squadId" = %s AND "iterationId" = %s AND definition_id = %s', (squad_id, iteration_id, definition_id))
+            cur.execute('SELECT DISTINCT i.tenure_id FROM analysis.coach_tenure_iterations i '
+                        'JOIN analysis.coach_tenure_summary s USING (tenure_id) WHERE s."squadId" = %s AND i."iterationId" = %s',
+                        (squad_id, iteration_id))
+            affected = {row[0] for row in cur.fetchall()}
+        assert affected
+        refresh_coach_tenures(conn)
+        after = refreshed()
+        assert {t for t in after if after[t] != before[t]} == affected
+    finally:
+        conn.close()
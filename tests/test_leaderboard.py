@@ -0,0 +1,78 @@
+import datetime as dt
+
+import pandas as pd
+import pytest
+
+import leaderboard
+from leaderboard import AGE_BOUNDS, birthdate_bounds, leaderboard_query
+from profiles import POSITION_GROUPS, PROFILE_COLUMNS
+
+COLUMN = next(iter(PROFILE_COLUMNS.values()))
+GROUP = next(iter(POSITION_GROUPS))
+
+
+def query(age_range, kind="Profiel", key=COLUMN, **kwargs):
+    return leaderboard_query(kind, key, ["10", 11], POSITION_GROUPS[GROUP], age_range, **kwargs)
+
+
+def where(sql):
+    return sql.split("WHERE", 1)[1].split("ORDER BY", 1)[0]
+
+
+@pytest.mark.parametrize("age_range", [None, AGE_BOUNDS, list(AGE_BOUNDS)])
+def test_default_range_has_no_birthdate_predicate(age_range):
+    sql, params = query(age_range)
+    assert "birthdate" not in where(sql)
+    assert params == (("10", "11"), tuple(POSITION_GROUPS[GROUP]), 50, 0)
+
+
+def test_one_bound_per_moved_slider_end():
+    born_after, born_before = birthdate_bounds(18, 30)
+
+    sql, params = query((18, AGE_BOUNDS[1]))
+    assert "p.birthdate <= %s" in where(sql) and "p.birthdate >" not in where(sql)
+    assert params[2:] == (born_before, 50, 0)
+
+    sql, params = query((AGE_BOUNDS[0], 30))
+    assert "p.birthdate > %s" in where(sql) and "p.birthdate <=" not in where(sql)
+    assert params[2:] == (born_after, 50, 0)
+
+    sql, params = query((18, 30), limit=26, offset=50)
+    assert "p.birthdate > %s AND p.birthdate <= %s" in where(sql)
+    assert params[2:] == (born_after, born_before, 26, 50)
+
+
+def test_birthdate_bounds():
+    today = dt.date(2025, 3, 1)
+    # 18 t/m 30 jaar: geboren na 1 maart 1994 en uiterlijk op 1 maart 2007
+    assert birthdate_bounds(18, 30, today) == (dt.date(1994, 3, 1), dt.date(2007, 3, 1))
+    assert birthdate_bounds(None, 30, today) == (dt.date(1994, 3, 1), None)
+    assert birthdate_bounds(21, None, dt.date(2024, 2, 29)) == (None, dt.date(2003, 2, 28))  # 29 februari
+
+
+def test_metric_key_is_a_parameter():
+    sql, params = query(None, kind="Metriek", key=66)
+    assert "s.metric_id = %s" in where(sql)
+    assert params[0] == "66"
+
+
+def test_invalid_input_rejected():
+    with pytest.raises(ValueError):
+        query(None, key="cb_kvk_score; DROP TABLE analysis.final_impect_scores")
+    with pytest.raises(ValueError):
+        query(None, kind="Onbekend")
+
+
+def test_page_asks_one_row_extra(monkeypatch):
+    seen = []
+
+    def fake_query(sql, params):
+        seen.append(params)
+        n = params[-2]
+        return pd.DataFrame({"Naam": [f"Speler {i}" for i in range(n)], "Positie": "CB", "birthdate": [None] * n, "Score": 1.0})
+
+    monkeypatch.setattr(leaderboard, "cached_query", fake_query)
+    df, has_next = leaderboard.load_leaderboard_page("Profiel", COLUMN, ["10"], GROUP, page=2, page_size=25)
+    assert seen[0][-2:] == (26, 50)
+    assert has_next and len(df) == 25
+    assert df["#"].iloc[0] == 51 and df["Leeftijd"].isna().all()
@@ -0,0 +1,134 @@
+import types
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+import db
+
+
+class Server:
+    # Nepdatabase: een herstart maakt alle bestaande verbindingen dood
+    def __init__(self):
+        self.generation = 0
+        self.up = True
+        self.connections = []
+
+    def connect(self, **kwargs):
+        if not self.up:
+            raise psycopg2.OperationalError("connection refused")
+        conn = FakeConnection(self)
+        self.connections.append(conn)
+        return conn
+
+    def restart(self):
+        self.generation += 1
+
+
+class FakeConnection:
+    def __init__(self, server):
+        self.server = server
+        self.generation = server.generation
+        self.closed = 0
+        self.autocommit = False
+        self.info = types.SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.description = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.generation != self.conn.server.generation:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+        if query == "CANCEL":
+            raise psycopg2.extensions.QueryCanceledError("canceling statement due to statement timeout")
+        self.conn.executed.append(query)
+        self.description = [types.SimpleNamespace(name="x")]
+
+    def fetchall(self):
+        return [(1,)]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = Server()
+    monkeypatch.setattr(db.psycopg2, "connect", server.connect)
+    monkeypatch.setenv("KVK_DATA_SOURCE", "postgres")
+    return server
+
+
+def use_pool(monkeypatch, **kwargs):
+    pool = db.ConnectionPool(**kwargs)
+    monkeypatch.setattr(db, "init_connection_pool", lambda: pool)
+    return pool
+
+
+def test_pre_ping_replaces_dead_idle_connection(server):
+    pool = db.ConnectionPool(minconn=1, maxconn=2, ping_interval=0)
+    old = server.connections[0]
+    server.restart()
+    conn = pool.getconn()
+    assert conn is not old and old.closed
+    assert conn.executed == []  # verse verbinding: niet opnieuw gepingd
+    pool.putconn(conn)
+
+
+def test_fresh_skips_idle_connections(server):
+    pool = db.ConnectionPool(minconn=1, maxconn=2, ping_interval=3600)
+    idle = server.connections[0]
+    conn = pool.getconn(fresh=True)
+    assert conn is not idle and len(server.connections) == 2
+    pool.putconn(conn)
+
+
+def test_retry_after_restart_uses_fresh_connection(server, monkeypatch):
+    # Geen pre-ping (recent gebruikt): de eerste poging krijgt een dode verbinding
+    pool = use_pool(monkeypatch, minconn=3, maxconn=3, ping_interval=3600)
+    old = list(server.connections)
+    server.restart()
+    df = db._fetch_dataframe("SELECT 1 AS x")
+    assert df["x"].tolist() == [1]
+    assert all(conn.closed for conn in old)  # closeall: ook de andere vrije verbindingen
+    assert len(server.connections) == 4
+    assert [conn for conn, _ in pool._idle] == [server.connections[-1]]
+    assert pool._slots._value == 3
+
+
+def test_single_retry_and_slot_released_on_failure(server, monkeypatch):
+    pool = use_pool(monkeypatch, minconn=1, maxconn=1, ping_interval=3600, timeout=0.1)
+    server.restart()
+    server.up = False
+    with pytest.raises(psycopg2.OperationalError):
+        db._fetch_dataframe("SELECT 1 AS x")
+    assert pool._slots._value == 1 and pool._idle == []
+
+    server.up = True
+    assert db._fetch_dataframe("SELECT 1 AS x")["x"].tolist() == [1]
+    assert pool._slots._value == 1
+
+
+def test_query_cancel_is_not_retried(server, monkeypatch):
+    pool = use_pool(monkeypatch, minconn=1, maxconn=1, ping_interval=3600)
+    conn = server.connections[0]
+    with pytest.raises(psycopg2.extensions.QueryCanceledError):
+        db._fetch_dataframe("CANCEL")
+    assert len(server.connections) == 1 and not conn.closed
+    assert pool._slots._value == 1
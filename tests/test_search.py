@@ -0,0 +1,67 @@
+import pandas as pd
+
+from search import PlayerSearchIndex, normalize, trigrams
+
+NAMES = ["Kevin De Bruyne", "Kevin Mirallas", "Martin Ødegaard", "Robert Lewandowski", "Łukasz Fabiański",
+         "Thomas Müller", "Hernán Crespo", "Bruno Fernandes", "Brunó", "Mats Hummels", "Mats Rits", "Jan De Bruyn"]
+
+
+def make_index():
+    rows = [{"playerId": str(i), "iterationId": "10", "Naam": name, "Team": "Team", "Seizoen": "24/25",
+             "Competitie": "Eerste Klasse A", "position": "MIDFIELD"} for i, name in enumerate(NAMES)]
+    # Kevin De Bruyne ook een seizoen later: de recentste iteratie eerst
+    rows.append({**rows[0], "iterationId": "11", "Seizoen": "25/26"})
+    return PlayerSearchIndex(pd.DataFrame(rows))
+
+
+def names(result):
+    return list(result["Naam"])
+
+
+def test_normalize_folds_accents_and_transliterates():
+    assert normalize("Hernán  Crespo") == "hernan crespo"
+    assert normalize("Martin Ødegaard") == "martin odegaard"
+    assert normalize("Łukasz Fabiański") == "lukasz fabianski"
+    assert normalize("Thomas Müller-Weiß") == "thomas muller weiss"
+
+
+def test_prefix_trigrams():
+    assert "ne " in trigrams("bruyne") and "ne " not in trigrams("bruyne", prefix=True)
+    assert trigrams("bruy", prefix=True) <= trigrams("bruyne")
+
+
+def test_accent_insensitive_both_ways():
+    index = make_index()
+    assert names(index.search("odegaard"))[0] == "Martin Ødegaard"
+    assert names(index.search("fabianski"))[0] == "Łukasz Fabiański"
+    assert names(index.search("Müller"))[0] == "Thomas Müller"
+    assert names(index.search("muller"))[0] == "Thomas Müller"
+
+
+def test_typo_tolerance():
+    index = make_index()
+    assert names(index.search("lewandowksi"))[0] == "Robert Lewandowski"
+    assert names(index.search("kevin de bruine"))[0] == "Kevin De Bruyne"
+
+
+def test_prefix_match():
+    index = make_index()
+    assert names(index.search("fernan"))[0] == "Bruno Fernandes"
+    assert set(names(index.search("kev"))) == {"Kevin De Bruyne", "Kevin Mirallas"}
+
+
+def test_ranking_coverage_then_jaccard():
+    index = make_index()
+    # Beide namen bevatten de hele zoekterm: de kortste naam (minder extra trigrammen) eerst
+    assert names(index.search("bruno"))[:2] == ["Brunó", "Bruno Fernandes"]
+    assert names(index.search("mats"))[:2] == ["Mats Rits", "Mats Hummels"]
+    # Dekking gaat voor: "Jan De Bruyn" heeft een hogere Jaccard, maar mist een deel van "de bruyne"
+    assert names(index.search("de bruyne"))[:3] == ["Kevin De Bruyne", "Kevin De Bruyne", "Jan De Bruyn"]
+
+
+def test_rows_per_name_recent_first_and_limit():
+    index = make_index()
+    result = index.search("de bruyne")
+    assert list(result.loc[result["Naam"] == "Kevin De Bruyne", "Seizoen"]) == ["25/26", "24/25"]
+    assert len(index.search("kevin", limit=1)) == 1
+    assert index.search("xyz").empty and index.search("").empty
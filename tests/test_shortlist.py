@@ -0,0 +1,36 @@
+import pandas as pd
+
+import shortlist
+
+
+def member(player_id, iteration_id, name, season, competition):
+    return {"playerId": player_id, "iterationId": iteration_id, "Naam": name, "Team": "KV Kortrijk",
+            "Seizoen": season, "Competitie": competition, "position": "CENTRAL_DEFENDER"}
+
+
+MEMBERS = [
+    member("1", "10", "Speler A", "24/25", "Eerste Klasse A"),
+    member("1", "11", "Speler A", "24/25", "Beker"),
+    member("1", "12", "Speler A", "25/26", "Eerste Klasse A"),
+    member("2", "12", "Speler A", "25/26", "Eerste Klasse A"),  # naamgenoot
+]
+
+
+def test_labels_unique_per_iteration():
+    labels = shortlist.member_labels(MEMBERS)
+    assert len(set(labels.values())) == len(MEMBERS)
+    assert labels[("1", "10")] == "Speler A (KV Kortrijk, 24/25 · Eerste Klasse A)"
+
+
+def test_metric_grid_one_column_per_iteration(monkeypatch):
+    rows = [
+        {"kind": kind, "iterationId": m["iterationId"], "playerId": m["playerId"], "name": f"{kind} {i}", "Score": 10.0 * n + i}
+        for n, m in enumerate(MEMBERS) for kind in ("Metriek", "KPI") for i in range(3)
+    ]
+    df = pd.DataFrame(rows).astype({"kind": "category", "name": "category"})
+    monkeypatch.setattr(shortlist, "cached_query", lambda query, params: df.copy())
+    grid = shortlist.metric_grid(MEMBERS)
+    assert list(grid.columns) == list(shortlist.member_labels(MEMBERS).values())
+    assert grid.shape == (6, 4)
+    assert list(grid.index.get_level_values("Type")) == ["Metriek"] * 3 + ["KPI"] * 3
+    assert grid.loc[("Metriek", "Metriek 1")].tolist() == [1.0, 11.0, 21.0, 31.0]
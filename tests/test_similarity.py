@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from similarity import META_COLUMNS, PlayerSimilarityIndex, SquadSimilarityIndex
+
+COLUMNS = [f"p{i}" for i in range(6)]
+
+
+def make_index(n=400, seed=7, nan_fraction=0.0, shuffle=None):
+    rng = np.random.default_rng(seed)
+    # Scores op een grof raster: veel gelijke afstanden, dus veel gelijke gelijkenis
+    scores = rng.integers(0, 20, size=(n, len(COLUMNS))).astype(np.float32) * 5
+    scores[rng.random(scores.shape) < nan_fraction] = np.nan
+    meta = pd.DataFrame({
+        "playerId": [str(1000 + i // 2) for i in range(n)],
+        "iterationId": [str(10 + i % 2) for i in range(n)],
+        "Naam": [f"Speler {i // 2}" for i in range(n)],
+        "Team": "Team",
+        "Seizoen": ["24/25" if i % 2 else "25/26" for i in range(n)],
+        "Competitie": "Eerste Klasse A",
+    })
+    if shuffle is not None:
+        meta, scores = meta.iloc[shuffle].reset_index(drop=True), scores[shuffle]
+    return PlayerSimilarityIndex(meta[META_COLUMNS], scores, COLUMNS)
+
+
+def keys(df):
+    return list(zip(df["playerId"], df["iterationId"]))
+
+
+def test_many_matches_single_lookups():
+    for nan_fraction in (0.0, 0.1):
+        index = make_index(nan_fraction=nan_fraction)
+        targets = [("1003", "10", COLUMNS), ("1010", "11", COLUMNS[:3]), ("1042", "10", COLUMNS[2:]), ("9999", "10", COLUMNS)]
+        many = index.most_similar_many(targets, k=15, level_window=10, chunk_elements=1000)
+        assert many[3] is None
+        for (player_id, iteration_id, columns), result in zip(targets[:3], many[:3]):
+            single = index.most_similar(player_id, iteration_id, columns, k=15, level_window=10)
+            assert keys(result) == keys(single)
+            assert np.allclose(result["Avg Score"], single["Avg Score"])
+            assert np.allclose(result["Gelijkenis %"], single["Gelijkenis %"], atol=1e-3)
+
+
+def test_ties_broken_on_id_not_row_order():
+    n = 400
+    shuffle = np.random.default_rng(1).permutation(n)
+    a = make_index(n).most_similar("1003", "10", COLUMNS, k=25, level_window=100)
+    b = make_index(n, shuffle=shuffle).most_similar("1003", "10", COLUMNS, k=25, level_window=100)
+    assert keys(a) == keys(b)
+    # Binnen gelijke gelijkenis oplopend op (playerId, iterationId)
+    for _, group in a.groupby("Gelijkenis %", sort=False):
+        assert keys(group) == sorted(keys(group))
+
+
+def make_squad_index(shuffle=None):
+    # Veel ploegen met exact hetzelfde profiel: de volgorde hangt enkel van de tie-break af
+    rows = []
+    for squad in range(40):
+        for season in ("24/25", "25/26"):
+            for n, profile in enumerate(["Hoge druk", "Balbezit", "Counter"]):
+                rows.append({"squadId": str(5000 + squad), "Team": f"Team {squad}", "Seizoen": season,
+                             "Competitie": "Eerste Klasse A", "profile_name": profile, "score": float((squad % 3 == n) * 50)})
+    df = pd.DataFrame(rows)
+    if shuffle is not None:
+        df = df.sample(frac=1, random_state=shuffle).reset_index(drop=True)
+    return SquadSimilarityIndex.from_long_frame(df)
+
+
+def test_squad_ties_broken_on_id_not_row_order():
+    a = make_squad_index().most_similar("5000", "25/26", "Eerste Klasse A", k=8)
+    b = make_squad_index(shuffle=5).most_similar("5000", "25/26", "Eerste Klasse A", k=8)
+    squad_keys = ["squadId", "Seizoen", "Competitie"]
+    assert a[squad_keys].values.tolist() == b[squad_keys].values.tolist()
+    assert (a["Gelijkenis %"] == 100).all()
+    assert a[squad_keys].values.tolist() == sorted(a[squad_keys].values.tolist())
@@ -0,0 +1,44 @@
+import os
+
+import pyarrow as pa
+
+import snapshot
+
+TABLES = {"public.iterations": pa.table({"id": pa.array([1, 2], pa.int64()), "season": ["24/25", "25/26"]})}
+
+
+def test_swap_in_only_removes_own_versions(tmp_path):
+    out = tmp_path / "data"
+    out.mkdir()
+    (out / "notities.txt").write_text("niet van de snapshot")
+    (out / "eigen_map").mkdir()
+    (out / "eigen_map" / "bestand").write_text("x")
+
+    versions = []
+    for _ in range(4):
+        snapshot.write_snapshot(TABLES, str(out))
+        versions.append(os.path.basename(snapshot.current_dir(str(out))))
+
+    names = set(os.listdir(out))
+    # Actieve en vorige versie blijven, oudere versies zijn weg; al de rest blijft staan
+    assert names == {"CURRENT", "notities.txt", "eigen_map", *versions[-2:]}
+    assert (out / "eigen_map" / "bestand").read_text() == "x"
+
+
+def test_swap_in_removes_old_layout(tmp_path):
+    out = tmp_path / "snapshot"
+    (out / "public").mkdir(parents=True)
+    (out / "manifest.json").write_text("{}")
+    (out / "README").write_text("blijft")
+
+    snapshot.write_snapshot(TABLES, str(out))  # vorige export in de oude indeling: nog niets weg
+    assert {"public", "manifest.json"} <= set(os.listdir(out))
+    snapshot.write_snapshot(TABLES, str(out))
+    names = set(os.listdir(out))
+    assert "public" not in names and "manifest.json" not in names and "README" in names
+
+
+def test_to_duckdb_sql_keeps_percent_in_values():
+    sql = snapshot.to_duckdb_sql("SELECT 1 WHERE name LIKE 'a%%' AND x = %s AND y IN %s", ("50%% korting", ("a", "b%%")))
+    assert sql == "SELECT 1 WHERE name LIKE 'a%' AND x = '50%% korting' AND y IN ('a', 'b%%')"
+    assert snapshot.to_duckdb_sql("SELECT '%%'") == "SELECT '%%'"
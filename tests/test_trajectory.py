@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+import trajectory
+from db import compact_frame
+from profiles import PROFILE_COLUMNS
+
+SEASONS = [("21/22", "Eerste Klasse A"), ("22/23", "Eerste Klasse A"), ("23/24", "Eerste Klasse B"), ("24/25", "Eerste Klasse A"), ("25/26", "Eerste Klasse A")]
+METRICS = [f"Metriek {i}" for i in range(30)]
+
+
+def trajectory_rows():
+    # Eén speler over vijf seizoenen, in het lange formaat van TRAJECTORY_QUERY
+    rows = []
+    for n, (season, competition) in enumerate(SEASONS):
+        base = dict(iterationId=str(100 + n), Seizoen=season, Competitie=competition, Team="KV Kortrijk", Positie="CENTRAL_DEFENDER")
+        for column in PROFILE_COLUMNS.values():
+            rows.append({**base, "kind": "Profiel", "key": column, "name": column, "Score": 10.0 + n})
+        for i, name in enumerate(METRICS):
+            rows.append({**base, "kind": "Metriek", "key": str(i), "name": name, "Score": 50.0 + n})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(params=["raw", "compact"])
+def player_trajectory(request, monkeypatch):
+    df = trajectory_rows()
+    if request.param == "compact":
+        df = compact_frame(df)
+        assert isinstance(df["Seizoen"].dtype, pd.CategoricalDtype)
+    monkeypatch.setattr(trajectory, "cached_query", lambda query, params: df.copy())
+    return trajectory.load_player_trajectory("1", "CENTRAL_DEFENDER")
+
+
+def test_labels_over_seasons(player_trajectory):
+    df = player_trajectory
+    assert list(dict.fromkeys(df["Iteratie"])) == [f"{s} · {c}" for s, c in SEASONS]
+    profiles = df[df["kind"] == "Profiel"]
+    assert set(profiles["name"]) == set(PROFILE_COLUMNS)
+    assert set(df.loc[df["kind"] == "Metriek", "name"]) == set(METRICS)
+
+
+def test_table_one_column_per_season(player_trajectory):
+    table = trajectory.trajectory_table(player_trajectory, "Metriek")
+    assert list(table.columns) == [f"{s} · {c}" for s, c in SEASONS]
+    assert len(table) == len(METRICS)
+    assert table.iloc[0].tolist() == [50.0, 51.0, 52.0, 53.0, 54.0]
+
+    profiles = trajectory.trajectory_table(player_trajectory, "Profiel")
+    assert len(profiles) == len(PROFILE_COLUMNS)
+
+
+def test_season_start():
+    assert [trajectory.season_start(s) for s in ["24/25", "2025", "2024/2025", "onbekend"]] == [2024, 2025, 2024, None]
+
+
+def test_mixed_season_labels_chronological(monkeypatch):
+    # Als tekst komt "2025" vóór "23/24" en "24/25"; chronologisch erna
+    df = trajectory_rows()
+    relabel = {"21/22": "2025", "22/23": "23/24", "23/24": "24/25", "24/25": "2026", "25/26": "2024"}
+    df["Seizoen"] = df["Seizoen"].map(relabel)
+    df = df.sample(frac=1, random_state=3).reset_index(drop=True)
+    monkeypatch.setattr(trajectory, "cached_query", lambda query, params: df.copy())
+    table = trajectory.trajectory_table(trajectory.load_player_trajectory("1", "CENTRAL_DEFENDER"), "Metriek")
+    assert [c.split(" · ")[0] for c in table.columns] == ["23/24", "2024", "24/25", "2025", "2026"]
@@ -0,0 +1,101 @@
+import re
+
+import pandas as pd
+
+from db import cached_query
+from profiles import POSITION_KPIS, POSITION_METRICS, PROFILE_COLUMNS, get_config_for_position
+
+# -----------------------------------------------------------------------------
+# ONTWIKKELING VAN EEN SPELER OVER ALLE SEIZOENEN (ÉÉN QUERY)
+# -----------------------------------------------------------------------------
+# Alle iteraties van een speler komen in één rondreis terug, in lang formaat: één rij per
+# (iteratie, score). Profielscores worden in de database ontpivoteerd, metrieken en KPIs
+# komen uit de materialized views (migrations/003, vooraf gejoind met de definities). Het
+# resultaat gaat via cached_query: per speler gecachet, hoeveel seizoenen er ook zijn.
+# De volgorde is chronologisch op het beginjaar van het seizoen (zie season_start), niet
+# alfabetisch op het label: "2025" en "24/25" staan zo toch in de goede volgorde.
+
+TRAJECTORY_QUERY = """
+    WITH it AS (
+        SELECT a."iterationId", a."playerId", i.season, i."competitionName", sq.name as squad_name, a.position, {profile_columns}
+        FROM analysis.final_impect_scores a
+        JOIN public.iterations i ON i.id = a."iterationId"
+        LEFT JOIN public.squads sq ON sq.id = a."squadId"
+        WHERE a."playerId" = %s
+    )
+    SELECT it."iterationId", it.season as "Seizoen", it."competitionName" as "Competitie", it.squad_name as "Team",
+        it.position as "Positie", 'Profiel' as kind, v.key, v.key as name, v.score as "Score"
+    FROM it CROSS JOIN LATERAL (VALUES {profile_values}) v(key, score)
+    {score_parts}
+"""
+
+_SCORE_PART = """
+    UNION ALL
+    SELECT it."iterationId", it.season, it."competitionName", it.squad_name, it.position, '{kind}', CAST(s.metric_id AS text),
+        s.name || COALESCE(' (' || s.{detail} || ')', ''), s.final_score_1_to_100
+    FROM it JOIN {view} s ON s."iterationId" = it."iterationId" AND s."playerId" = it."playerId"
+    WHERE s.metric_id IN %s
+"""
+
+_SCORE_SOURCES = {
+    "Metriek": ("analysis.mv_player_metric_scores", "details_label", POSITION_METRICS),
+    "KPI": ("analysis.mv_player_kpi_scores", "context", POSITION_KPIS),
+}
+
+_PROFILE_LABELS = {column: label for label, column in PROFILE_COLUMNS.items()}
+
+
+def trajectory_query(player_id, position):
+    # Metrieken en KPIs van de huidige positie; posities zonder ids krijgen geen UNION-deel
+    columns = list(PROFILE_COLUMNS.values())
+    parts, params = [], [str(player_id)]
+    for kind, (view, detail, config_dict) in _SCORE_SOURCES.items():
+        config = get_config_for_position(position, config_dict) or {}
+        ids = tuple(str(x) for x in config.get("aan_bal", []) + config.get("zonder_bal", []))
+        if ids:
+            parts.append(_SCORE_PART.format(kind=kind, view=view, detail=detail))
+            params.append(ids)
+    query = TRAJECTORY_QUERY.format(
+        profile_columns=", ".join(f"a.{c}" for c in columns),
+        profile_values=", ".join(f"('{c}', it.{c})" for c in columns),
+        score_parts="".join(parts),
+    )
+    return query, tuple(params)
+
+
+def season_start(season):
+    # Beginjaar uit een seizoenslabel: "24/25" -> 2024, "2025" -> 2025, "2024/2025" -> 2024
+    match = re.search(r"\d{2,4}", str(season))
+    if match is None:
+        return None
+    year = int(match.group())
+    return year + 2000 if year < 100 else year
+
+
+def load_player_trajectory(player_id, position):
+    # Lang formaat: iterationId, Seizoen, Competitie, Team, Positie, kind, key, name, Score
+    df = cached_query(*trajectory_query(player_id, position))
+    if not df.empty:
+        # Als str/object: ook een compact (categorical) frame mag hier binnenkomen
+        labels = df["key"].astype(object).map(_PROFILE_LABELS)
+        df["name"] = df["name"].astype(object).where(df["kind"] != "Profiel", labels)
+        df["Iteratie"] = df["Seizoen"].astype(str) + " · " + df["Competitie"].astype(str)
+        # Stabiel: binnen een iteratie blijft de volgorde van de query
+        order = pd.DataFrame({
+            "start": df["Seizoen"].astype(str).map(season_start), "season": df["Seizoen"].astype(str),
+            "competition": df["Competitie"].astype(str), "iteration": df["iterationId"].astype(str),
+        })
+        df = df.loc[order.sort_values(list(order.columns), kind="stable", na_position="last").index].reset_index(drop=True)
+    return df
+
+
+def trajectory_table(df, kind):
+    # Eén rij per score, één kolom per iteratie (chronologisch); profielen die nergens > 0 zijn vallen weg
+    part = df[(df["kind"] == kind) & df["Score"].notna()]
+    if kind == "Profiel":
+        part = part[part.groupby("key", observed=True)["Score"].transform("max") > 0]
+    if part.empty:
+        return pd.DataFrame()
+    order = list(dict.fromkeys(part["Iteratie"]))
+    table = part.pivot_table(index="name", columns="Iteratie", values="Score", aggfunc="mean", observed=True, sort=False)
+    return table[order].rename_axis(index=kind, columns=None)
@@ -0,0 +1,78 @@
+import logging
+import threading
+from functools import partial
+
+import streamlit as st
+
+from catalog import load_iteration_catalog
+from coaches import load_coach_index
+from db import cached_query, data_version, run_parallel, setting
+from player_page import PLAYERS_QUERY
+from search import load_player_search_index
+from similarity import load_player_similarity_index, load_squad_similarity_index
+from team_page import TEAMS_QUERY
+
+# -----------------------------------------------------------------------------
+# CACHE WARM-UP
+# -----------------------------------------------------------------------------
+# Bij de eerste sessie van een proces (en na elke nieuwe dataversie) laden we op de
+# achtergrond de catalogus, de zoekindex en de spelers- en teamlijsten van de recentste
+# seizoenen, zodat de eerste gebruiker niet op koude queries wacht. Daarna, in een tweede
+# ronde, de similarity index van elke positie die in die seizoenen voorkomt: de zwaarste
+# opbouw van de spelerpagina.
+#
+# Optioneel in st.secrets["cache"]: warm_up (bool, standaard true) en warm_up_seasons
+# (aantal recentste seizoenen, standaard 2).
+
+log = logging.getLogger("kvk.cache")
+
+
+def warm_up_tasks(catalog, seasons):
+    tasks = {"vergelijkbare teams": load_squad_similarity_index, "spelers zoeken": load_player_search_index, "coaches": load_coach_index}
+    for season in catalog.seasons[:seasons]:
+        for competition in catalog.competitions(season):
+            iteration_id = catalog.default_iteration(season, competition)
+            tasks[f"spelers {iteration_id}"] = partial(cached_query, PLAYERS_QUERY, (iteration_id,))
+            tasks[f"teams {iteration_id}"] = partial(cached_query, TEAMS_QUERY, (iteration_id,))
+    return tasks
+
+
+def similarity_tasks(catalog, seasons):
+    # Posities uit de (al opgewarmde) spelerslijsten, meest voorkomende eerst
+    counts = {}
+    for season in catalog.seasons[:seasons]:
+        for competition in catalog.competitions(season):
+            players = cached_query(PLAYERS_QUERY, (catalog.default_iteration(season, competition),))
+            for position, n in players["position"].dropna().value_counts().items():
+                counts[position] = counts.get(position, 0) + n
+    positions = sorted(counts, key=counts.get, reverse=True)
+    return {f"vergelijkbare spelers {position}": partial(load_player_similarity_index, position) for position in positions}
+
+
+def warm_up(seasons=2):
+    results, errors = {}, {}
+    try:
+        catalog = load_iteration_catalog()
+        for tasks in (warm_up_tasks, similarity_tasks):
+            done, failed = run_parallel(tasks(catalog, seasons))
+            results.update(done)
+            errors.update(failed)
+    except Exception as e:
+        log.warning("Warm-up mislukt: %s", e)
+        return
+    for name, e in errors.items():
+        log.warning("Warm-up %s mislukt: %s", name, e)
+    log.info("Warm-up klaar: %d resultaten geladen", len(results))
+
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def _start_warm_up(version):
+    thread = threading.Thread(target=warm_up, args=(int(setting("cache", "warm_up_seasons", 2)),), name="kvk-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def start_warm_up():
+    # Eén keer per dataversie per proces, blokkeert de run niet
+    if setting("cache", "warm_up", True):
+        _start_warm_up(data_version())